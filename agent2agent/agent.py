@@ -12,7 +12,7 @@ print("✅ ADK components imported successfully.")
 from services import model_service
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 
 # Define a product catalog lookup tool
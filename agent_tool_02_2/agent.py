@@ -21,7 +21,7 @@ from services import model_service
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 # MCP integration with Everything Server
 mcp_image_server = McpToolset(
@@ -12,7 +12,7 @@ from services import model_service
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 
 LARGE_ORDER_THRESHOLD = 5
@@ -118,10 +118,12 @@ print("✅ Runner created!")
 def check_for_approval(events):
     """Check if events contain an approval request.
 
+    Scans from the newest event backwards, since the pending request is at the tail.
+
     Returns:
         dict with approval details or None
     """
-    for event in events:
+    for event in reversed(events):
         if event.content and event.content.parts:
             for part in event.content.parts:
                 if (
@@ -0,0 +1,128 @@
+"""
+本地假模型目录服务 - 模拟OpenAI兼容的 /v1/models 和Ollama的 /api/tags，用于测试ModelCatalog的刷新和兜底
+
+用法:
+    python benchmarks/fake_models.py --port 18091 --models qwen3:30b,llama3.1:8b
+
+也可以在代码中使用:
+    with FakeModelsEndpoint(models=["qwen3:30b"]) as server:
+        catalog = ModelCatalog(http_fetcher(server.api_base))
+        server.failing = True   # 之后的请求返回503
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        owner = self.server.owner
+        owner.requests += 1
+        if owner.failing:
+            owner.errors += 1
+            self._send(503, {"error": "Service temporarily unavailable."})
+            return
+
+        if self.path == "/v1/models":
+            self._send(200, {
+                "object": "list",
+                "data": [{"id": name, "object": "model", "owned_by": "library"} for name in owner.models],
+            })
+        elif self.path == "/api/tags":
+            self._send(200, {"models": [{"name": name, "details": owner.details.get(name, {})} for name in owner.models]})
+        else:
+            self._send(404, {"error": "Not found"})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, owner: "FakeModelsEndpoint"):
+        super().__init__(address, _Handler)
+        self.owner = owner
+
+
+class FakeModelsEndpoint:
+    """在后台线程中运行的假模型目录服务，models、details和failing可以随时修改"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, models: Iterable[str] = (),
+                 details: Dict[str, Dict] = None):
+        """
+        初始化假服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            models: 返回的模型名称
+            details: /api/tags中每个模型的details（quantization_level、parameter_size等）
+        """
+        self.models: List[str] = list(models)
+        self.details: Dict[str, Dict] = dict(details or {})
+        # 为True时所有请求返回503
+        self.failing = False
+        self.requests = 0
+        self.errors = 0
+        self._server = _Server((host, port), self)
+        self._thread = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeModelsEndpoint":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行，直到被中断"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeModelsEndpoint":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地假模型目录服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18091)
+    parser.add_argument("--models", default="qwen3:30b", help="逗号分隔的模型名称")
+    args = parser.parse_args()
+
+    server = FakeModelsEndpoint(host=args.host, port=args.port, models=args.models.split(","))
+    print(f"Fake models endpoint listening on {server.api_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
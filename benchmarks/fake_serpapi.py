@@ -0,0 +1,213 @@
+"""
+本地假SerpAPI服务 - 模拟 /search 的organic_results和answer_box响应，用于离线压测
+
+用法:
+    python benchmarks/fake_serpapi.py --port 18090 --latency 0.2 --error-rate 0.05
+    SERPAPI_KEY=fake SERPAPI_ENDPOINT=http://127.0.0.1:18090/search python parallel_agents/agent.py
+
+也可以在代码中使用（需在导入tools.serp之前设置SERPAPI_ENDPOINT）:
+    with FakeSerpAPI(latency=0.05) as server:
+        os.environ["SERPAPI_ENDPOINT"] = server.endpoint
+        from tools.serp import serpapi_search
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class FakeSerpAPIConfig:
+    """假服务配置"""
+
+    # 平均延迟和抖动（秒），实际延迟为 latency ± jitter
+    latency: float = 0.05
+    jitter: float = 0.02
+    # 返回5xx错误的概率
+    error_rate: float = 0.0
+    # 返回answer_box而不是organic_results的概率
+    answer_box_rate: float = 0.0
+    # 每条摘要的字符数，以及每条结果附带的无用字段大小（模拟真实响应的体积）
+    snippet_chars: int = 160
+    extra_bytes: int = 512
+    # 最多可分页的结果总数
+    total_results: int = 100
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        config = self.server.config
+        self.server.requests += 1
+
+        if url.path != "/search":
+            self._send(404, {"error": "Not found"})
+            return
+        if not params.get("api_key"):
+            self._send(401, {"error": "Invalid API key."})
+            return
+
+        time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+        if random.random() < config.error_rate:
+            self.server.errors += 1
+            self._send(503, {"error": "Service temporarily unavailable."})
+            return
+
+        self._send(200, build_response(params, config))
+
+
+def build_response(params: Dict, config: FakeSerpAPIConfig) -> Dict:
+    """
+    按SerpAPI的格式生成响应
+
+    Args:
+        params: 查询参数（q、num、start）
+        config: 假服务配置
+
+    Returns:
+        Dict: 包含search_metadata、search_parameters以及organic_results或answer_box的响应
+    """
+    query = params.get("q", "")
+    num = int(params.get("num", 10))
+    start = int(params.get("start", 0))
+    response = {
+        "search_metadata": {"status": "Success", "total_time_taken": config.latency},
+        "search_parameters": {"engine": params.get("engine", "google"), "q": query, "num": num, "start": start},
+        "search_information": {"total_results": config.total_results},
+    }
+
+    if random.random() < config.answer_box_rate:
+        response["answer_box"] = {
+            "type": "organic_result",
+            "title": f"{query} - 答案",
+            "link": f"https://example.com/answer/{query.replace(' ', '-')}",
+            "answer": f"关于 {query} 的直接答案。",
+        }
+        return response
+
+    filler = ("lorem ipsum " * (config.snippet_chars // 12 + 1))[:config.snippet_chars]
+    end = min(start + num, config.total_results)
+    response["organic_results"] = [
+        {
+            "position": position + 1,
+            "title": f"{query} 结果 {position + 1}",
+            "link": f"https://example.com/{query.replace(' ', '-')}/{position + 1}",
+            "displayed_link": "https://example.com",
+            "snippet": f"{query}: {filler}",
+            "rich_snippet": {"extra": "x" * config.extra_bytes},
+        }
+        for position in range(start, end)
+    ]
+    if end < config.total_results:
+        response["serpapi_pagination"] = {"next": f"/search?q={query}&start={end}"}
+    return response
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeSerpAPIConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.requests = 0
+        self.errors = 0
+
+
+class FakeSerpAPI:
+    """在后台线程中运行的假SerpAPI服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **config):
+        """
+        初始化假服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            **config: FakeSerpAPIConfig的字段
+        """
+        self.config = FakeSerpAPIConfig(**config)
+        self._server = _Server((host, port), self.config)
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    @property
+    def errors(self) -> int:
+        return self._server.errors
+
+    def start(self) -> "FakeSerpAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行，直到被中断"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeSerpAPI":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地假SerpAPI服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--latency", type=float, default=0.05, help="平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延迟抖动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的概率")
+    parser.add_argument("--answer-box-rate", type=float, default=0.0, help="返回answer_box的概率")
+    parser.add_argument("--snippet-chars", type=int, default=160, help="每条摘要的字符数")
+    parser.add_argument("--extra-bytes", type=int, default=512, help="每条结果附带的额外字段大小")
+    args = parser.parse_args()
+
+    server = FakeSerpAPI(
+        host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, answer_box_rate=args.answer_box_rate,
+        snippet_chars=args.snippet_chars, extra_bytes=args.extra_bytes,
+    )
+    print(f"Fake SerpAPI listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
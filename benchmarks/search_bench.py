@@ -0,0 +1,181 @@
+"""
+搜索基准 - 通过本地假SerpAPI服务压测 SerpAPISearch.search_web 和 serpapi_search，无需网络
+
+用法:
+    python benchmarks/search_bench.py
+    python benchmarks/search_bench.py --requests 500 --concurrency 16 --latency 0.05 --error-rate 0.02
+    python benchmarks/search_bench.py --json > search_bench.json   # CI中保存结果
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_serpapi import FakeSerpAPI  # noqa: E402
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int, alloc: List[int]) -> Dict:
+    """汇总一个场景的延迟、吞吐和内存分配"""
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "alloc_kb_per_call": statistics.mean(alloc) / 1024 if alloc else 0.0,
+    }
+
+
+def measure_alloc(call: Callable[[], object], samples: int) -> List[int]:
+    """用tracemalloc测量单次调用的峰值内存分配（字节）"""
+    alloc = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            call()
+            alloc.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return alloc
+
+
+def bench_sync(name: str, search, queries: List[str], num_results: int, alloc_samples: int) -> Dict:
+    """顺序调用同步的search_web"""
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        result = search.search_web(query, num_results)
+        latencies.append(time.perf_counter() - t)
+        errors += result["status"] != "success"
+    elapsed = time.perf_counter() - start
+
+    alloc = measure_alloc(lambda: search.search_web(queries[0], num_results), alloc_samples)
+    return summarize(name, latencies, elapsed, errors, alloc)
+
+
+async def bench_async(name: str, call: Callable[[str], Awaitable[Dict]], queries: List[str],
+                      concurrency: int, alloc_samples: int) -> Dict:
+    """以固定并发度调用异步搜索函数"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def _one(query: str):
+        nonlocal errors
+        async with semaphore:
+            t = time.perf_counter()
+            result = await call(query)
+            latencies.append(time.perf_counter() - t)
+            errors += result["status"] != "success"
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_one(query) for query in queries])
+    elapsed = time.perf_counter() - start
+
+    alloc = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await call(queries[0])
+            alloc.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return summarize(name, latencies, elapsed, errors, alloc)
+
+
+async def run(args) -> List[Dict]:
+    # 导入前设置环境变量，让搜索工具指向假服务
+    from tools import serp
+
+    unique = [f"query {i}" for i in range(args.requests)]
+    # 一半查询重复出现，用于观察缓存效果
+    repeated = [f"query {i % max(args.requests // 2, 1)}" for i in range(args.requests)]
+    uncached = serp.SerpAPISearch(api_key="fake", cache=None, local_index=None)
+
+    results = [
+        bench_sync("search_web (sync, no cache)", uncached, unique[:args.sync_requests],
+                   args.num_results, args.alloc_samples),
+        await bench_async("search_web_async (no cache)",
+                          lambda query: uncached.search_web_async(query, args.num_results),
+                          unique, args.concurrency, args.alloc_samples),
+    ]
+
+    serp.search_cache.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results.append(await bench_async("serpapi_search (cache + shaping, 50% repeats)",
+                                         lambda query: serp.serpapi_search(query, args.num_results),
+                                         repeated, args.concurrency, args.alloc_samples))
+    results[-1]["cache_hit_rate"] = serp.search_cache.stats()["hit_rate"]
+    results[-1]["tokens_saved_per_call"] = serp.result_shaper.tokens_saved / max(serp.result_shaper.calls, 1)
+    await serp.aclose_http_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="通过本地假SerpAPI服务压测搜索路径")
+    parser.add_argument("--requests", type=int, default=200, help="异步场景的请求数")
+    parser.add_argument("--sync-requests", type=int, default=50, help="同步场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=8, help="异步场景的并发度")
+    parser.add_argument("--num-results", type=int, default=10, help="每次搜索的结果数")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="测量内存分配的调用次数")
+    parser.add_argument("--latency", type=float, default=0.02, help="假服务平均延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="假服务延迟抖动（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="假服务返回503的概率")
+    parser.add_argument("--snippet-chars", type=int, default=160, help="每条摘要的字符数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args()
+
+    with FakeSerpAPI(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                     snippet_chars=args.snippet_chars) as server:
+        os.environ["SERPAPI_KEY"] = "fake"
+        os.environ["SERPAPI_ENDPOINT"] = server.endpoint
+        os.environ.pop("SERP_CACHE_PATH", None)
+        os.environ.pop("LOCAL_SEARCH_DIR", None)
+        results = asyncio.run(run(args))
+        server_requests = server.requests
+
+    if args.json:
+        print(json.dumps({"server_requests": server_requests, "results": results}, ensure_ascii=False, indent=2))
+        return
+
+    header = f"{'scenario':<48}{'reqs':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'KB/call':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['scenario']:<48}{result['requests']:>6}{result['errors']:>5}"
+            f"{result['p50_ms']:>7.1f}ms{result['p95_ms']:>7.1f}ms{result['p99_ms']:>7.1f}ms"
+            f"{result['throughput_rps']:>9.1f}{result['alloc_kb_per_call']:>9.1f}"
+        )
+    cached = results[-1]
+    print(f"\ncache hit rate: {cached['cache_hit_rate']:.0%}, tokens saved per call: "
+          f"{cached['tokens_saved_per_call']:.0f}, upstream requests: {server_requests}")
+
+
+if __name__ == "__main__":
+    main()
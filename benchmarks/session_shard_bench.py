@@ -0,0 +1,132 @@
+"""
+会话分片基准 - 多个进程同时向不同用户的会话追加事件，比较不同分片数下的写入吞吐
+
+每个进程是一个独立的ShardedSessionService（与多worker部署相同），各自负责一部分用户。
+分片数为1时所有进程争用同一个SQLite写锁，分片越多争用越少。
+
+用法:
+    python benchmarks/session_shard_bench.py
+    python benchmarks/session_shard_bench.py --shards 1,2,4,8 --workers 8 --users 64 --events 40
+    python benchmarks/session_shard_bench.py --synchronous NORMAL --json > shard_bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _profile(synchronous: str):
+    from services.sqlite_store import SQLiteProfile
+
+    return SQLiteProfile(synchronous=synchronous)
+
+
+async def _prepare(path: str, shards: int, synchronous: str):
+    """创建分片文件和布局清单，避免多个worker同时建表"""
+    from services.sharded_store import ShardedSessionService, ShardingConfig
+
+    service = ShardedSessionService(path, ShardingConfig(shards=shards), profile=_profile(synchronous))
+    for shard in service.shards:
+        await shard.prepare_tables()
+    await service.close()
+
+
+async def _write(path: str, shards: int, synchronous: str, users: List[str], events: int,
+                 start_at: float) -> Dict:
+    from google.adk.events import Event
+    from google.genai import types
+
+    from services.group_commit import GroupCommitConfig
+    from services.sharded_store import ShardedSessionService, ShardingConfig
+
+    # 每条事件单独提交，测量的是分片本身带来的并行度，而不是组提交的合并效果
+    service = ShardedSessionService(path, ShardingConfig(shards=shards), profile=_profile(synchronous),
+                                    commit_config=GroupCommitConfig(max_batch=1, max_delay=0))
+    sessions = [
+        await service.create_session(app_name="bench", user_id=user_id, session_id="s") for user_id in users
+    ]
+    await asyncio.sleep(max(start_at - time.time(), 0))
+
+    async def _user(session):
+        for index in range(events):
+            event = Event(author="user", invocation_id=f"i{index}",
+                          content=types.Content(role="user", parts=[types.Part(text=f"message {index}")]))
+            await service.append_event(session, event)
+
+    start = time.time()
+    await asyncio.gather(*[_user(session) for session in sessions])
+    end = time.time()
+    await service.close()
+    return {"start": start, "end": end, "events": events * len(users)}
+
+
+def _worker(args):
+    return asyncio.run(_write(*args))
+
+
+def bench(shards: int, workers: int, users: int, events: int, synchronous: str) -> Dict:
+    """在临时目录中用指定分片数运行一轮，返回总吞吐"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bench.db")
+        asyncio.run(_prepare(path, shards, synchronous))
+        user_ids = [f"user-{index}" for index in range(users)]
+        # 所有worker在启动完成后同时开始写入
+        start_at = time.time() + 2.0 + workers * 0.3
+        jobs = [(path, shards, synchronous, user_ids[index::workers], events, start_at) for index in range(workers)]
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            results = pool.map(_worker, jobs)
+
+    elapsed = max(result["end"] for result in results) - min(result["start"] for result in results)
+    total = sum(result["events"] for result in results)
+    return {
+        "shards": shards,
+        "workers": workers,
+        "events": total,
+        "elapsed_s": elapsed,
+        "events_per_s": total / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较不同分片数下的会话写入吞吐")
+    parser.add_argument("--shards", default="1,2,4,8", help="逗号分隔的分片数")
+    parser.add_argument("--workers", type=int, default=4, help="写入进程数")
+    parser.add_argument("--users", type=int, default=32, help="用户数（每个用户一个会话）")
+    parser.add_argument("--events", type=int, default=50, help="每个会话追加的事件数")
+    parser.add_argument("--synchronous", default="FULL", help="SQLite synchronous级别（FULL时每次提交都fsync）")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args()
+
+    results = [
+        bench(int(shards), args.workers, args.users, args.events, args.synchronous)
+        for shards in args.shards.split(",")
+    ]
+    if args.json:
+        print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+        return
+
+    baseline = results[0]["events_per_s"]
+    header = f"{'shards':>8}{'workers':>9}{'events':>9}{'elapsed':>10}{'events/s':>11}{'scaling':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['shards']:>8}{result['workers']:>9}{result['events']:>9}{result['elapsed_s']:>9.2f}s"
+            f"{result['events_per_s']:>11.0f}{result['events_per_s'] / baseline:>8.1f}x"
+        )
+    # 写入进程多于CPU核数时，瓶颈是序列化事件的CPU而不是写锁，分片带不来提升
+    print(f"\ncpu count: {os.cpu_count()}, workers: {args.workers}")
+
+
+if __name__ == "__main__":
+    main()
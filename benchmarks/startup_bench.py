@@ -0,0 +1,122 @@
+"""
+启动耗时基准 - 在独立子进程中逐个导入agent包，统计导入耗时
+
+用法:
+    python benchmarks/startup_bench.py                 # 测量当前代码
+    python benchmarks/startup_bench.py --compare HEAD~1  # 同时测量指定git版本并对比
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 在子进程中执行的测量代码，只统计import本身的耗时
+_MEASURE = """
+import importlib, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1] + ".agent")
+elapsed = time.perf_counter() - start
+print("__ELAPSED__", elapsed, "litellm" in sys.modules)
+"""
+
+
+def discover_packages(root: Path) -> List[str]:
+    """找出包含agent.py的目录"""
+    return sorted(path.parent.name for path in root.glob("*/agent.py"))
+
+
+def measure_once(root: Path, package: str, timeout: float) -> Optional[Dict]:
+    """在全新的Python进程中导入一次agent包"""
+    env = {**os.environ, "PYTHONPATH": str(root), "LITELLM_LOCAL_MODEL_COST_MAP": "True"}
+    # 在临时目录中运行，避免agent导入时在仓库里创建日志或数据库文件
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            result = subprocess.run(
+                [sys.executable, "-c", _MEASURE, package],
+                cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return None
+
+    for line in result.stdout.splitlines():
+        if line.startswith("__ELAPSED__"):
+            _, elapsed, litellm_loaded = line.split()
+            return {"elapsed": float(elapsed), "litellm_loaded": litellm_loaded == "True"}
+    return None
+
+
+def measure(root: Path, packages: List[str], repeat: int, timeout: float) -> Dict[str, Dict]:
+    """测量每个agent包的导入耗时中位数"""
+    results = {}
+    for package in packages:
+        samples = [measure_once(root, package, timeout) for _ in range(repeat)]
+        samples = [sample for sample in samples if sample is not None]
+        if not samples:
+            results[package] = {"status": "error"}
+            continue
+        results[package] = {
+            "status": "success",
+            "median": statistics.median(sample["elapsed"] for sample in samples),
+            "litellm_loaded": any(sample["litellm_loaded"] for sample in samples),
+        }
+    return results
+
+
+@contextmanager
+def checkout(ref: str):
+    """把指定git版本检出到临时worktree"""
+    workdir = tempfile.mkdtemp(prefix="startup_bench_")
+    subprocess.run(["git", "worktree", "add", "--detach", workdir, ref], cwd=ROOT, check=True, capture_output=True)
+    try:
+        yield Path(workdir)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", workdir], cwd=ROOT, capture_output=True)
+
+
+def _format(result: Dict) -> str:
+    if result.get("status") != "success":
+        return "error".rjust(10)
+    flag = "*" if result["litellm_loaded"] else " "
+    return f"{result['median'] * 1000:8.0f}ms{flag}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量每个agent包的导入耗时")
+    parser.add_argument("--repeat", type=int, default=3, help="每个包测量的次数，取中位数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次导入的超时时间（秒）")
+    parser.add_argument("--compare", metavar="GIT_REF", help="与指定git版本对比，如 HEAD~1")
+    parser.add_argument("packages", nargs="*", help="只测量指定的agent包")
+    args = parser.parse_args()
+
+    packages = args.packages or discover_packages(ROOT)
+    current = measure(ROOT, packages, args.repeat, args.timeout)
+    baseline = None
+    if args.compare:
+        with checkout(args.compare) as baseline_root:
+            baseline = measure(baseline_root, packages, args.repeat, args.timeout)
+
+    header = f"{'package':<30}{'current':>12}"
+    if baseline is not None:
+        header += f"{args.compare:>12}{'speedup':>10}"
+    print(header)
+    print("-" * len(header))
+    for package in packages:
+        line = f"{package:<30}{_format(current[package]):>12}"
+        if baseline is not None:
+            line += f"{_format(baseline[package]):>12}"
+            if current[package].get("status") == baseline[package].get("status") == "success":
+                line += f"{baseline[package]['median'] / current[package]['median']:>9.1f}x"
+        print(line)
+    print("\n* 表示导入过程中加载了litellm")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,14 @@ import asyncio
 from google.adk import Runner
 from google.adk.agents import LlmAgent
 from google.adk.apps.app import EventsCompactionConfig, App
-from google.adk.sessions.database_session_service import DatabaseSessionService
-from google.genai import types
 
-from services import model_service
+from services import model_service, stream_session
+from services.session_window import SessionWindowConfig
+from services.sqlite_store import SQLiteSessionService
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 APP_NAME = "default"  # Application
 USER_ID = "default"  # User
@@ -38,8 +38,7 @@ research_app_compacting = App(
     ),
 )
 
-db_url = "sqlite+aiosqlite:///my_agent_data.db"  # Local SQLite file
-session_service = DatabaseSessionService(db_url=db_url)
+session_service = SQLiteSessionService("my_agent_data.db")
 
 research_runner_compacting = Runner(
     app=research_app_compacting, session_service=session_service
@@ -50,48 +49,9 @@ async def run_session(
     user_queries: list[str] | str = None,
     session_name: str = "default",
 ):
-    print(f"\n ### Session: {session_name}")
-
-    # Get app name from the Runner
-    app_name = runner_instance.app_name
-
-    # Attempt to create a new session or retrieve an existing one
-    try:
-        session = await session_service.create_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-
-    # Process queries if provided
-    if user_queries:
-        # Convert single query to list for uniform processing
-        if type(user_queries) == str:
-            user_queries = [user_queries]
-
-        # Process each query in the list sequentially
-        for query in user_queries:
-            print(f"\nUser > {query}")
-
-            # Convert the query string to the ADK Content format
-            query = types.Content(role="user", parts=[types.Part(text=query)])
-
-            # Stream the agent's response asynchronously
-            async for event in runner_instance.run_async(
-                user_id=USER_ID, session_id=session.id, new_message=query
-            ):
-                # Check if the event contains valid content
-                if event.content and event.content.parts:
-                    # Filter out empty or "None" responses before printing
-                    if (
-                        event.content.parts[0].text != "None"
-                        and event.content.parts[0].text
-                    ):
-                        print(f"{MODEL_NAME} > ", event.content.parts[0].text)
-    else:
-        print("No queries!")
+    return await stream_session(
+        runner_instance, user_queries, session_name, user_id=USER_ID, author=MODEL_NAME
+    )
 
 print("✅ Helper functions defined.")
 
@@ -126,10 +86,12 @@ async def main():
     print("---------------------------------------------------")
 
     # Get the final session state
+    # 只加载最近一次压缩事件及其之后的事件，不读取整个会话历史
     final_session = await session_service.get_session(
         app_name=research_runner_compacting.app_name,
         user_id=USER_ID,
         session_id="compaction_demo",
+        config=SessionWindowConfig(since_compaction=True),
     )
 
     print("--- Searching for Compaction Summary Event ---")
@@ -148,6 +110,9 @@ async def main():
             "\n❌ No compaction event found. Try increasing the number of turns in the demo."
         )
 
+    # 退出前提交缓冲中的事件并释放连接
+    await session_service.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
 
@@ -8,16 +8,15 @@ from google.adk.sessions import DatabaseSessionService
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from google.adk.tools.tool_context import ToolContext
-from google.genai import types
 
 print("✅ ADK components imported successfully.")
 
 
-from services import model_service
+from services import model_service, stream_session
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 # Define helper functions that will be reused throughout the notebook
 async def run_session(
@@ -25,48 +24,9 @@ async def run_session(
     user_queries: list[str] | str = None,
     session_name: str = "default",
 ):
-    print(f"\n ### Session: {session_name}")
-
-    # Get app name from the Runner
-    app_name = runner_instance.app_name
-
-    # Attempt to create a new session or retrieve an existing one
-    try:
-        session = await session_service.create_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-
-    # Process queries if provided
-    if user_queries:
-        # Convert single query to list for uniform processing
-        if type(user_queries) == str:
-            user_queries = [user_queries]
-
-        # Process each query in the list sequentially
-        for query in user_queries:
-            print(f"\nUser > {query}")
-
-            # Convert the query string to the ADK Content format
-            query = types.Content(role="user", parts=[types.Part(text=query)])
-
-            # Stream the agent's response asynchronously
-            async for event in runner_instance.run_async(
-                user_id=USER_ID, session_id=session.id, new_message=query
-            ):
-                # Check if the event contains valid content
-                if event.content and event.content.parts:
-                    # Filter out empty or "None" responses before printing
-                    if (
-                        event.content.parts[0].text != "None"
-                        and event.content.parts[0].text
-                    ):
-                        print(f"{MODEL_NAME} > ", event.content.parts[0].text)
-    else:
-        print("No queries!")
+    return await stream_session(
+        runner_instance, user_queries, session_name, user_id=USER_ID, author=MODEL_NAME
+    )
 
 
 print("✅ Helper functions defined.")
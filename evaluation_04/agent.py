@@ -14,7 +14,7 @@ retry_config = types.HttpRetryOptions(
 from services import model_service
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 def set_device_status(location: str, device_id: str, status: str) -> dict:
     """Sets the status of a smart home device.
@@ -60,10 +60,10 @@ def get_current_time(city: str) -> dict:
 
 
 
-def create_greeter_agent(model_name: str):
+def create_greeter_agent(model_names: list[str]):
     """创建问候Agent"""
-    # 使用模型服务类创建模型实例
-    model = model_service.create_model(model_name)
+    # 天气/时间这类工具路由用小模型即可，小模型回答不合格时才升级到大模型
+    model = model_service.create_cascade(model_names)
 
     return LlmAgent(
         name="ResearchCoordinator",
@@ -78,5 +78,5 @@ def create_greeter_agent(model_name: str):
     )
 
 
-root_agent = create_greeter_agent("qwen3:30b")
+root_agent = create_greeter_agent(["gpt-oss:20b", "qwen3:30b"])
 
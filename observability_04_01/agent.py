@@ -28,12 +28,12 @@ print("✅ Logging configured")
 from google.adk.agents import LlmAgent, BaseAgent
 from google.adk.tools.agent_tool import AgentTool
 
-from tools.serp import serpapi_search
+from tools.serp import serpapi_search, serpapi_search_deep
 
 from services import model_service
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 # ---- Intentionally pass incorrect datatype - `str` instead of `List[str]` ----
 def count_papers(papers: str):
@@ -53,8 +53,9 @@ google_search_agent = LlmAgent(
     model=model,
     description="Searches for information using Google search",
     instruction="""Use the google_search tool to find information on the given topic. Return the raw search results.
-    If the user asks for a list of papers, then give them the list of research papers you found and not the summary.""",
-    tools=[serpapi_search]
+    If the user asks for a list of papers, use serpapi_search_deep to collect a longer list,
+    then give them the list of research papers you found and not the summary.""",
+    tools=[serpapi_search, serpapi_search_deep]
 )
 
 
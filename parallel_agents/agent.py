@@ -4,23 +4,24 @@ from google.adk import Agent
 from google.adk.agents import LlmAgent, SequentialAgent, ParallelAgent
 from google.adk.runners import InMemoryRunner
 
-from tools.serp import serpapi_search
+from tools.serp import serpapi_search, serpapi_search_many
 
 from services import model_service
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 # Tech Researcher: Focuses on AI and ML trends.
 tech_researcher = LlmAgent(
     name="TechResearcher",
     model=model,
     instruction="""Research the latest AI/ML trends. 
+                    Use serpapi_search_many to run all of your searches in a single call.
                     Include 3 key developments,
                     the main companies involved, and the potential impact. 
                     Keep the report very concise (100 words).""",
-    tools=[serpapi_search],
+    tools=[serpapi_search, serpapi_search_many],
     output_key="tech_research",
 )
 
@@ -30,10 +31,11 @@ health_researcher = LlmAgent(
     name="HealthResearcher",
     model=model,
     instruction=""" Research recent medical breakthroughs. 
+                    Use serpapi_search_many to run all of your searches in a single call.
                     Include 3 significant advances,
                     their practical applications, and estimated timelines. 
                     Keep the report concise (100 words).""",
-    tools=[serpapi_search],
+    tools=[serpapi_search, serpapi_search_many],
     output_key="health_research",
 )
 
@@ -44,10 +46,11 @@ finance_researcher = LlmAgent(
     name="FinanceResearcher",
     model=model,
     instruction="""Research current fintech trends. 
+                   Use serpapi_search_many to run all of your searches in a single call.
                    Include 3 key trends,
                    their market implications, 
                    and the future outlook. Keep the report concise (100 words).""",
-    tools=[serpapi_search],
+    tools=[serpapi_search, serpapi_search_many],
     output_key="finance_research",  # The result will be stored with this key.
 )
 
@@ -1,16 +1,15 @@
 import asyncio
-import sqlite3
 
 from google.adk import Runner
 from google.adk.agents import LlmAgent
-from google.adk.sessions.database_session_service import DatabaseSessionService
-from google.genai import types
 
-from services import model_service
+from services import model_service, stream_session
+from services.session_cache import TieredSessionService
+from services.sqlite_store import SQLiteSessionService, iter_stored_events
 
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 APP_NAME = "default"  # Application
 USER_ID = "default"  # User
@@ -26,8 +25,7 @@ root_agent = LlmAgent(
 
 # Step 2: Switch to DatabaseSessionService
 # SQLite database will be created automatically
-db_url = "sqlite+aiosqlite:///my_agent_data.db"  # Use async SQLite driver
-session_service = DatabaseSessionService(db_url=db_url)
+session_service = TieredSessionService(SQLiteSessionService("my_agent_data.db"))
 
 # Step 3: Create a new runner with persistent storage
 runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
@@ -43,48 +41,9 @@ async def run_session(
     user_queries: list[str] | str = None,
     session_name: str = "default",
 ):
-    print(f"\n ### Session: {session_name}")
-
-    # Get app name from the Runner
-    app_name = runner_instance.app_name
-
-    # Attempt to create a new session or retrieve an existing one
-    try:
-        session = await session_service.create_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-    except:
-        session = await session_service.get_session(
-            app_name=app_name, user_id=USER_ID, session_id=session_name
-        )
-
-    # Process queries if provided
-    if user_queries:
-        # Convert single query to list for uniform processing
-        if type(user_queries) == str:
-            user_queries = [user_queries]
-
-        # Process each query in the list sequentially
-        for query in user_queries:
-            print(f"\nUser > {query}")
-
-            # Convert the query string to the ADK Content format
-            query = types.Content(role="user", parts=[types.Part(text=query)])
-
-            # Stream the agent's response asynchronously
-            async for event in runner_instance.run_async(
-                user_id=USER_ID, session_id=session.id, new_message=query
-            ):
-                # Check if the event contains valid content
-                if event.content and event.content.parts:
-                    # Filter out empty or "None" responses before printing
-                    if (
-                        event.content.parts[0].text != "None"
-                        and event.content.parts[0].text
-                    ):
-                        print(f"{MODEL_NAME} > ", event.content.parts[0].text)
-    else:
-        print("No queries!")
+    return await stream_session(
+        runner_instance, user_queries, session_name, user_id=USER_ID, author=MODEL_NAME
+    )
 
 
 async def main():
@@ -96,16 +55,15 @@ async def main():
         ],
         "stateful-agentic-session",
     )
+    # 退出前写入缓冲中的事件并释放连接，并打印缓存命中率和组提交的批次统计
+    await session_service.close()
+    print(f"⏱ session cache: {session_service.stats()}")
 
 def check_data_in_db():
-    with sqlite3.connect("my_agent_data.db") as connection:
-        cursor = connection.cursor()
-        result = cursor.execute(
-            "select app_name, session_id, author, content from events"
-        )
-        print([_[0] for _ in result.description])
-        for each in result.fetchall():
-            print(each)
+    # 分页读取，数据库再大也不会一次性加载整张events表
+    print(["app_name", "session_id", "author", "content"])
+    for event in iter_stored_events("my_agent_data.db", app_name=APP_NAME, include_data=True):
+        print((event["app_name"], event["session_id"], event["author"], event["content"]))
 
 if __name__ == "__main__":
     asyncio.run(main())
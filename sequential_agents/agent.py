@@ -9,7 +9,7 @@ from services import model_service
 # 选择要使用的模型（可以修改这个变量来切换模型）
 SELECTED_MODEL = "qwen3:30b"  # 这里可以改成任意可用的模型
 
-model = model_service.create_model(SELECTED_MODEL)
+model = model_service.create_model(SELECTED_MODEL, lazy=True)
 
 outline_agent = LlmAgent(
     name="OutlineAgent",
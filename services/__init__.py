@@ -1,7 +1,48 @@
 """
 服务模块 - 提供各种可复用的服务类
+
+导入本模块不会加载litellm和openai，它们在第一次真正构建模型时才被导入。
+会话存储（如services.group_commit）依赖SQLAlchemy，需要时从子模块导入。
 """
 
+from .cascade import CascadeLlm, accept_non_empty, accept_valid_tool_calls, all_of, confidence_acceptor
+from .concurrency import AdaptiveLimiter, LimitedLlm, LimiterConfig
+from .http_pool import HttpClientPool, HttpPoolConfig
+from .lazy_llm import LazyLlm
+from .load_balancer import BalancedLlm, LoadBalancer
+from .model_catalog import ModelCatalog, ModelInfo, http_fetcher, static_fetcher
 from .model_service import ModelService, model_service
+from .response_cache import CachedLlm, ResponseCache, request_fingerprint
+from .single_flight import SingleFlightLlm
+from .streaming_runner import TurnMetrics, stream_session, stream_turn
+from .wrapped_llm import WrappedLlm
 
-__all__ = ["ModelService", "model_service"]
\ No newline at end of file
+__all__ = [
+    "AdaptiveLimiter",
+    "BalancedLlm",
+    "CachedLlm",
+    "CascadeLlm",
+    "HttpClientPool",
+    "HttpPoolConfig",
+    "LazyLlm",
+    "LimitedLlm",
+    "LimiterConfig",
+    "LoadBalancer",
+    "ModelCatalog",
+    "ModelInfo",
+    "ModelService",
+    "ResponseCache",
+    "SingleFlightLlm",
+    "TurnMetrics",
+    "WrappedLlm",
+    "accept_non_empty",
+    "accept_valid_tool_calls",
+    "all_of",
+    "confidence_acceptor",
+    "http_fetcher",
+    "model_service",
+    "request_fingerprint",
+    "static_fetcher",
+    "stream_session",
+    "stream_turn",
+]
@@ -0,0 +1,186 @@
+"""
+模型级联 - 先用小模型回答，只有验收器拒绝时才升级到更大的模型
+"""
+
+import re
+from collections import Counter
+from typing import AsyncGenerator, Callable, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import ConfigDict, Field, PrivateAttr
+
+# 验收器：根据请求和某一级模型的完整响应判断是否接受该回答
+Acceptor = Callable[[LlmRequest, List[LlmResponse]], bool]
+
+# 表示模型不确定的常见措辞
+_HEDGE_PATTERN = re.compile(
+    r"(i('m| am) not sure|i don'?t know|cannot determine|"
+    r"不确定|不知道|无法确定|无法回答)",
+    re.IGNORECASE,
+)
+
+
+def _parts(responses: List[LlmResponse]) -> list:
+    return [
+        part
+        for response in responses
+        if response.content and response.content.parts
+        for part in response.content.parts
+    ]
+
+
+def accept_non_empty(llm_request: LlmRequest, responses: List[LlmResponse]) -> bool:
+    """拒绝出错、空文本且没有工具调用的回答"""
+    if not responses or any(response.error_code for response in responses):
+        return False
+    return any((part.text and part.text.strip()) or part.function_call for part in _parts(responses))
+
+
+def accept_valid_tool_calls(llm_request: LlmRequest, responses: List[LlmResponse]) -> bool:
+    """拒绝调用了不存在的工具或参数不是对象的回答"""
+    for part in _parts(responses):
+        call = part.function_call
+        if call is None:
+            continue
+        if not call.name or call.name not in llm_request.tools_dict:
+            return False
+        if call.args is not None and not isinstance(call.args, dict):
+            return False
+    return True
+
+
+def confidence_acceptor(min_avg_logprob: float = -1.0) -> Acceptor:
+    """
+    创建置信度验收器：有logprobs时按平均对数概率判断，否则检查是否含有不确定措辞
+
+    Args:
+        min_avg_logprob: 可接受的最低平均对数概率
+    """
+    def _accept(llm_request: LlmRequest, responses: List[LlmResponse]) -> bool:
+        logprobs = [response.avg_logprobs for response in responses if response.avg_logprobs is not None]
+        if logprobs:
+            return min(logprobs) >= min_avg_logprob
+        text = "".join(part.text for part in _parts(responses) if part.text and not part.thought)
+        return not _HEDGE_PATTERN.search(text)
+
+    return _accept
+
+
+def all_of(*acceptors: Acceptor) -> Acceptor:
+    """组合多个验收器，全部通过才接受"""
+    def _accept(llm_request: LlmRequest, responses: List[LlmResponse]) -> bool:
+        return all(acceptor(llm_request, responses) for acceptor in acceptors)
+
+    return _accept
+
+
+# 默认验收器：非空、工具调用合法、没有明显的不确定措辞
+default_acceptor = all_of(accept_non_empty, accept_valid_tool_calls, confidence_acceptor())
+
+
+class CascadeLlm(BaseLlm):
+    """按成本从低到高依次尝试多个模型，可直接传给LlmAgent(model=...)"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # 从小到大排列的模型
+    tiers: List[BaseLlm]
+    acceptor: Acceptor = Field(default=default_acceptor)
+
+    _served: Counter = PrivateAttr(default_factory=Counter)
+    _rejected: Counter = PrivateAttr(default_factory=Counter)
+    _failed: Counter = PrivateAttr(default_factory=Counter)
+    _last_tier: Optional[str] = PrivateAttr(default=None)
+
+    def __init__(self, tiers: List[BaseLlm], **kwargs):
+        """
+        初始化模型级联
+
+        Args:
+            tiers: 从小到大排列的模型，至少一个
+            acceptor: 验收器，默认为default_acceptor
+        """
+        if not tiers:
+            raise ValueError("级联至少需要一个模型")
+        kwargs.setdefault("model", tiers[0].model)
+        super().__init__(tiers=tiers, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self.tiers[0].capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        last_index = len(self.tiers) - 1
+        for index, tier in enumerate(self.tiers):
+            # 每一级使用请求的浅拷贝，避免上一级对contents的修改影响下一级
+            tier_request = llm_request.model_copy(
+                update={"model": tier.model, "contents": list(llm_request.contents)}
+            )
+
+            if index == last_index:
+                # 最后一级无需验收，直接透传（流式请求可以边生成边输出）
+                self._record(self._served, tier.model)
+                async for response in tier.generate_content_async(tier_request, stream=stream):
+                    if not response.partial:
+                        self._tag(response, tier.model, index)
+                    yield response
+                return
+
+            try:
+                # 非最后一级必须拿到完整回答才能验收，因此不使用流式
+                responses = [
+                    response
+                    async for response in tier.generate_content_async(tier_request, stream=False)
+                ]
+            except Exception:
+                self._record(self._failed, tier.model)
+                continue
+
+            if not self.acceptor(tier_request, responses):
+                self._record(self._rejected, tier.model)
+                continue
+
+            self._record(self._served, tier.model)
+            for response in responses:
+                self._tag(response, tier.model, index)
+                yield response
+            return
+
+    def _record(self, counter: Counter, model_name: str):
+        counter[model_name] += 1
+        if counter is self._served:
+            self._last_tier = model_name
+
+    @staticmethod
+    def _tag(response: LlmResponse, model_name: str, index: int):
+        """在响应的custom_metadata中记录实际服务的模型"""
+        response.custom_metadata = {
+            **(response.custom_metadata or {}),
+            "cascade_tier": index,
+            "cascade_model": model_name,
+        }
+
+    @property
+    def last_tier(self) -> Optional[str]:
+        """最近一次调用实际服务的模型"""
+        return self._last_tier
+
+    def stats(self) -> dict:
+        """
+        获取各级模型的服务统计
+
+        Returns:
+            dict: {模型名称: {"served": 次数, "rejected": 次数, "failed": 次数}}
+        """
+        return {
+            tier.model: {
+                "served": self._served[tier.model],
+                "rejected": self._rejected[tier.model],
+                "failed": self._failed[tier.model],
+            }
+            for tier in self.tiers
+        }
@@ -0,0 +1,223 @@
+"""
+自适应并发限制 - 按模型和端点控制在途请求数，根据延迟和过载响应自动调整上限
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Deque, Dict, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .wrapped_llm import WrappedLlm
+
+# 视为端点过载的HTTP状态码
+OVERLOAD_STATUS_CODES = (429, 503)
+
+# 延迟指标：流式请求使用首包延迟，非流式请求使用每个输出token的平均耗时（否则回答越长越像拥塞）
+LATENCY_TTFT = "ttft"
+LATENCY_PER_TOKEN = "per_token"
+
+
+@dataclass(frozen=True)
+class LimiterConfig:
+    """并发限制配置（AIMD：无拥塞时加性增大，拥塞时乘性减小）"""
+
+    # 初始并发上限，默认与Ollama的OLLAMA_NUM_PARALLEL保持一致
+    initial_limit: int = field(default_factory=lambda: int(os.getenv("OLLAMA_NUM_PARALLEL") or 4))
+    min_limit: int = 1
+    max_limit: int = 32
+    # 拥塞时的缩减系数
+    backoff_ratio: float = 0.7
+    # 延迟（首包延迟或每token耗时）超过基线的多少倍视为拥塞
+    latency_tolerance: float = 2.0
+    # 基线延迟的平滑系数
+    baseline_alpha: float = 0.05
+    # 排队等待的最长时间（秒），None表示一直等待
+    queue_timeout: Optional[float] = 120.0
+
+
+class AdaptiveLimiter:
+    """AIMD并发限制器，超出上限的请求按到达顺序排队"""
+
+    def __init__(self, config: LimiterConfig = None):
+        """
+        初始化限制器
+
+        Args:
+            config: 限制器配置，默认使用LimiterConfig()
+        """
+        self.config = config or LimiterConfig()
+        self.limit = float(min(max(self.config.initial_limit, self.config.min_limit), self.config.max_limit))
+        self.in_flight = 0
+        # 每种延迟指标各自的基线
+        self.baselines: Dict[str, float] = {}
+
+        self.admitted = 0
+        self.timed_out = 0
+        self.overloads = 0
+        self.decreases = 0
+        self.max_queue_depth = 0
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def baseline_latency(self) -> Optional[float]:
+        """首包延迟的基线（秒）"""
+        return self.baselines.get(LATENCY_TTFT)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(int(self.limit), self.config.min_limit)
+
+    def _wake(self):
+        """把空出的名额按顺序交给排队的请求"""
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    async def acquire(self, timeout: Optional[float] = ...) -> float:
+        """
+        获取一个并发名额
+
+        Args:
+            timeout: 排队超时（秒），默认使用配置中的queue_timeout
+
+        Returns:
+            float: 排队等待的时间（秒）
+
+        Raises:
+            TimeoutError: 排队超过截止时间
+        """
+        if timeout is ...:
+            timeout = self.config.queue_timeout
+
+        start = time.monotonic()
+        if self._has_capacity() and not self.queue_depth:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # 超时的同时恰好拿到了名额，需要归还
+                    self.in_flight -= 1
+                    self._wake()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timed_out += 1
+                    raise TimeoutError(
+                        f"并发排队超时: 等待 {timeout}s 后仍未获得名额（当前上限 {int(self.limit)}）"
+                    ) from None
+                raise
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self._wait_times.append(waited)
+        return waited
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, metric: str = LATENCY_TTFT):
+        """
+        归还名额，并根据本次请求的结果调整上限
+
+        Args:
+            latency: 延迟（秒），含义由metric决定，请求失败时为None
+            overloaded: 端点是否返回了过载（429/503）
+            metric: 延迟指标，LATENCY_TTFT或LATENCY_PER_TOKEN，只与同一指标的基线比较
+        """
+        self.in_flight -= 1
+
+        if overloaded:
+            self.overloads += 1
+            self._decrease()
+        elif latency is not None:
+            baseline = self.baselines.get(metric)
+            if baseline is not None and latency > baseline * self.config.latency_tolerance:
+                self._decrease()
+            else:
+                # 加性增大：大约每完成limit个请求上限加1
+                self.limit = min(self.limit + 1.0 / self.limit, float(self.config.max_limit))
+            alpha = self.config.baseline_alpha
+            self.baselines[metric] = latency if baseline is None else (1 - alpha) * baseline + alpha * latency
+
+        self._wake()
+
+    def _decrease(self):
+        self.limit = max(self.limit * self.config.backoff_ratio, float(self.config.min_limit))
+        self.decreases += 1
+
+    def stats(self) -> Dict:
+        """获取限制器指标"""
+        waits = sorted(self._wait_times)
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "timed_out": self.timed_out,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+            "baseline_latency": self.baseline_latency,
+            "baseline_token_latency": self.baselines.get(LATENCY_PER_TOKEN),
+            "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "max_wait": waits[-1] if waits else 0.0,
+        }
+
+
+def _output_tokens(response: LlmResponse) -> int:
+    """响应的输出token数，没有usage_metadata时按文本长度估算（约4个字符一个token）"""
+    usage = response.usage_metadata
+    if usage is not None and usage.candidates_token_count:
+        return usage.candidates_token_count
+    parts = response.content.parts if response.content and response.content.parts else []
+    return max(sum(len(part.text or "") for part in parts) // 4, 1)
+
+
+def _is_overload(error: BaseException) -> bool:
+    """判断异常是否为端点过载（litellm/openai异常都带有status_code）"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code in OVERLOAD_STATUS_CODES
+
+
+class LimitedLlm(WrappedLlm):
+    """在调用模型前先向限制器申请名额"""
+
+    limiter: AdaptiveLimiter
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await self.limiter.acquire()
+        start = time.monotonic()
+        latency = None
+        overloaded = False
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                if stream:
+                    if latency is None:
+                        latency = time.monotonic() - start
+                else:
+                    # 非流式响应到达时生成已经结束，按输出token数归一化
+                    latency = (time.monotonic() - start) / _output_tokens(response)
+                yield response
+        except Exception as e:
+            overloaded = _is_overload(e)
+            raise
+        finally:
+            self.limiter.release(latency=latency, overloaded=overloaded,
+                                 metric=LATENCY_TTFT if stream else LATENCY_PER_TOKEN)
@@ -0,0 +1,349 @@
+"""
+组提交会话存储 - 缓冲追加的事件，攒够N条或等待T毫秒后在一个事务中批量写入，减少SQLite单写者的争用
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from google.adk.errors._stale_session_error import StaleSessionError
+from google.adk.errors.session_not_found_error import SessionNotFoundError
+from google.adk.events import Event
+from google.adk.sessions import _session_util
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.database_session_service import DatabaseSessionService
+from google.adk.sessions.session import Session
+
+# 持久性级别
+# commit: append_event等到所在批次提交后才返回（并发的追加共享一次提交）
+# buffer: append_event立即返回，由后台定时批量写入；进程崩溃时最多丢失max_delay内的事件
+DURABILITY_COMMIT = "commit"
+DURABILITY_BUFFER = "buffer"
+
+
+@dataclass(frozen=True)
+class GroupCommitConfig:
+    """组提交配置"""
+
+    # 攒够多少条事件立即提交
+    max_batch: int = 32
+    # 第一条事件进入缓冲后最多等待多久提交（秒）
+    max_delay: float = 0.02
+    # 持久性级别，DURABILITY_COMMIT或DURABILITY_BUFFER
+    durability: str = DURABILITY_COMMIT
+
+    @classmethod
+    def from_env(cls) -> "GroupCommitConfig":
+        """
+        根据环境变量创建配置
+
+        环境变量:
+            SESSION_FLUSH_BATCH: 每批最多事件数
+            SESSION_FLUSH_MS: 最长等待时间（毫秒）
+            SESSION_DURABILITY: commit或buffer
+        """
+        batch = os.getenv("SESSION_FLUSH_BATCH")
+        delay_ms = os.getenv("SESSION_FLUSH_MS")
+        return cls(
+            max_batch=int(batch) if batch else cls.max_batch,
+            max_delay=float(delay_ms) / 1000 if delay_ms else cls.max_delay,
+            durability=os.getenv("SESSION_DURABILITY") or cls.durability,
+        )
+
+
+@dataclass
+class _PendingEvent:
+    session: Session
+    event: Event
+    state_deltas: Dict[str, Dict[str, Any]]
+    # 所在批次提交（或被拒绝）时完成
+    done: asyncio.Future
+
+
+class GroupCommitSessionService(DatabaseSessionService):
+    """
+    带写缓冲的DatabaseSessionService
+
+    事件先进入内存缓冲，由后台按批次在一个事务中写入。读取会话前会先提交缓冲中的事件，
+    保证读到自己写入的内容；Runner.close()会调用flush()，close()会在释放连接前提交剩余事件。
+    """
+
+    def __init__(self, db_url: str = None, config: GroupCommitConfig = None, **kwargs):
+        """
+        初始化会话存储
+
+        Args:
+            db_url: 数据库地址，如 sqlite+aiosqlite:///my_agent_data.db
+            config: 组提交配置，默认根据环境变量创建
+            **kwargs: 传给DatabaseSessionService的其他参数（如db_engine）
+        """
+        super().__init__(db_url=db_url, **kwargs)
+        self.config = config or GroupCommitConfig.from_env()
+        if self.config.durability not in (DURABILITY_COMMIT, DURABILITY_BUFFER):
+            raise ValueError(f"未知的持久性级别: {self.config.durability}")
+
+        self.batches = 0
+        self.events_written = 0
+        self.failed_batches = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=1000)
+        self._commit_times: Deque[float] = deque(maxlen=1000)
+
+        self._pending: List[_PendingEvent] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_queued = False
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._flush_error: Optional[BaseException] = None
+
+    def _raise_flush_error(self):
+        """buffer模式下后台提交失败时，把错误抛给下一次调用方"""
+        error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise error
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._flush_queued:
+            self._flush_queued = True
+            task = asyncio.ensure_future(self._flush_pending())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _on_timer(self):
+        self._timer = None
+        self._schedule_flush()
+
+    async def _flush_pending(self):
+        """提交当前缓冲中的所有事件，每个事务最多max_batch条（同一时间只有一个批次在提交）"""
+        async with self._flush_lock:
+            self._flush_queued = False
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, []
+            for offset in range(0, len(pending), self.config.max_batch):
+                await self._commit_batch(pending[offset:offset + self.config.max_batch])
+
+    async def _commit_batch(self, batch: List[_PendingEvent]):
+        start = time.monotonic()
+        try:
+            errors = await self._write_batch(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            errors = await self._write_sessions_separately(batch, e)
+        written = len(batch) - len(errors)
+        if written:
+            self.batches += 1
+            self.events_written += written
+            self._batch_sizes.append(written)
+            self._commit_times.append(time.monotonic() - start)
+
+        for pending in batch:
+            error = errors.get(id(pending))
+            if error is None:
+                pending.done.set_result(None)
+            elif self.config.durability == DURABILITY_BUFFER:
+                # 没有调用方在等待，错误留给下一次调用
+                self._flush_error = error
+                pending.done.set_result(None)
+            else:
+                pending.done.set_exception(error)
+
+    async def _write_sessions_separately(self, batch: List[_PendingEvent],
+                                         error: Exception) -> Dict[int, Exception]:
+        """
+        批次事务失败后按会话拆开重新提交，只有出错的会话中的事件被拒绝
+
+        Args:
+            batch: 提交失败的批次（事务已回滚）
+            error: 批次失败的原因
+
+        Returns:
+            Dict[int, Exception]: 被拒绝的事件及原因
+        """
+        groups: Dict[tuple, List[_PendingEvent]] = {}
+        for pending in batch:
+            session = pending.session
+            groups.setdefault((session.app_name, session.user_id, session.id), []).append(pending)
+        if len(groups) == 1:
+            return {id(pending): error for pending in batch}
+
+        errors = {}
+        for group in groups.values():
+            try:
+                errors.update(await self._write_batch(group))
+            except Exception as e:
+                errors.update({id(pending): e for pending in group})
+        return errors
+
+    async def _is_current(self, sql_session, schema, session: Session, storage_session) -> bool:
+        """与DatabaseSessionService.append_event相同的过期检查，没有版本标记时比较更新时间和最后一条事件"""
+        marker = session._storage_update_marker
+        if marker is not None:
+            return marker == storage_session.get_update_marker()
+        if storage_session.get_update_timestamp() <= session.last_update_time:
+            return True
+        return await self._session_matches_storage_revision(sql_session=sql_session, schema=schema, session=session)
+
+    async def _write_batch(self, batch: List[_PendingEvent]) -> Dict[int, Exception]:
+        """
+        在一个事务中写入一批事件，并更新会话、应用和用户状态
+
+        Returns:
+            Dict[int, Exception]: 被拒绝的事件（键为id(_PendingEvent)）及原因，其余事件已提交
+        """
+        schema = self._get_schema_classes()
+        # 每个会话在本批次中的存储记录，以及唯一允许写入它的Session对象
+        storage_sessions = {}
+        app_states = {}
+        user_states = {}
+        writers = {}
+        stale_writers = set()
+        errors = {}
+        async with self._rollback_on_exception_session() as sql_session:
+            for pending in batch:
+                session = pending.session
+                key = (session.app_name, session.user_id, session.id)
+                if key not in storage_sessions:
+                    storage_sessions[key] = await sql_session.get(schema.StorageSession, key)
+                storage_session = storage_sessions[key]
+                if storage_session is None:
+                    errors[id(pending)] = SessionNotFoundError(f"Session {session.id} not found.")
+                    continue
+
+                if key not in writers and id(session) not in stale_writers:
+                    if await self._is_current(sql_session, schema, session, storage_session):
+                        writers[key] = session
+                    else:
+                        stale_writers.add(id(session))
+                # 被拒绝的Session对象，或同一批次中另一个没有看到前面事件的Session对象
+                if writers.get(key) is not session:
+                    errors[id(pending)] = StaleSessionError("会话在加载后已被其他写入者修改，请重新加载会话后再追加事件")
+                    continue
+
+                deltas = pending.state_deltas
+                if deltas["app"]:
+                    app_key = session.app_name
+                    if app_key not in app_states:
+                        app_states[app_key] = await sql_session.get(schema.StorageAppState, app_key)
+                        if app_states[app_key] is None:
+                            # 状态行通常由create_session创建，缺失时（如直接写入的会话）补上
+                            app_states[app_key] = schema.StorageAppState(app_name=app_key, state={})
+                            sql_session.add(app_states[app_key])
+                    app_states[app_key].state.update(deltas["app"])
+                if deltas["user"]:
+                    user_key = (session.app_name, session.user_id)
+                    if user_key not in user_states:
+                        user_states[user_key] = await sql_session.get(schema.StorageUserState, user_key)
+                        if user_states[user_key] is None:
+                            user_states[user_key] = schema.StorageUserState(
+                                app_name=session.app_name, user_id=session.user_id, state={})
+                            sql_session.add(user_states[user_key])
+                    user_states[user_key].state.update(deltas["user"])
+                if deltas["session"]:
+                    storage_session.state.update(deltas["session"])
+
+                update_time = datetime.fromtimestamp(pending.event.timestamp, timezone.utc)
+                if self._uses_naive_datetime():
+                    update_time = update_time.replace(tzinfo=None)
+                storage_session.update_time = update_time
+                sql_session.add(schema.StorageEvent.from_event(session, pending.event))
+
+            # 提交前读取版本信息，避免提交后访问过期属性触发延迟加载
+            revisions = {
+                key: (storage_sessions[key].get_update_timestamp(), storage_sessions[key].get_update_marker())
+                for key in writers
+            }
+            await sql_session.commit()
+
+        for key, session in writers.items():
+            session.last_update_time, session._storage_update_marker = revisions[key]
+        return errors
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        await self.prepare_tables()
+        if event.partial:
+            return event
+        self._raise_flush_error()
+
+        self._apply_temp_state(session, event)
+        event = self._trim_temp_delta_state(event)
+        state_delta = event.actions.state_delta if event.actions.state_delta else {}
+        loop = asyncio.get_running_loop()
+        pending = _PendingEvent(session, event, _session_util.extract_json_safe_state_delta(state_delta),
+                                loop.create_future())
+        self._pending.append(pending)
+        if len(self._pending) >= self.config.max_batch:
+            self._schedule_flush()
+        elif self._timer is None and not self._flush_queued:
+            self._timer = loop.call_later(self.config.max_delay, self._on_timer)
+
+        if self.config.durability == DURABILITY_COMMIT:
+            # shield: 调用方被取消时不影响同一批次的其他事件
+            await asyncio.shield(pending.done)
+        # 更新内存中的会话，后续的agent在同一次调用中可以立即读到
+        return self._commit_event_to_session(session, event)
+
+    async def flush(self) -> None:
+        """
+        立即提交缓冲中的所有事件
+
+        Raises:
+            Exception: buffer模式下之前的后台提交失败
+        """
+        if self._pending or self._flush_lock.locked():
+            await self._flush_pending()
+        self._raise_flush_error()
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        # 缓冲中可能有用户/应用状态的修改，先提交保证读到最新状态
+        await self.flush()
+        return await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        await self.flush()
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        return await super().list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self.flush()
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        await self.flush()
+        return await super().get_user_state(app_name=app_name, user_id=user_id)
+
+    async def close(self) -> None:
+        """提交剩余事件后释放数据库连接"""
+        try:
+            await self.flush()
+        finally:
+            await super().close()
+
+    def stats(self) -> Dict:
+        """获取组提交统计（批次大小和提交耗时基于最近1000个批次）"""
+        sizes = sorted(self._batch_sizes)
+        commit_times = sorted(self._commit_times)
+        return {
+            "durability": self.config.durability,
+            "batches": self.batches,
+            "events": self.events_written,
+            "failed_batches": self.failed_batches,
+            "pending": len(self._pending),
+            "avg_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "p50_batch_size": sizes[len(sizes) // 2] if sizes else 0,
+            "max_batch_size": sizes[-1] if sizes else 0,
+            "avg_commit_time": sum(commit_times) / len(commit_times) if commit_times else 0.0,
+            "p95_commit_time": commit_times[int(len(commit_times) * 0.95)] if commit_times else 0.0,
+        }
@@ -0,0 +1,239 @@
+"""
+HTTP连接池 - 为同一api_base下的所有模型共享keep-alive连接
+"""
+
+import asyncio
+import importlib.util
+import threading
+import warnings
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict
+
+import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """连接池配置"""
+
+    # 单个api_base允许的最大并发连接数
+    max_connections: int = 32
+    # 保持空闲可复用的最大连接数
+    max_keepalive_connections: int = 16
+    # 空闲连接的保活时间（秒）
+    keepalive_expiry: float = 60.0
+    # 是否启用HTTP/2（需要安装h2）
+    http2: bool = False
+    # 单次请求超时时间（秒），本地大模型生成较慢，默认放宽
+    timeout: float = 600.0
+    # 从连接池获取连接的等待超时（秒）
+    pool_timeout: float = 30.0
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """包装响应流，在流关闭时通知连接池统计"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """
+    记录在途请求数的传输层，请求从发出到响应流关闭都计为占用
+
+    httpcore的连接绑定在创建它的事件循环上，而客户端在构建模型时创建、可能跨多次asyncio.run使用，
+    因此每个事件循环各用一个底层连接池，循环关闭后丢弃对应的连接池。
+    """
+
+    def __init__(self, config: HttpPoolConfig):
+        self._config = config
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.failed_requests = 0
+
+    def _release(self):
+        self.in_flight -= 1
+
+    def _current_transport(self) -> httpx.AsyncHTTPTransport:
+        """获取当前事件循环的底层连接池，不存在时创建"""
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            for other in [other for other in self._transports if other.is_closed()]:
+                del self._transports[other]
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(
+                http2=self._config.http2,
+                limits=httpx.Limits(
+                    max_connections=self._config.max_connections,
+                    max_keepalive_connections=self._config.max_keepalive_connections,
+                    keepalive_expiry=self._config.keepalive_expiry,
+                ),
+            )
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self._current_transport()
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await transport.handle_async_request(request)
+        except BaseException:
+            self.failed_requests += 1
+            self._release()
+            raise
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, self._release),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    def connection_stats(self) -> Dict[str, int]:
+        """读取底层httpcore连接池的连接状态（尽力而为，合计所有未关闭的事件循环）"""
+        connections = []
+        for loop, transport in list(self._transports.items()):
+            if not loop.is_closed():
+                pool = getattr(transport, "_pool", None)
+                connections.extend(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)())
+        return {
+            "open_connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+        }
+
+    async def aclose(self):
+        """关闭当前事件循环的连接，其他事件循环的连接池直接丢弃"""
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        self._transports.clear()
+        if transport is not None:
+            await transport.aclose()
+
+
+class HttpClientPool:
+    """按api_base复用的异步HTTP客户端池"""
+
+    def __init__(self, config: HttpPoolConfig = None):
+        """
+        初始化连接池
+
+        Args:
+            config: 连接池配置，默认使用HttpPoolConfig()
+        """
+        self.config = config or HttpPoolConfig()
+        if self.config.http2 and importlib.util.find_spec("h2") is None:
+            warnings.warn("未安装h2，HTTP/2已自动降级为HTTP/1.1（pip install httpx[http2]）")
+            self.config = HttpPoolConfig(**{**self.config.__dict__, "http2": False})
+
+        self._lock = threading.Lock()
+        self._transports: Dict[str, _CountingTransport] = {}
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+        self._openai_clients: Dict[tuple, "AsyncOpenAI"] = {}
+
+    def get_http_client(self, api_base: str) -> httpx.AsyncClient:
+        """
+        获取api_base对应的共享httpx客户端
+
+        Args:
+            api_base: API基础URL
+
+        Returns:
+            httpx.AsyncClient: 该api_base共享的客户端
+        """
+        with self._lock:
+            client = self._http_clients.get(api_base)
+            if client is None:
+                transport = _CountingTransport(self.config)
+                client = httpx.AsyncClient(
+                    transport=transport,
+                    timeout=httpx.Timeout(self.config.timeout, pool=self.config.pool_timeout),
+                )
+                self._transports[api_base] = transport
+                self._http_clients[api_base] = client
+            return client
+
+    def get_client(self, api_base: str, api_key: str) -> "AsyncOpenAI":
+        """
+        获取共享连接池的OpenAI兼容客户端，可直接作为litellm的client参数
+
+        Args:
+            api_base: API基础URL
+            api_key: API密钥
+
+        Returns:
+            AsyncOpenAI: 复用底层连接池的客户端
+        """
+        # openai导入较慢，延迟到真正构建模型时再导入
+        from openai import AsyncOpenAI
+
+        http_client = self.get_http_client(api_base)
+        key = (api_base, api_key)
+        with self._lock:
+            client = self._openai_clients.get(key)
+            if client is None:
+                client = AsyncOpenAI(
+                    base_url=api_base,
+                    api_key=api_key,
+                    http_client=http_client,
+                )
+                self._openai_clients[key] = client
+            return client
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        获取每个api_base的连接池占用情况
+
+        Returns:
+            Dict: {api_base: {in_flight, peak_in_flight, max_connections, utilization, ...}}
+        """
+        with self._lock:
+            transports = dict(self._transports)
+
+        result = {}
+        for api_base, transport in transports.items():
+            result[api_base] = {
+                "in_flight": transport.in_flight,
+                "peak_in_flight": transport.peak_in_flight,
+                "total_requests": transport.total_requests,
+                "failed_requests": transport.failed_requests,
+                "max_connections": self.config.max_connections,
+                "utilization": transport.in_flight / self.config.max_connections,
+                **transport.connection_stats(),
+            }
+        return result
+
+    async def aclose(self):
+        """关闭所有连接"""
+        with self._lock:
+            clients = list(self._http_clients.values())
+            self._http_clients.clear()
+            self._transports.clear()
+            self._openai_clients.clear()
+
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,48 @@
+"""
+延迟构建的模型 - 导入agent模块时不创建真正的模型，首次调用时才构建
+"""
+
+import threading
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import ConfigDict, PrivateAttr
+
+
+class LazyLlm(BaseLlm):
+    """模型代理，第一次使用时才调用factory构建真正的模型（以及导入litellm）"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # 构建真正模型的工厂函数
+    factory: Callable[[], BaseLlm]
+
+    _resolved: Optional[BaseLlm] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._resolved is not None
+
+    def resolve(self) -> BaseLlm:
+        """构建（或返回已构建的）真正模型"""
+        if self._resolved is None:
+            with self._lock:
+                if self._resolved is None:
+                    self._resolved = self.factory()
+        return self._resolved
+
+    @property
+    def capabilities(self):
+        return self.resolve().capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in self.resolve().generate_content_async(llm_request, stream=stream):
+            yield response
+
+    def connect(self, llm_request: LlmRequest):
+        return self.resolve().connect(llm_request)
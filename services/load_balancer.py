@@ -0,0 +1,258 @@
+"""
+多端点负载均衡 - 把同一模型的请求分摊到多台Ollama主机
+"""
+
+import asyncio
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable, Dict, List, Optional
+
+import httpx
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import ConfigDict
+
+
+# 视为端点故障的HTTP状态码（请求超时、过载和服务端错误），其他4xx是请求本身的问题
+ENDPOINT_FAILURE_STATUS_CODES = (408, 429)
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """
+    判断异常是否说明端点本身有问题（连接失败、传输超时、429/5xx），只有这类异常计入端点健康状态
+
+    本地并发排队超时（TimeoutError）、请求参数错误和调用方取消都与端点健康无关。
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status_code, int):
+        return status_code >= 500 or status_code in ENDPOINT_FAILURE_STATUS_CODES
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    # openai较慢，只在已被导入时检查它的连接错误（APITimeoutError是其子类）
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, openai.APIConnectionError)
+
+
+@dataclass
+class Endpoint:
+    """单个模型端点的运行状态"""
+
+    api_base: str
+    outstanding: int = 0
+    total_requests: int = 0
+    total_failures: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+
+class LoadBalancer:
+    """按最少在途请求选择端点，并通过健康检查摘除故障端点"""
+
+    # 默认配置
+    DEFAULT_FAILURE_THRESHOLD = 3
+    DEFAULT_EJECTION_TIME = 30.0
+    DEFAULT_HEALTH_CHECK_INTERVAL = 10.0
+    DEFAULT_HEALTH_CHECK_TIMEOUT = 5.0
+
+    def __init__(self, client_factory: Callable[[str], httpx.AsyncClient] = None,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 ejection_time: float = DEFAULT_EJECTION_TIME,
+                 health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+                 health_check_timeout: float = DEFAULT_HEALTH_CHECK_TIMEOUT):
+        """
+        初始化负载均衡器
+
+        Args:
+            client_factory: 根据api_base返回健康检查使用的HTTP客户端，默认每次临时创建
+            failure_threshold: 连续失败多少次后摘除端点
+            ejection_time: 端点被摘除的时长（秒），到期后重新参与调度
+            health_check_interval: 健康检查间隔（秒）
+            health_check_timeout: 单次健康检查超时（秒）
+        """
+        self.client_factory = client_factory
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+
+        self._endpoints: Dict[str, Endpoint] = {}
+        self._health_task: Optional[asyncio.Task] = None
+
+    def register(self, api_bases: List[str]) -> List[Endpoint]:
+        """注册端点，同一api_base在多个模型之间共享状态"""
+        endpoints = []
+        for api_base in api_bases:
+            endpoint = self._endpoints.get(api_base)
+            if endpoint is None:
+                endpoint = self._endpoints[api_base] = Endpoint(api_base=api_base)
+            endpoints.append(endpoint)
+        return endpoints
+
+    def pick(self, api_bases: List[str], exclude: set = None) -> Optional[Endpoint]:
+        """
+        选择在途请求最少的健康端点
+
+        Args:
+            api_bases: 候选端点
+            exclude: 本次请求已经失败过的端点
+
+        Returns:
+            Optional[Endpoint]: 选中的端点；候选全部尝试过时返回None
+        """
+        candidates = [ep for ep in self.register(api_bases) if ep.api_base not in (exclude or ())]
+        if not candidates:
+            return None
+
+        # 全部被摘除时仍然尝试，优先选择最早恢复的端点
+        healthy = [ep for ep in candidates if ep.healthy]
+        if not healthy:
+            return min(candidates, key=lambda ep: ep.ejected_until)
+
+        fewest = min(ep.outstanding for ep in healthy)
+        return random.choice([ep for ep in healthy if ep.outstanding == fewest])
+
+    def on_start(self, endpoint: Endpoint):
+        endpoint.outstanding += 1
+        endpoint.total_requests += 1
+
+    def on_finish(self, endpoint: Endpoint, success: Optional[bool]):
+        """
+        记录请求结束
+
+        Args:
+            endpoint: 端点
+            success: 是否成功；None表示结果与端点健康无关（如调用方取消、本地排队超时）
+        """
+        endpoint.outstanding -= 1
+        if success is None:
+            return
+        if success:
+            endpoint.consecutive_failures = 0
+            return
+
+        endpoint.total_failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.failure_threshold:
+            self.eject(endpoint)
+
+    def eject(self, endpoint: Endpoint):
+        """摘除端点一段时间"""
+        endpoint.ejected_until = time.monotonic() + self.ejection_time
+
+    async def check_health(self, endpoint: Endpoint) -> bool:
+        """请求 /models 判断端点是否可用"""
+        owned = self.client_factory is None
+        client = httpx.AsyncClient() if owned else self.client_factory(endpoint.api_base)
+        try:
+            response = await client.get(
+                f"{endpoint.api_base.rstrip('/')}/models", timeout=self.health_check_timeout
+            )
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        finally:
+            if owned:
+                await client.aclose()
+
+        if ok:
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+        else:
+            self.eject(endpoint)
+        return ok
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.gather(
+                *[self.check_health(ep) for ep in list(self._endpoints.values())],
+                return_exceptions=True,
+            )
+            await asyncio.sleep(self.health_check_interval)
+
+    def ensure_health_checks(self):
+        """在当前事件循环中启动周期性健康检查（已启动则忽略）"""
+        if self._health_task is not None and not self._health_task.done():
+            return
+        if self.health_check_interval <= 0:
+            return
+        self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    def stop_health_checks(self):
+        """停止健康检查"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def stats(self) -> Dict[str, Dict]:
+        """获取各端点的调度统计"""
+        return {
+            api_base: {
+                "healthy": ep.healthy,
+                "outstanding": ep.outstanding,
+                "total_requests": ep.total_requests,
+                "total_failures": ep.total_failures,
+                "consecutive_failures": ep.consecutive_failures,
+            }
+            for api_base, ep in self._endpoints.items()
+        }
+
+
+class BalancedLlm(BaseLlm):
+    """把请求分发到多个端点的模型，端点失败时自动切换到下一个"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # 每个api_base对应一个底层模型实例
+    endpoint_models: Dict[str, BaseLlm]
+    balancer: LoadBalancer
+
+    @property
+    def capabilities(self):
+        return next(iter(self.endpoint_models.values())).capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.balancer.ensure_health_checks()
+        api_bases = list(self.endpoint_models)
+        tried = set()
+
+        while True:
+            endpoint = self.balancer.pick(api_bases, exclude=tried)
+            tried.add(endpoint.api_base)
+            model = self.endpoint_models[endpoint.api_base]
+
+            self.balancer.on_start(endpoint)
+            yielded = False
+            failed = False
+            # None表示本次结果不计入端点健康状态（调用方取消或提前停止迭代时保持None）
+            success = None
+            try:
+                async for response in model.generate_content_async(llm_request, stream=stream):
+                    yielded = True
+                    yield response
+                success = True
+            except Exception as e:
+                failed = True
+                endpoint_failure = is_endpoint_failure(e)
+                if endpoint_failure:
+                    success = False
+                # 已经向调用方输出过内容时不能重试，否则会产生重复的片段；
+                # 只有端点故障或该端点排队超时时才换下一个端点，请求本身的错误换端点也不会成功
+                retryable = endpoint_failure or isinstance(e, TimeoutError)
+                if yielded or not retryable or len(tried) == len(api_bases):
+                    raise
+            finally:
+                self.balancer.on_finish(endpoint, success=success)
+
+            if not failed:
+                return
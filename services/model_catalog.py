@@ -0,0 +1,239 @@
+"""
+模型目录 - 从OpenAI兼容的 /v1/models 接口发现可用模型，并按TTL缓存
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+# 返回原始模型条目列表的异步函数，测试时可替换为假端点
+ModelFetcher = Callable[[], Awaitable[List[Dict]]]
+
+
+@dataclass(frozen=True)
+class ModelInfo:
+    """模型元数据"""
+
+    id: str
+    owned_by: str = ""
+    context_length: Optional[int] = None
+    quantization: Optional[str] = None
+    parameter_size: Optional[str] = None
+    raw: Dict = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_entry(cls, entry: Dict) -> "ModelInfo":
+        """解析 /v1/models 的单个条目，兼容Ollama、vLLM等不同实现的字段名"""
+        details = entry.get("details") or {}
+        context_length = (
+            entry.get("context_length")
+            or entry.get("max_model_len")
+            or entry.get("context_window")
+            or details.get("context_length")
+        )
+        return cls(
+            id=entry.get("id") or entry.get("name") or entry.get("model"),
+            owned_by=entry.get("owned_by", ""),
+            context_length=int(context_length) if context_length else None,
+            quantization=entry.get("quantization") or details.get("quantization_level"),
+            parameter_size=entry.get("parameter_size") or details.get("parameter_size"),
+            raw=entry,
+        )
+
+
+def http_fetcher(api_base: str, api_key: str = None,
+                 client_factory: Callable[[str], httpx.AsyncClient] = None,
+                 timeout: float = 5.0) -> ModelFetcher:
+    """
+    创建查询 {api_base}/models 的fetcher；对Ollama额外读取 /api/tags 补充量化和参数量信息
+
+    Args:
+        api_base: OpenAI兼容接口地址，如 http://localhost:11434/v1
+        api_key: API密钥
+        client_factory: 根据api_base返回共享HTTP客户端，默认每次临时创建
+        timeout: 请求超时（秒）
+    """
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    base = api_base.rstrip("/")
+
+    async def _fetch() -> List[Dict]:
+        owned = client_factory is None
+        client = httpx.AsyncClient() if owned else client_factory(api_base)
+        try:
+            response = await client.get(f"{base}/models", headers=headers, timeout=timeout)
+            response.raise_for_status()
+            entries = response.json().get("data", [])
+
+            # Ollama原生接口提供量化级别和参数量，失败时忽略
+            if base.endswith("/v1"):
+                try:
+                    tags = await client.get(f"{base[:-3]}/api/tags", timeout=timeout)
+                    details = {item.get("name"): item.get("details") or {} for item in tags.json().get("models", [])}
+                    for entry in entries:
+                        if entry.get("id") in details:
+                            entry.setdefault("details", details[entry["id"]])
+                except (httpx.HTTPError, ValueError):
+                    pass
+            return entries
+        finally:
+            if owned:
+                await client.aclose()
+
+    return _fetch
+
+
+def static_fetcher(entries: Iterable) -> ModelFetcher:
+    """
+    创建返回固定数据的假端点，用于测试或离线环境
+
+    Args:
+        entries: 模型名称或 /v1/models 格式的条目
+    """
+    data = [{"id": entry} if isinstance(entry, str) else dict(entry) for entry in entries]
+
+    async def _fetch() -> List[Dict]:
+        return [dict(entry) for entry in data]
+
+    return _fetch
+
+
+class ModelCatalog:
+    """带TTL的模型目录，过期后在后台异步刷新，查询始终使用内存中的集合"""
+
+    DEFAULT_TTL = 300.0
+    # 刷新失败后等待多久再自动重试（秒），连续失败时加倍，最长不超过ttl
+    DEFAULT_RETRY_BACKOFF = 5.0
+
+    def __init__(self, fetcher: ModelFetcher, seed: Iterable[str] = (), ttl: float = DEFAULT_TTL,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF):
+        """
+        初始化模型目录
+
+        Args:
+            fetcher: 获取模型列表的异步函数，见http_fetcher / static_fetcher
+            seed: 兜底的模型列表，与刷新结果合并，端点不可用时仍然可用
+            ttl: 目录有效期（秒）
+            retry_backoff: 刷新失败后的首次重试间隔（秒）
+        """
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.retry_backoff = retry_backoff
+        self.last_error: Optional[str] = None
+        self.failures = 0
+
+        self._seed: Dict[str, ModelInfo] = {name: ModelInfo(id=name) for name in seed}
+        self._models: Dict[str, ModelInfo] = {}
+        self._names = frozenset(self._seed)
+        self._added: Dict[str, ModelInfo] = {}
+        self._removed: set = set()
+        self._fetched_at: Optional[float] = None
+        self._retry_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+
+    async def refresh(self) -> bool:
+        """
+        立即从端点刷新目录，失败时保留旧数据，并在退避时间内不再自动刷新
+
+        Returns:
+            bool: 刷新是否成功
+        """
+        try:
+            entries = await self.fetcher()
+        except Exception as e:
+            self.last_error = str(e)
+            self.failures += 1
+            backoff = min(self.retry_backoff * 2 ** (self.failures - 1), self.ttl)
+            self._retry_at = time.monotonic() + backoff
+            return False
+
+        models = {}
+        for entry in entries:
+            info = ModelInfo.from_entry(entry)
+            if info.id:
+                models[info.id] = info
+        self._models = models
+        self._fetched_at = time.monotonic()
+        self._rebuild()
+        self.last_error = None
+        self.failures = 0
+        self._retry_at = None
+        return True
+
+    def _rebuild(self):
+        self._names = frozenset((set(self._seed) | set(self._models) | set(self._added)) - self._removed)
+
+    def _maybe_refresh(self):
+        """目录过期且存在运行中的事件循环时，在后台刷新（不阻塞当前查询）；上次刷新失败时先等待退避时间"""
+        if not self.is_stale or (self._refresh_task is not None and not self._refresh_task.done()):
+            return
+        if self._retry_at is not None and time.monotonic() < self._retry_at:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refresh_task = loop.create_task(self.refresh())
+
+    def __contains__(self, model_name: str) -> bool:
+        self._maybe_refresh()
+        return model_name in self._names
+
+    def names(self) -> List[str]:
+        """获取所有可用模型名称"""
+        self._maybe_refresh()
+        return sorted(self._names)
+
+    def get(self, model_name: str) -> Optional[ModelInfo]:
+        """获取模型元数据"""
+        if model_name not in self:
+            return None
+        return (
+            self._added.get(model_name)
+            or self._models.get(model_name)
+            or self._seed.get(model_name)
+            or ModelInfo(id=model_name)
+        )
+
+    def find(self, min_context_length: int = None, quantization: str = None,
+             owned_by: str = None) -> List[ModelInfo]:
+        """
+        按能力筛选模型
+
+        Args:
+            min_context_length: 最小上下文长度（未知上下文长度的模型会被排除）
+            quantization: 量化级别，如 Q4_K_M
+            owned_by: 模型所有者
+
+        Returns:
+            List[ModelInfo]: 满足条件的模型，按上下文长度从大到小排列
+        """
+        matched = []
+        for name in self.names():
+            info = self.get(name)
+            if min_context_length is not None and (info.context_length or 0) < min_context_length:
+                continue
+            if quantization is not None and (info.quantization or "").lower() != quantization.lower():
+                continue
+            if owned_by is not None and info.owned_by != owned_by:
+                continue
+            matched.append(info)
+        return sorted(matched, key=lambda info: info.context_length or 0, reverse=True)
+
+    def add(self, model_name: str, **metadata):
+        """手动添加模型（不会被刷新覆盖）"""
+        self._added[model_name] = ModelInfo(id=model_name, **metadata)
+        self._removed.discard(model_name)
+        self._rebuild()
+
+    def remove(self, model_name: str):
+        """手动屏蔽模型（不会被刷新恢复）"""
+        self._added.pop(model_name, None)
+        self._removed.add(model_name)
+        self._rebuild()
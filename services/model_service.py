@@ -2,7 +2,25 @@
 模型服务类 - 提供统一的模型创建和管理功能
 """
 
-from google.adk.models.lite_llm import LiteLlm
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from .cascade import Acceptor, CascadeLlm
+from .concurrency import AdaptiveLimiter, LimitedLlm, LimiterConfig
+from .http_pool import HttpClientPool, HttpPoolConfig
+from .lazy_llm import LazyLlm
+from .load_balancer import BalancedLlm, LoadBalancer
+from .model_catalog import ModelCatalog, ModelInfo, http_fetcher
+from .response_cache import CachedLlm, ResponseCache
+from .single_flight import SingleFlightLlm
+from .wrapped_llm import WrappedLlm
 
 class ModelService:
     """模型服务类，提供统一的模型创建和管理"""
@@ -11,8 +29,12 @@ class ModelService:
     DEFAULT_API_BASE = "http://localhost:11434/v1"
     DEFAULT_PROVIDER = "openai"
     DEFAULT_API_KEY = "ollama"
+    DEFAULT_CACHE_SIZE = 32
 
-    # 可用的模型列表
+    # 预热时发送的提示词，只需触发Ollama加载权重
+    WARM_UP_PROMPT = "hi"
+
+    # 首次从 /v1/models 刷新目录前使用的模型列表
     AVAILABLE_MODELS = [
         "qwen3-coder:30b-a3b-fp16",
         "deepseek-v3.1:671b-cloud",
@@ -23,7 +45,12 @@ class ModelService:
         "gpt-oss:20b"
     ]
 
-    def __init__(self, api_base: str = None, provider: str = None, api_key: str = None):
+    def __init__(self, api_base: str = None, provider: str = None, api_key: str = None,
+                 pool_config: HttpPoolConfig = None, http_pool: HttpClientPool = None,
+                 cache_size: int = None, response_cache: ResponseCache = None,
+                 endpoints: Dict[str, List[str]] = None, load_balancer: LoadBalancer = None,
+                 single_flight: bool = None, limiter_config: LimiterConfig = None,
+                 adaptive_limit: bool = True, catalog: ModelCatalog = None):
         """
         初始化模型服务
 
@@ -31,47 +58,285 @@ class ModelService:
             api_base: API基础URL，默认为Ollama的OpenAI兼容接口
             provider: LLM提供商，默认为openai
             api_key: API密钥，Ollama不需要真实密钥但需要提供值
+            pool_config: 连接池配置（最大连接数、keep-alive、HTTP/2等）
+            http_pool: 共享的HTTP连接池，多个ModelService可以传入同一个实例
+            cache_size: 模型实例缓存的最大数量，超出后按LRU淘汰
+            response_cache: 模型响应缓存，默认根据LLM_CACHE_MODE环境变量决定是否启用
+            endpoints: 每个模型可用的多个api_base，如 {"qwen3:30b": ["http://gpu1:11434/v1", ...]}；
+                未配置的模型使用MODEL_API_BASES环境变量（逗号分隔）或api_base
+            load_balancer: 多端点调度器，默认按最少在途请求调度并定期健康检查
+            single_flight: 是否合并相同的并发请求，默认读取LLM_SINGLE_FLIGHT环境变量
+            limiter_config: 并发限制配置，默认初始上限取OLLAMA_NUM_PARALLEL
+            adaptive_limit: 是否按模型和端点启用自适应并发限制
+            catalog: 模型目录，默认查询api_base的 /v1/models，刷新前使用AVAILABLE_MODELS
         """
         self.api_base = api_base or self.DEFAULT_API_BASE
         self.provider = provider or self.DEFAULT_PROVIDER
         self.api_key = api_key or self.DEFAULT_API_KEY
+        self.http_pool = http_pool or HttpClientPool(pool_config)
+        self.cache_size = cache_size or self.DEFAULT_CACHE_SIZE
+        self._model_cache: "OrderedDict[tuple, BaseLlm]" = OrderedDict()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache.from_env()
+        self.endpoints = dict(endpoints or {})
+        self.default_endpoints = [base.strip() for base in os.getenv("MODEL_API_BASES", "").split(",") if base.strip()]
+        self.load_balancer = load_balancer or LoadBalancer(client_factory=self.http_pool.get_http_client)
+        if single_flight is None:
+            single_flight = os.getenv("LLM_SINGLE_FLIGHT", "").lower() in ("1", "true", "yes")
+        self.single_flight = single_flight
+        self.limiter_config = limiter_config or LimiterConfig()
+        self.adaptive_limit = adaptive_limit
+        self._limiters: Dict[tuple, AdaptiveLimiter] = {}
+        self.catalog = catalog or ModelCatalog(
+            fetcher=http_fetcher(self.api_base, self.api_key, client_factory=self.http_pool.get_http_client),
+            seed=self.AVAILABLE_MODELS,
+        )
 
-    def create_model(self, model_name: str) -> LiteLlm:
+    def _cache_key(self, model_name: str) -> tuple:
+        """模型实例缓存键，包含影响模型行为的全部配置"""
+        return (model_name, tuple(self.get_endpoints(model_name)), self.provider, self.api_key)
+
+    def get_endpoints(self, model_name: str) -> List[str]:
+        """获取模型可用的api_base列表"""
+        return self.endpoints.get(model_name) or self.default_endpoints or [self.api_base]
+
+    def set_endpoints(self, model_name: str, api_bases: List[str]):
         """
-        创建LiteLlm模型实例
+        为模型配置多个端点，请求会在这些端点之间负载均衡并自动故障切换
 
         Args:
-            model_name: 模型名称，必须是AVAILABLE_MODELS中的模型
+            model_name: 模型名称
+            api_bases: 端点列表
+        """
+        self.evict(model_name)
+        self.endpoints[model_name] = list(api_bases)
+
+    def create_model(self, model_name: str, lazy: bool = False) -> BaseLlm:
+        """
+        创建模型实例，相同配置的模型会复用已创建的实例
+
+        Args:
+            model_name: 模型名称，必须在模型目录中
+            lazy: 为True时返回LazyLlm代理，首次调用模型时才真正构建（适合在模块导入时创建）
 
         Returns:
-            LiteLlm: 配置好的模型实例
+            BaseLlm: 配置好的模型实例（每个端点的LiteLlm外包LimitedLlm，多端点时由BalancedLlm调度，按配置外层依次包装SingleFlightLlm、CachedLlm）
 
         Raises:
             ValueError: 如果模型名称不在可用模型列表中
         """
-        if model_name not in self.AVAILABLE_MODELS:
-            raise ValueError(f"模型 '{model_name}' 不在可用模型列表中。可用模型: {', '.join(self.AVAILABLE_MODELS)}")
+        if model_name not in self.catalog:
+            raise ValueError(f"模型 '{model_name}' 不在可用模型列表中。可用模型: {', '.join(self.catalog.names())}")
+
+        if lazy:
+            return LazyLlm(model=model_name, factory=lambda: self.create_model(model_name))
+
+        key = self._cache_key(model_name)
+        model = self._model_cache.get(key)
+        if model is not None:
+            self._model_cache.move_to_end(key)
+            return model
+
+        model = self._build_model(model_name)
+        self._model_cache[key] = model
+        while len(self._model_cache) > self.cache_size:
+            self._model_cache.popitem(last=False)
+        return model
+
+    def _build_model(self, model_name: str) -> BaseLlm:
+        """构建新的模型实例"""
+        api_bases = self.get_endpoints(model_name)
+        if len(api_bases) == 1:
+            model = self._build_endpoint_model(model_name, api_bases[0])
+        else:
+            self.load_balancer.register(api_bases)
+            model = BalancedLlm(
+                model=model_name,
+                endpoint_models={
+                    api_base: self._build_endpoint_model(model_name, api_base)
+                    for api_base in api_bases
+                },
+                balancer=self.load_balancer,
+            )
 
-        return LiteLlm(
+        if self.single_flight:
+            model = SingleFlightLlm(inner=model)
+        if self.response_cache is not None:
+            model = CachedLlm(inner=model, cache=self.response_cache)
+        return model
+
+    def _build_endpoint_model(self, model_name: str, api_base: str) -> BaseLlm:
+        """构建连接单个端点的模型实例"""
+        # LiteLlm会拖慢导入速度，延迟到真正构建模型时再导入
+        from google.adk.models.lite_llm import LiteLlm
+
+        extra_args = {}
+        if self.provider == "openai":
+            # 同一api_base下的所有模型共享一个keep-alive连接池
+            extra_args["client"] = self.http_pool.get_client(api_base, self.api_key)
+
+        model = LiteLlm(
             model=model_name,
-            api_base=self.api_base,
+            api_base=api_base,
             custom_llm_provider=self.provider,
-            api_key=self.api_key
+            api_key=self.api_key,
+            **extra_args
         )
 
+        if self.adaptive_limit:
+            model = LimitedLlm(inner=model, limiter=self.get_limiter(model_name, api_base))
+        return model
+
+    def get_limiter(self, model_name: str, api_base: str = None) -> AdaptiveLimiter:
+        """
+        获取模型在某个端点上的并发限制器（同一模型和端点的所有实例共享）
+
+        Args:
+            model_name: 模型名称
+            api_base: 端点，默认为api_base
+        """
+        key = (model_name, api_base or self.api_base)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = AdaptiveLimiter(self.limiter_config)
+        return limiter
+
+    def get_limiter_stats(self) -> dict:
+        """获取各模型/端点的并发上限、排队深度和等待时间"""
+        return {
+            f"{model_name}@{api_base}": limiter.stats()
+            for (model_name, api_base), limiter in self._limiters.items()
+        }
+
+    def create_cascade(self, model_names: List[str], acceptor: Acceptor = None) -> CascadeLlm:
+        """
+        创建模型级联：先用靠前的小模型回答，验收器拒绝时再升级到后面的大模型
+
+        Args:
+            model_names: 从小到大排列的模型名称，如 ["gpt-oss:20b", "qwen3-coder:480b-cloud"]
+            acceptor: 验收器，默认检查空回答、非法工具调用和不确定措辞
+
+        Returns:
+            CascadeLlm: 可直接传给LlmAgent的级联模型
+        """
+        tiers = [self.create_model(model_name, lazy=True) for model_name in model_names]
+        if acceptor is None:
+            return CascadeLlm(tiers=tiers)
+        return CascadeLlm(tiers=tiers, acceptor=acceptor)
+
+    def evict(self, model_name: str) -> bool:
+        """
+        从实例缓存中移除指定模型
+
+        Args:
+            model_name: 模型名称
+
+        Returns:
+            bool: 缓存中存在并已移除时返回True
+        """
+        return self._model_cache.pop(self._cache_key(model_name), None) is not None
+
+    def clear(self):
+        """清空模型实例缓存"""
+        self._model_cache.clear()
+
+    def get_cached_models(self) -> list:
+        """获取当前缓存的模型名称（按最近使用排序，最新的在最后）"""
+        return [key[0] for key in self._model_cache]
+
+    def _endpoint_models(self, model_name: str) -> Dict[str, BaseLlm]:
+        """获取模型在每个端点上的LiteLlm实例（去掉响应缓存、请求合并和并发限制等包装）"""
+        def _unwrap(model: BaseLlm) -> BaseLlm:
+            while isinstance(model, WrappedLlm):
+                model = model.inner
+            return model
+
+        model = _unwrap(self.create_model(model_name))
+        if isinstance(model, BalancedLlm):
+            return {api_base: _unwrap(endpoint_model) for api_base, endpoint_model in model.endpoint_models.items()}
+        return {self.get_endpoints(model_name)[0]: model}
+
+    async def warm_up(self, models: List[str]) -> Dict[str, Dict]:
+        """
+        预热模型：直接向每个端点发送一个极短的提示，让Ollama提前把权重加载进显存
+
+        请求不经过响应缓存和请求合并（否则缓存命中时不会真正调用模型），也不计入自适应并发限制。
+
+        Args:
+            models: 需要预热的模型名称列表
+
+        Returns:
+            Dict: {模型名称: {"status": "success"|"error", "elapsed": 秒数, "endpoints": 端点数, ...}}，
+            任一端点失败时status为error
+        """
+        async def _warm_endpoint(model_name: str, model: BaseLlm):
+            request = LlmRequest(
+                model=model_name,
+                contents=[types.Content(role="user", parts=[types.Part(text=self.WARM_UP_PROMPT)])],
+                config=types.GenerateContentConfig(max_output_tokens=1),
+            )
+            async for _ in model.generate_content_async(request):
+                pass
+
+        async def _warm_one(model_name: str) -> Dict:
+            start = time.perf_counter()
+            try:
+                endpoint_models = self._endpoint_models(model_name)
+                results = await asyncio.gather(
+                    *[_warm_endpoint(model_name, model) for model in endpoint_models.values()],
+                    return_exceptions=True,
+                )
+            except Exception as e:
+                return {"status": "error", "elapsed": time.perf_counter() - start, "error": str(e)}
+            result = {"status": "success", "elapsed": time.perf_counter() - start, "endpoints": len(results)}
+            errors = {
+                api_base: str(error) for api_base, error in zip(endpoint_models, results)
+                if isinstance(error, Exception)
+            }
+            if errors:
+                result["status"] = "error"
+                result["error"] = "; ".join(f"{api_base}: {error}" for api_base, error in errors.items())
+            return result
+
+        names = list(dict.fromkeys(models))
+        results = await asyncio.gather(*[_warm_one(name) for name in names])
+        return dict(zip(names, results))
+
+    def get_pool_stats(self) -> dict:
+        """获取HTTP连接池占用情况，用于评估连接池大小"""
+        return self.http_pool.stats()
+
+    def get_endpoint_stats(self) -> dict:
+        """获取多端点调度统计（在途请求、失败次数、健康状态）"""
+        return self.load_balancer.stats()
+
+    async def aclose(self):
+        """停止健康检查并关闭共享的HTTP连接"""
+        self.load_balancer.stop_health_checks()
+        await self.http_pool.aclose()
+
+    async def refresh_catalog(self) -> bool:
+        """立即从 /v1/models 刷新模型目录，失败时保留旧目录"""
+        return await self.catalog.refresh()
+
+    def get_model_info(self, model_name: str) -> Optional[ModelInfo]:
+        """获取模型元数据（上下文长度、量化级别等），模型不存在时返回None"""
+        return self.catalog.get(model_name)
+
+    def find_models(self, min_context_length: int = None, quantization: str = None) -> List[ModelInfo]:
+        """按能力筛选模型，见ModelCatalog.find"""
+        return self.catalog.find(min_context_length=min_context_length, quantization=quantization)
+
     def get_available_models(self) -> list:
         """获取可用模型列表"""
-        return self.AVAILABLE_MODELS.copy()
+        return self.catalog.names()
 
     def add_model(self, model_name: str):
-        """添加新的模型到可用列表"""
-        if model_name not in self.AVAILABLE_MODELS:
-            self.AVAILABLE_MODELS.append(model_name)
+        """添加新的模型到可用列表（仅影响当前实例）"""
+        self.catalog.add(model_name)
 
     def remove_model(self, model_name: str):
-        """从可用列表中移除模型"""
-        if model_name in self.AVAILABLE_MODELS:
-            self.AVAILABLE_MODELS.remove(model_name)
+        """从可用列表中移除模型（仅影响当前实例）"""
+        self.catalog.remove(model_name)
 
 
 # 创建默认的模型服务实例
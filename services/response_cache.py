@@ -0,0 +1,292 @@
+"""
+模型响应缓存 - 把确定性请求的模型输出保存到本地SQLite，重复请求直接回放
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .wrapped_llm import WrappedLlm
+
+
+def _strip_call_ids(value):
+    """去掉function_call/function_response中的id，ADK每次运行都会随机生成这些id"""
+    if isinstance(value, list):
+        return [_strip_call_ids(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    stripped = {}
+    for key, item in value.items():
+        if key in ("function_call", "function_response") and isinstance(item, dict):
+            item = {k: v for k, v in item.items() if k != "id"}
+        stripped[key] = _strip_call_ids(item)
+    return stripped
+
+
+def _tool_declarations(llm_request: LlmRequest) -> Dict[str, Optional[dict]]:
+    """序列化每个工具的函数声明（描述和参数schema），声明变化后缓存不再命中"""
+    declarations = {}
+    for name, tool in llm_request.tools_dict.items():
+        declaration = tool._get_declaration()
+        declarations[name] = declaration.model_dump(mode="json", exclude_none=True) if declaration else None
+    return declarations
+
+
+def request_fingerprint(llm_request: LlmRequest, model_name: str = None) -> str:
+    """
+    计算请求的稳定哈希，覆盖模型名称、消息、工具声明和生成参数
+
+    生成参数来自llm_request.config，包括system_instruction、temperature等以及config.tools；
+    工具声明另外从tools_dict序列化，不依赖工具是否已写入config.tools。
+
+    Args:
+        llm_request: 模型请求
+        model_name: 模型名称，默认使用llm_request.model
+
+    Returns:
+        str: sha256十六进制摘要
+    """
+    config = {}
+    if llm_request.config is not None:
+        config = llm_request.config.model_dump(
+            mode="json", exclude_none=True, exclude={"http_options"}
+        )
+    payload = {
+        "model": model_name or llm_request.model,
+        "contents": _strip_call_ids(
+            [content.model_dump(mode="json", exclude_none=True) for content in llm_request.contents]
+        ),
+        "config": config,
+        "tools": _tool_declarations(llm_request),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """基于SQLite的模型响应缓存，支持TTL和按容量淘汰"""
+
+    # 缓存模式
+    MODE_RECORD = "record"            # 命中则回放，未命中则调用模型并写入
+    MODE_REPLAY = "replay"            # 只从缓存回放，未命中直接报错（适合离线CI）
+    MODE_PASSTHROUGH = "passthrough"  # 完全绕过缓存
+    MODES = (MODE_RECORD, MODE_REPLAY, MODE_PASSTHROUGH)
+
+    # 默认配置
+    DEFAULT_PATH = ".llm_cache.sqlite"
+    DEFAULT_TTL = 7 * 24 * 3600
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, path: str = None, mode: str = MODE_RECORD,
+                 ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化响应缓存
+
+        Args:
+            path: SQLite文件路径
+            mode: 缓存模式，record / replay / passthrough
+            ttl: 缓存条目有效期（秒），None表示永不过期
+            max_bytes: 缓存总大小上限，超过后按最近访问时间淘汰
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"缓存模式 '{mode}' 无效。可用模式: {', '.join(self.MODES)}")
+
+        self.path = path or self.DEFAULT_PATH
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """
+        根据环境变量创建缓存，未设置LLM_CACHE_MODE时返回None
+
+        环境变量:
+            LLM_CACHE_MODE: record / replay / passthrough
+            LLM_CACHE_PATH: SQLite文件路径
+            LLM_CACHE_TTL: 有效期（秒）
+        """
+        mode = os.getenv("LLM_CACHE_MODE")
+        if not mode:
+            return None
+        ttl = os.getenv("LLM_CACHE_TTL")
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH"),
+            mode=mode,
+            ttl=float(ttl) if ttl else cls.DEFAULT_TTL,
+        )
+
+    def get(self, key: str) -> Optional[List[LlmResponse]]:
+        """
+        读取缓存的响应
+
+        Args:
+            key: request_fingerprint生成的键
+
+        Returns:
+            Optional[List[LlmResponse]]: 命中时返回响应列表，否则返回None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            payload, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return [LlmResponse.model_validate(item) for item in json.loads(payload)]
+
+    def put(self, key: str, model: str, responses: List[LlmResponse]):
+        """
+        写入响应并按容量淘汰旧条目
+
+        Args:
+            key: request_fingerprint生成的键
+            model: 模型名称
+            responses: 需要缓存的响应列表
+        """
+        payload = json.dumps(
+            [response.model_dump(mode="json", exclude_none=True) for response in responses],
+            ensure_ascii=False,
+        )
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, payload, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload), now, now),
+            )
+            self.writes += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """总大小超过上限时，按最近访问时间从旧到新删除"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """删除所有过期条目，返回删除数量"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedLlm(WrappedLlm):
+    """带响应缓存的模型，可直接传给LlmAgent(model=...)"""
+
+    cache: ResponseCache
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.cache.mode == ResponseCache.MODE_PASSTHROUGH:
+            async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                yield response
+            return
+
+        # 必须在调用inner之前计算，inner可能会修改llm_request
+        key = request_fingerprint(llm_request, self.model)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            for response in cached:
+                yield response
+            return
+
+        if self.cache.mode == ResponseCache.MODE_REPLAY:
+            raise LookupError(f"回放模式下未找到缓存的响应: model={self.model}, key={key[:12]}")
+
+        # 只缓存完整响应；流式的partial片段不写入，回放时直接返回聚合后的结果
+        final_responses = []
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            if not response.partial:
+                final_responses.append(response)
+            yield response
+
+        if final_responses and not any(response.error_code for response in final_responses):
+            await asyncio.to_thread(self.cache.put, key, self.model, final_responses)
@@ -0,0 +1,416 @@
+"""
+两级会话存储 - 进程内LRU缓存最近使用的会话，数据库作为持久层；支持写穿透和写回两种写入模式
+
+同一个会话通常在几秒后的下一轮对话中再次被读取，命中缓存时不需要查询事件表。
+多个进程共用同一个数据库时开启shared，每次命中只查询会话的版本标记，
+发现其他进程写入了新事件时只增量加载新增的部分。
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from google.adk.errors._stale_session_error import StaleSessionError
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.database_session_service import DatabaseSessionService
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+
+from .session_window import SessionWindowConfig
+
+# 写入模式
+# write_through: append_event等到持久层写入后才返回
+# write_behind: append_event只更新缓存，由每个会话的后台任务按顺序写入持久层
+WRITE_THROUGH = "write_through"
+WRITE_BEHIND = "write_behind"
+
+_SessionKey = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class SessionCacheConfig:
+    """会话缓存配置"""
+
+    # 最多缓存的会话数，以及所有缓存会话的事件总数上限
+    max_sessions: int = 256
+    max_events: int = 100_000
+    write_mode: str = WRITE_THROUGH
+    # 多个进程共用同一个数据库时设为True，每次命中前校验会话版本
+    shared: bool = False
+    # 缓存条目的有效期（秒），None表示一直有效（shared为False时可作为兜底）
+    ttl: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "SessionCacheConfig":
+        """
+        根据环境变量创建配置
+
+        环境变量:
+            SESSION_CACHE_SIZE: 最多缓存的会话数
+            SESSION_CACHE_MODE: write_through或write_behind
+            SESSION_CACHE_SHARED: 设为1表示多个进程共用数据库
+            SESSION_CACHE_TTL: 缓存条目的有效期（秒）
+        """
+        size = os.getenv("SESSION_CACHE_SIZE")
+        ttl = os.getenv("SESSION_CACHE_TTL")
+        return cls(
+            max_sessions=int(size) if size else cls.max_sessions,
+            write_mode=os.getenv("SESSION_CACHE_MODE") or cls.write_mode,
+            shared=os.getenv("SESSION_CACHE_SHARED") == "1",
+            ttl=float(ttl) if ttl else cls.ttl,
+        )
+
+
+@dataclass
+class _Entry:
+    session: Session
+    # 缓存内容对应的存储版本标记
+    marker: Optional[str]
+    loaded_at: float = field(default_factory=time.monotonic)
+    # write_behind模式下等待写入持久层的事件（及追加它的Session对象）、后台写入任务，
+    # 以及用于写入的影子会话（只保存版本标记）
+    queue: Deque[Tuple[Session, Event]] = field(default_factory=deque)
+    writer: Optional[asyncio.Task] = None
+    shadow: Optional[Session] = None
+
+
+def _copy_session(session: Session) -> Session:
+    """复制会话的事件列表和状态（事件对象本身共享），调用方修改返回值不会影响缓存"""
+    copy = session.model_copy()
+    copy.events = list(session.events)
+    copy.state = dict(session.state)
+    return copy
+
+
+def _apply_config(session: Session, config: Optional[GetSessionConfig]) -> Session:
+    """按GetSessionConfig在内存中筛选事件，语义与DatabaseSessionService相同"""
+    if config is None:
+        return session
+    if config.after_timestamp:
+        session.events = [event for event in session.events if event.timestamp >= config.after_timestamp]
+    if config.num_recent_events is not None:
+        session.events = session.events[-config.num_recent_events:] if config.num_recent_events else []
+    return session
+
+
+class TieredSessionService(BaseSessionService):
+    """内存LRU + 数据库的两级会话存储"""
+
+    def __init__(self, store: DatabaseSessionService, config: SessionCacheConfig = None):
+        """
+        初始化两级会话存储
+
+        Args:
+            store: 持久层，如SQLiteSessionService
+            config: 缓存配置，默认根据环境变量创建
+        """
+        self.store = store
+        self.config = config or SessionCacheConfig.from_env()
+        if self.config.write_mode not in (WRITE_THROUGH, WRITE_BEHIND):
+            raise ValueError(f"未知的写入模式: {self.config.write_mode}")
+
+        self.hits = 0
+        self.misses = 0
+        self.validations = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.write_errors = 0
+
+        self._entries: "OrderedDict[_SessionKey, _Entry]" = OrderedDict()
+        self._total_events = 0
+        # write_behind模式下正在写入持久层的条目（条目被淘汰后写入仍会继续）
+        self._writers: Dict[_SessionKey, _Entry] = {}
+        self._write_error: Optional[BaseException] = None
+
+    # ---- 缓存管理 ----
+
+    def _store_entry(self, key: _SessionKey, session: Session) -> _Entry:
+        self._drop(key)
+        entry = self._entries[key] = _Entry(session=session, marker=session._storage_update_marker)
+        self._total_events += len(session.events)
+        self._evict_overflow()
+        return entry
+
+    def _drop(self, key: _SessionKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_events -= len(entry.session.events)
+
+    def _evict_overflow(self):
+        while self._entries and (
+            len(self._entries) > self.config.max_sessions or self._total_events > self.config.max_events
+        ):
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.config.ttl is not None and time.monotonic() - entry.loaded_at > self.config.ttl
+
+    async def _wait_writer(self, key: _SessionKey):
+        entry = self._writers.get(key)
+        if entry is not None:
+            await asyncio.shield(entry.writer)
+
+    def _raise_write_error(self):
+        """write_behind模式下后台写入失败时，把错误抛给下一次调用方"""
+        error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+
+    async def _validate(self, key: _SessionKey, entry: _Entry) -> Optional[_Entry]:
+        """shared模式：校验缓存的会话是否仍是最新版本，其他进程写入了新事件时增量加载"""
+        app_name, user_id, session_id = key
+        self.validations += 1
+        current = await self.store.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=GetSessionConfig(num_recent_events=0)
+        )
+        if current is None:
+            self._drop(key)
+            return None
+
+        cached = entry.session
+        if current._storage_update_marker != entry.marker:
+            self.refreshes += 1
+            newer = None
+            # 持久层支持SessionWindowConfig时（如SQLiteSessionService）只加载新增的事件
+            if cached.events and hasattr(self.store, "get_session_window"):
+                try:
+                    newer = await self.store.get_session(
+                        app_name=app_name, user_id=user_id, session_id=session_id,
+                        config=SessionWindowConfig(after_event_id=cached.events[-1].id),
+                    )
+                except ValueError:
+                    # 缓存中最后一个事件已不在存储中（会话被改写），整体重新加载
+                    newer = None
+            if newer is None:
+                full = await self.store.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+                return self._store_entry(key, full) if full is not None else None
+            cached.events.extend(newer.events)
+            self._total_events += len(newer.events)
+            current = newer
+            entry.marker = current._storage_update_marker
+
+        # 应用和用户状态可能被其他会话修改，使用最新的合并状态
+        cached.state = current.state
+        cached.last_update_time = current.last_update_time
+        cached._storage_update_marker = current._storage_update_marker
+        self._evict_overflow()
+        return entry
+
+    def _propagate_shared_state(self, key: _SessionKey, state_delta: Optional[Dict[str, Any]]):
+        """应用级和用户级状态由多个会话共享，同步到缓存中的其他会话"""
+        if not state_delta:
+            return
+        app_name, user_id, _ = key
+        for other_key, entry in self._entries.items():
+            if other_key == key or other_key[0] != app_name:
+                continue
+            for state_key, value in state_delta.items():
+                if state_key.startswith(State.APP_PREFIX) or (
+                    state_key.startswith(State.USER_PREFIX) and other_key[1] == user_id
+                ):
+                    entry.session.state[state_key] = value
+
+    def _apply_to_cache(self, key: _SessionKey, session: Session, event: Event):
+        entry = self._entries.get(key)
+        if entry is not None:
+            cached = entry.session
+            cached.events.append(event)
+            self._total_events += 1
+            self._update_session_state(cached, event)
+            cached.last_update_time = session.last_update_time
+            if self.config.write_mode == WRITE_THROUGH:
+                cached._storage_update_marker = entry.marker = session._storage_update_marker
+            self._entries.move_to_end(key)
+            self._evict_overflow()
+        self._propagate_shared_state(key, event.actions.state_delta if event.actions else None)
+
+    # ---- write_behind ----
+
+    def _enqueue(self, key: _SessionKey, entry: _Entry, session: Session, event: Event):
+        entry.queue.append((session, event))
+        if entry.shadow is None:
+            cached = entry.session
+            entry.shadow = Session(id=cached.id, app_name=cached.app_name, user_id=cached.user_id)
+            entry.shadow._storage_update_marker = entry.marker
+        if entry.writer is None:
+            self._writers[key] = entry
+            entry.writer = asyncio.ensure_future(self._drain(key, entry))
+
+    async def _drain(self, key: _SessionKey, entry: _Entry):
+        """按顺序把会话的待写事件写入持久层"""
+        shadow = entry.shadow
+        try:
+            while entry.queue:
+                session, event = entry.queue[0]
+                await self.store.append_event(shadow, event)
+                entry.queue.popleft()
+                # 影子会话只用于携带版本标记，不保留事件和状态
+                shadow.events.clear()
+                shadow.state.clear()
+                entry.marker = shadow._storage_update_marker
+                # 调用方的Session对象已包含该事件，之后可以直接写入持久层（如条目被淘汰后）
+                entry.session._storage_update_marker = session._storage_update_marker = entry.marker
+        except Exception as e:
+            self.write_errors += 1
+            self._write_error = e
+            entry.queue.clear()
+            # 缓存已与持久层不一致，丢弃后下次从持久层重新加载
+            if self._entries.get(key) is entry:
+                self._drop(key)
+        finally:
+            entry.writer = None
+            if self._writers.get(key) is entry:
+                del self._writers[key]
+
+    # ---- BaseSessionService ----
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        if self._writers:
+            # 待写事件中可能有用户/应用状态的修改
+            await self.flush()
+        session = await self.store.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        # 初始状态中的应用级和用户级状态会覆盖持久层中的值，缓存中的其他会话也要同步
+        self._propagate_shared_state(key, state)
+        self._store_entry(key, _copy_session(session))
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        self._raise_write_error()
+        key = (app_name, user_id, session_id)
+        if isinstance(config, SessionWindowConfig) and (config.after_event_id or config.since_compaction):
+            # 按事件ID或压缩位置读取的窗口直接交给持久层
+            await self._wait_writer(key)
+            return await self.store.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            await self._wait_writer(key)
+            self._drop(key)
+            entry = None
+        if entry is not None and self.config.shared and key not in self._writers:
+            entry = await self._validate(key, entry)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return _apply_config(_copy_session(entry.session), config)
+
+        self.misses += 1
+        await self._wait_writer(key)
+        if config is not None:
+            # 只缓存完整加载的会话，按窗口读取时由持久层只加载需要的事件
+            return await self.store.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+        session = await self.store.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is None:
+            return None
+        self._store_entry(key, _copy_session(session))
+        return session
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        self._raise_write_error()
+        key = (session.app_name, session.user_id, session.id)
+        entry = self._entries.get(key)
+
+        if self.config.write_mode == WRITE_THROUGH or entry is None:
+            # 未缓存的会话（如已被淘汰）直接写入持久层
+            await self._wait_writer(key)
+            try:
+                event = await self.store.append_event(session, event)
+            except StaleSessionError:
+                # 缓存的副本同样已经过期，丢弃后下次get_session从持久层重新加载
+                self._drop(key)
+                raise
+            self._apply_to_cache(key, session, event)
+            return event
+
+        self._apply_temp_state(session, event)
+        event = self._trim_temp_delta_state(event)
+        self._commit_event_to_session(session, event)
+        self._apply_to_cache(key, session, event)
+        self._enqueue(key, entry, session, event)
+        return event
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        return await self.store.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        await self._wait_writer(key)
+        self._drop(key)
+        await self.store.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        await self.flush()
+        return await self.store.get_user_state(app_name=app_name, user_id=user_id)
+
+    async def flush(self) -> None:
+        """
+        等待所有待写事件写入持久层
+
+        Raises:
+            Exception: write_behind模式下之前的后台写入失败
+        """
+        while self._writers:
+            await asyncio.gather(*[asyncio.shield(entry.writer) for entry in list(self._writers.values())])
+        await self.store.flush()
+        self._raise_write_error()
+
+    async def close(self) -> None:
+        """写入剩余事件后关闭持久层"""
+        try:
+            await self.flush()
+        finally:
+            await self.store.close()
+
+    def invalidate(self, app_name: str = None, user_id: str = None, session_id: str = None):
+        """
+        丢弃缓存的会话（不影响持久层），不指定条件时清空缓存
+
+        Args:
+            app_name: 只丢弃该应用的会话
+            user_id: 只丢弃该用户的会话
+            session_id: 只丢弃该会话
+        """
+        for key in list(self._entries):
+            if (app_name is None or key[0] == app_name) and (user_id is None or key[1] == user_id) and (
+                session_id is None or key[2] == session_id
+            ) and key not in self._writers:
+                self._drop(key)
+
+    def stats(self) -> Dict:
+        """获取缓存统计，持久层提供stats()时一并返回"""
+        total = self.hits + self.misses
+        stats = {
+            "write_mode": self.config.write_mode,
+            "shared": self.config.shared,
+            "sessions": len(self._entries),
+            "events": self._total_events,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "validations": self.validations,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "pending_writes": sum(len(entry.queue) for entry in self._writers.values()),
+            "write_errors": self.write_errors,
+        }
+        if hasattr(self.store, "stats"):
+            stats["store"] = self.store.stats()
+        return stats
@@ -0,0 +1,220 @@
+"""
+会话窗口读取 - 只加载最近的事件（最近N条、某个时间或事件之后、上次压缩之后），更早的事件按需分页加载
+
+查询沿ADK的 (app_name, user_id, session_id, timestamp, id) 索引倒序读取，
+加载一个10k事件会话的尾部窗口与加载一个10事件会话的耗时基本相同。
+"""
+
+from datetime import datetime, timezone
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.database_session_service import DatabaseSessionService
+from google.adk.sessions.session import Session
+from sqlalchemy import and_, or_, select
+
+
+class SessionWindowConfig(GetSessionConfig):
+    """
+    会话窗口配置，可直接作为RunConfig.get_session_config传给Runner（需配合SQLiteSessionService）
+
+    多个条件同时设置时取交集：num_recent_events限制条数，after_timestamp（含）、after_event_id（不含）
+    和since_compaction限制起点。since_compaction为True时窗口从最近一次压缩事件开始，
+    包含压缩摘要和其后未被压缩的事件；会话从未压缩过时不限制起点。
+    """
+
+    after_event_id: Optional[str] = None
+    since_compaction: bool = False
+
+
+class SessionWindow:
+    """会话的事件窗口，session.events只包含已加载的事件（按时间顺序）"""
+
+    def __init__(self, service: DatabaseSessionService, session: Session, cursor: Optional[tuple],
+                 has_older: bool):
+        """
+        初始化窗口（通常由load_session_window创建）
+
+        Args:
+            service: 会话存储
+            session: 已加载窗口内事件的会话
+            cursor: 窗口中最早事件的存储键 (timestamp, id)，窗口为空时为None
+            has_older: 窗口之前是否还有事件
+        """
+        self.service = service
+        self.session = session
+        self.has_older = has_older
+        self._cursor = cursor
+
+    @property
+    def events(self) -> List[Event]:
+        return self.session.events
+
+    async def load_older(self, limit: int = 100) -> List[Event]:
+        """
+        加载窗口之前的一页事件，并插入到session.events开头
+
+        Args:
+            limit: 最多加载的事件数
+
+        Returns:
+            List[Event]: 本次加载的事件（按时间顺序），没有更早的事件时为空列表
+        """
+        if not self.has_older:
+            return []
+        session = self.session
+        schema = self.service._get_schema_classes()
+        async with self.service._rollback_on_exception_session(read_only=True) as sql_session:
+            stmt = _events_query(schema, session).order_by(
+                schema.StorageEvent.timestamp.desc(), schema.StorageEvent.id.desc()
+            )
+            if self._cursor is not None:
+                stmt = stmt.filter(_before(schema, self._cursor))
+            rows = (await sql_session.execute(stmt.limit(limit + 1))).scalars().all()
+
+        self.has_older = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        if rows:
+            self._cursor = (rows[0].timestamp, rows[0].id)
+        events = [row.to_event() for row in rows]
+        session.events[:0] = events
+        return events
+
+    async def iter_older(self, page_size: int = 100) -> AsyncGenerator[Event, None]:
+        """
+        从窗口开头向前逐条产出更早的事件（从新到旧），每次需要时才加载下一页
+
+        Args:
+            page_size: 每页加载的事件数
+
+        Yields:
+            Event: 更早的事件
+        """
+        while self.has_older:
+            for event in reversed(await self.load_older(page_size)):
+                yield event
+
+
+def _events_query(schema, session: Session):
+    return (
+        select(schema.StorageEvent)
+        .filter(schema.StorageEvent.app_name == session.app_name)
+        .filter(schema.StorageEvent.user_id == session.user_id)
+        .filter(schema.StorageEvent.session_id == session.id)
+    )
+
+
+def _before(schema, key: tuple):
+    """存储顺序 (timestamp, id) 在key之前"""
+    timestamp, event_id = key
+    return or_(
+        schema.StorageEvent.timestamp < timestamp,
+        and_(schema.StorageEvent.timestamp == timestamp, schema.StorageEvent.id < event_id),
+    )
+
+
+def _after(schema, key: tuple):
+    """存储顺序 (timestamp, id) 在key之后"""
+    timestamp, event_id = key
+    return or_(
+        schema.StorageEvent.timestamp > timestamp,
+        and_(schema.StorageEvent.timestamp == timestamp, schema.StorageEvent.id > event_id),
+    )
+
+
+async def load_session_window(service: DatabaseSessionService, *, app_name: str, user_id: str, session_id: str,
+                              config: Optional[GetSessionConfig] = None,
+                              page_size: int = 100) -> Optional[SessionWindow]:
+    """
+    加载会话的事件窗口
+
+    Args:
+        service: 会话存储（DatabaseSessionService及其子类）
+        app_name: 应用名称
+        user_id: 用户ID
+        session_id: 会话ID
+        config: 窗口配置，GetSessionConfig或SessionWindowConfig；None表示加载全部事件
+        page_size: since_compaction向前查找压缩事件时每页读取的事件数
+
+    Returns:
+        Optional[SessionWindow]: 会话不存在时返回None
+
+    Raises:
+        ValueError: after_event_id对应的事件不存在
+    """
+    # 只读取会话元数据和合并后的状态，不读取事件
+    session = await service.get_session(
+        app_name=app_name, user_id=user_id, session_id=session_id, config=GetSessionConfig(num_recent_events=0)
+    )
+    if session is None:
+        return None
+    config = config or GetSessionConfig()
+
+    schema = service._get_schema_classes()
+    event_model = schema.StorageEvent
+    newest_first = (event_model.timestamp.desc(), event_model.id.desc())
+    async with service._rollback_on_exception_session(read_only=True) as sql_session:
+        stmt = _events_query(schema, session)
+        if config.after_timestamp:
+            stmt = stmt.filter(event_model.timestamp >= _storage_time(service, config.after_timestamp))
+        after_event_id = getattr(config, "after_event_id", None)
+        if after_event_id:
+            anchor = await sql_session.get(event_model, (after_event_id, app_name, user_id, session_id))
+            if anchor is None:
+                raise ValueError(f"事件 {after_event_id} 不存在")
+            stmt = stmt.filter(_after(schema, (anchor.timestamp, anchor.id)))
+
+        rows = []
+        # 查找压缩事件时已经解析过的事件，避免重复解析
+        parsed = {}
+        if getattr(config, "since_compaction", False):
+            # 从新到旧分页查找最近的压缩事件，只读取上次压缩之后的部分
+            while True:
+                page_stmt = stmt.order_by(*newest_first).limit(page_size)
+                if rows:
+                    page_stmt = page_stmt.filter(_before(schema, (rows[-1].timestamp, rows[-1].id)))
+                page = (await sql_session.execute(page_stmt)).scalars().all()
+                compaction = None
+                for row in page:
+                    rows.append(row)
+                    event = parsed[row.id] = row.to_event()
+                    if event.actions and event.actions.compaction:
+                        compaction = event.actions.compaction
+                        break
+                if compaction is not None:
+                    # 压缩事件之前、但时间晚于压缩范围的事件没有被压缩，也要包含
+                    uncovered = stmt.filter(_before(schema, (rows[-1].timestamp, rows[-1].id))).filter(
+                        event_model.timestamp > _storage_time(service, compaction.end_timestamp)
+                    )
+                    rows.extend((await sql_session.execute(uncovered.order_by(*newest_first))).scalars().all())
+                    break
+                if len(page) < page_size:
+                    break
+            if config.num_recent_events is not None:
+                rows = rows[:config.num_recent_events]
+        else:
+            if config.num_recent_events is not None:
+                stmt = stmt.order_by(*newest_first).limit(config.num_recent_events)
+            else:
+                stmt = stmt.order_by(*newest_first)
+            rows = (await sql_session.execute(stmt)).scalars().all()
+
+        rows = list(reversed(rows))
+        # 窗口为空时，load_older从最新的事件开始向前加载
+        cursor = (rows[0].timestamp, rows[0].id) if rows else None
+        older_stmt = _events_query(schema, session).with_only_columns(event_model.id).limit(1)
+        if cursor is not None:
+            older_stmt = older_stmt.filter(_before(schema, cursor))
+        has_older = (await sql_session.execute(older_stmt)).first() is not None
+
+    session.events = [parsed.get(row.id) or row.to_event() for row in rows]
+    return SessionWindow(service, session, cursor, has_older)
+
+
+def _storage_time(service: DatabaseSessionService, timestamp: float):
+    """把Unix时间戳转换为events.timestamp列的存储格式"""
+    value = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    if service._uses_naive_datetime():
+        value = value.replace(tzinfo=None)
+    return value
@@ -0,0 +1,487 @@
+"""
+分片SQLite会话存储 - 按user_id一致性哈希把会话分到N个SQLite文件，不同用户的写入各自加锁、互不排队
+
+分片文件与布局清单:
+    my_agent_data.shard0.db ... my_agent_data.shard{N-1}.db
+    my_agent_data.shards.json   当前分片数，以及未完成的再平衡之前的分片数
+
+分片数改变（SESSION_SHARDS）后服务照常读写：访问某个用户前先把它迁移到新分片，
+后台任务同时逐个迁移其余用户，全部完成后更新清单。一致性哈希保证只有约1/N的用户需要迁移。
+再平衡期间所有共用这些文件的进程都必须使用新的分片数。
+
+已有的单文件数据库用split_database（或 python -m services.sharded_store split）离线拆分。
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from google.adk.events import Event
+from google.adk.sessions import _session_util
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.session import Session
+from sqlalchemy import delete, insert, select
+
+from .group_commit import GroupCommitConfig
+from .session_window import SessionWindow
+from .sqlite_store import SQLiteProfile, SQLiteSessionService
+
+
+@dataclass(frozen=True)
+class ShardingConfig:
+    """分片配置"""
+
+    shards: int = 4
+    # 每个分片在哈希环上的虚拟节点数，越多用户分布越均匀
+    vnodes: int = 64
+
+    @classmethod
+    def from_env(cls) -> "ShardingConfig":
+        """
+        根据环境变量创建配置
+
+        环境变量:
+            SESSION_SHARDS: 分片数
+            SESSION_SHARD_VNODES: 每个分片的虚拟节点数
+        """
+        shards = os.getenv("SESSION_SHARDS")
+        vnodes = os.getenv("SESSION_SHARD_VNODES")
+        return cls(
+            shards=int(shards) if shards else cls.shards,
+            vnodes=int(vnodes) if vnodes else cls.vnodes,
+        )
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """一致性哈希环，把user_id映射到分片编号"""
+
+    def __init__(self, shards: int, vnodes: int = 64):
+        """
+        初始化哈希环
+
+        Args:
+            shards: 分片数
+            vnodes: 每个分片的虚拟节点数
+
+        Raises:
+            ValueError: 分片数小于1
+        """
+        if shards < 1:
+            raise ValueError(f"分片数必须大于0: {shards}")
+        self.shards = shards
+        self.vnodes = vnodes
+        points = sorted((_hash(f"shard-{index}#{vnode}"), index) for index in range(shards) for vnode in range(vnodes))
+        self._keys = [key for key, _ in points]
+        self._owners = [index for _, index in points]
+
+    def shard_for(self, user_id: str) -> int:
+        """获取用户所在的分片编号"""
+        position = bisect.bisect(self._keys, _hash(user_id)) % len(self._keys)
+        return self._owners[position]
+
+
+def shard_path(path: str, index: int) -> str:
+    """第index个分片的文件路径，如 my_agent_data.db -> my_agent_data.shard0.db"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}{ext or '.db'}"
+
+
+def _manifest_path(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.shards.json"
+
+
+def read_shard_manifest(path: str) -> Optional[Dict]:
+    """
+    读取分片布局清单
+
+    Args:
+        path: 分片前的数据库路径（如my_agent_data.db）
+
+    Returns:
+        Optional[Dict]: {"shards": N, "previous": M或None, "vnodes": V}，清单不存在时返回None
+    """
+    try:
+        with open(_manifest_path(path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(path: str, shards: int, previous: Optional[int], vnodes: int):
+    manifest_path = _manifest_path(path)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"shards": shards, "previous": previous, "vnodes": vnodes}, f)
+    os.replace(temp_path, manifest_path)
+
+
+class ShardedSessionService(BaseSessionService):
+    """按user_id分片的SQLite会话存储，每个分片是一个SQLiteSessionService（各自组提交）"""
+
+    def __init__(self, path: str = "my_agent_data.db", config: ShardingConfig = None,
+                 profile: SQLiteProfile = None, commit_config: GroupCommitConfig = None):
+        """
+        初始化分片存储，分片数与清单不一致时开始再平衡
+
+        Args:
+            path: 分片前的数据库路径，分片文件和清单放在同一目录
+            config: 分片配置，默认根据环境变量创建
+            profile: 每个分片的SQLite连接参数
+            commit_config: 每个分片的组提交配置
+
+        Raises:
+            ValueError: 上一次再平衡尚未完成，又指定了另一个分片数
+        """
+        self.path = path
+        self.config = config or ShardingConfig.from_env()
+
+        manifest = read_shard_manifest(path)
+        vnodes = manifest["vnodes"] if manifest else self.config.vnodes
+        previous = None
+        if manifest is not None:
+            if manifest["previous"] is not None and manifest["shards"] != self.config.shards:
+                raise ValueError(
+                    f"从{manifest['previous']}个分片到{manifest['shards']}个分片的再平衡尚未完成，"
+                    f"请先以SESSION_SHARDS={manifest['shards']}运行直到完成"
+                )
+            previous = manifest["previous"]
+            if manifest["shards"] != self.config.shards:
+                previous = manifest["shards"]
+        if manifest is None or manifest["shards"] != self.config.shards:
+            _write_manifest(path, self.config.shards, previous, vnodes)
+
+        self._ring = HashRing(self.config.shards, vnodes)
+        # 再平衡期间旧布局的哈希环，以及已经确认位于新分片的用户
+        self._old_ring = HashRing(previous, vnodes) if previous is not None else None
+        self._settled: Set[str] = set()
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+        self._rebalance_task: Optional[asyncio.Task] = None
+        self.moved_users = 0
+
+        # 缩容时，编号超出新分片数的旧分片在再平衡完成前仍需读取
+        count = max(self.config.shards, previous or 0)
+        self.shards: List[SQLiteSessionService] = [
+            SQLiteSessionService(shard_path(path, index), profile=profile, config=commit_config)
+            for index in range(count)
+        ]
+
+    @property
+    def rebalancing(self) -> bool:
+        return self._old_ring is not None
+
+    def _active_shards(self) -> List[SQLiteSessionService]:
+        return self.shards if self.rebalancing else self.shards[:self._ring.shards]
+
+    # ---- 路由与再平衡 ----
+
+    async def _shard(self, user_id: str) -> SQLiteSessionService:
+        """获取用户所在的分片，再平衡期间先把用户迁移到新分片"""
+        target = self._ring.shard_for(user_id)
+        if self._old_ring is not None and user_id not in self._settled:
+            self._ensure_rebalancing()
+            await self._settle(user_id)
+        return self.shards[target]
+
+    async def _settle(self, user_id: str):
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            if user_id in self._settled or self._old_ring is None:
+                return
+            source = self._old_ring.shard_for(user_id)
+            target = self._ring.shard_for(user_id)
+            if source != target:
+                await self._move_user(user_id, self.shards[source], self.shards[target])
+            self._settled.add(user_id)
+        self._user_locks.pop(user_id, None)
+
+    async def _move_user(self, user_id: str, source: SQLiteSessionService, target: SQLiteSessionService):
+        """
+        把用户的会话、事件和用户状态从source复制到target后再从source删除
+
+        复制和删除各是一个事务；两步之间中断时，下次迁移会先清除target中的残留再重新复制
+        """
+        await source.prepare_tables()
+        await target.prepare_tables()
+        await source.flush()
+        schema = source._get_schema_classes()
+        # 按外键依赖顺序：先会话再事件
+        tables = [
+            schema.StorageSession.__table__,
+            schema.StorageEvent.__table__,
+            schema.StorageUserState.__table__,
+        ]
+        app_table = schema.StorageAppState.__table__
+
+        async with source._rollback_on_exception_session(read_only=True) as sql_session:
+            rows = {}
+            for table in tables:
+                result = await sql_session.execute(select(table).where(table.c.user_id == user_id))
+                rows[table.name] = [dict(row) for row in result.mappings()]
+            apps = {row["app_name"] for table_rows in rows.values() for row in table_rows}
+            app_rows = []
+            if apps:
+                result = await sql_session.execute(select(app_table).where(app_table.c.app_name.in_(apps)))
+                app_rows = [dict(row) for row in result.mappings()]
+        if not apps:
+            return
+
+        async with target._rollback_on_exception_session() as sql_session:
+            for table in reversed(tables):
+                await sql_session.execute(delete(table).where(table.c.user_id == user_id))
+            # 应用状态在所有分片中各有一份，新分片中还没有时一并复制
+            result = await sql_session.execute(select(app_table.c.app_name).where(app_table.c.app_name.in_(apps)))
+            existing_apps = set(result.scalars())
+            missing = [row for row in app_rows if row["app_name"] not in existing_apps]
+            if missing:
+                await sql_session.execute(insert(app_table), missing)
+            for table in tables:
+                if rows[table.name]:
+                    await sql_session.execute(insert(table), rows[table.name])
+            await sql_session.commit()
+
+        async with source._rollback_on_exception_session() as sql_session:
+            for table in reversed(tables):
+                await sql_session.execute(delete(table).where(table.c.user_id == user_id))
+            await sql_session.commit()
+        self.moved_users += 1
+
+    async def _list_users(self, shard: SQLiteSessionService) -> List[str]:
+        await shard.prepare_tables()
+        schema = shard._get_schema_classes()
+        async with shard._rollback_on_exception_session(read_only=True) as sql_session:
+            stmt = select(schema.StorageSession.user_id).union(select(schema.StorageUserState.user_id))
+            return list((await sql_session.execute(stmt)).scalars())
+
+    def _ensure_rebalancing(self):
+        if self._rebalance_task is None and self._old_ring is not None:
+            self._rebalance_task = asyncio.ensure_future(self._rebalance())
+
+    async def _rebalance(self):
+        old_ring = self._old_ring
+        for index in range(old_ring.shards):
+            for user_id in await self._list_users(self.shards[index]):
+                if old_ring.shard_for(user_id) == index:
+                    await self._settle(user_id)
+        _write_manifest(self.path, self._ring.shards, None, self._ring.vnodes)
+        self._old_ring = None
+        self._settled.clear()
+
+    async def rebalance(self) -> int:
+        """
+        等待再平衡完成（分片数未改变时立即返回）
+
+        Returns:
+            int: 本进程迁移过的用户数
+        """
+        self._ensure_rebalancing()
+        if self._rebalance_task is not None:
+            await asyncio.shield(self._rebalance_task)
+        return self.moved_users
+
+    async def _replicate_app_state(self, app_name: str, state: Optional[Dict[str, Any]],
+                                   source: SQLiteSessionService):
+        """应用状态在每个分片中各有一份，把source中提交的修改同步到其他分片"""
+        if not state:
+            return
+        app_delta = _session_util.extract_json_safe_state_delta(state)["app"]
+        if not app_delta:
+            return
+
+        async def _update(shard: SQLiteSessionService):
+            await shard.prepare_tables()
+            schema = shard._get_schema_classes()
+            update_time = datetime.now(timezone.utc)
+            if shard._uses_naive_datetime():
+                update_time = update_time.replace(tzinfo=None)
+            async with shard._rollback_on_exception_session() as sql_session:
+                app_state = await sql_session.get(schema.StorageAppState, app_name)
+                if app_state is None:
+                    sql_session.add(schema.StorageAppState(app_name=app_name, state=dict(app_delta),
+                                                           update_time=update_time))
+                else:
+                    app_state.state.update(app_delta)
+                    app_state.update_time = update_time
+                await sql_session.commit()
+
+        await asyncio.gather(*[_update(shard) for shard in self._active_shards() if shard is not source])
+
+    # ---- BaseSessionService ----
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        shard = await self._shard(user_id)
+        session = await shard.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        await self._replicate_app_state(app_name, state, shard)
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        shard = await self._shard(user_id)
+        return await shard.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def get_session_window(self, *, app_name: str, user_id: str, session_id: str,
+                                 config: Optional[GetSessionConfig] = None) -> Optional[SessionWindow]:
+        """加载会话的事件窗口，参数同SQLiteSessionService.get_session_window"""
+        shard = await self._shard(user_id)
+        return await shard.get_session_window(app_name=app_name, user_id=user_id, session_id=session_id,
+                                              config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        if user_id is not None:
+            shard = await self._shard(user_id)
+            return await shard.list_sessions(app_name=app_name, user_id=user_id)
+
+        # 并发查询所有分片；再平衡期间正在迁移的用户可能同时出现在两个分片中
+        responses = await asyncio.gather(
+            *[shard.list_sessions(app_name=app_name) for shard in self._active_shards()]
+        )
+        sessions = {}
+        for response in responses:
+            for session in response.sessions:
+                sessions.setdefault((session.user_id, session.id), session)
+        return ListSessionsResponse(sessions=list(sessions.values()))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        shard = await self._shard(user_id)
+        await shard.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        shard = await self._shard(user_id)
+        return await shard.get_user_state(app_name=app_name, user_id=user_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        shard = await self._shard(session.user_id)
+        event = await shard.append_event(session, event)
+        if not event.partial and event.actions:
+            await self._replicate_app_state(session.app_name, event.actions.state_delta, shard)
+        return event
+
+    async def flush(self) -> None:
+        """提交所有分片缓冲中的事件"""
+        await asyncio.gather(*[shard.flush() for shard in self.shards])
+
+    async def close(self) -> None:
+        """停止后台再平衡（下次启动时继续），提交剩余事件后关闭所有分片"""
+        if self._rebalance_task is not None and not self._rebalance_task.done():
+            self._rebalance_task.cancel()
+            try:
+                await self._rebalance_task
+            except asyncio.CancelledError:
+                pass
+        results = await asyncio.gather(*[shard.close() for shard in self.shards], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def stats(self) -> Dict:
+        """获取分片布局、再平衡进度和每个分片的组提交统计"""
+        return {
+            "shards": self._ring.shards,
+            "rebalancing_from": self._old_ring.shards if self._old_ring else None,
+            "settled_users": len(self._settled),
+            "moved_users": self.moved_users,
+            "per_shard": [shard.stats() for shard in self.shards],
+        }
+
+
+def split_database(source: str, path: str = None, shards: int = 4, vnodes: int = 64) -> List[int]:
+    """
+    把单文件会话数据库离线拆分为分片文件，并写入布局清单（源文件保持不变）
+
+    每个分片复制源库的表结构、索引、应用状态和ADK元数据，只保留属于该分片的用户的会话、事件和用户状态。
+    拆分期间不能有进程写入源库。
+
+    Args:
+        source: 单文件数据库路径
+        path: 分片前的数据库路径（决定分片文件名和清单位置），默认与source相同
+        shards: 分片数
+        vnodes: 每个分片的虚拟节点数
+
+    Returns:
+        List[int]: 每个分片的会话数
+
+    Raises:
+        FileExistsError: 分片文件或清单已存在
+        sqlite3.OperationalError: 源文件不存在或不是会话数据库
+    """
+    path = path or source
+    targets = [shard_path(path, index) for index in range(shards)]
+    for target in targets + [_manifest_path(path)]:
+        if os.path.exists(target):
+            raise FileExistsError(f"{target} 已存在")
+
+    ring = HashRing(shards, vnodes)
+    # 源库的建表和建索引语句（不含sqlite_stat1等内部表）
+    with sqlite3.connect(f"file:{source}?mode=ro", uri=True) as connection:
+        schema = connection.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY type = 'index'"
+        ).fetchall()
+    tables = [name for kind, name, _ in schema if kind == "table"]
+    user_tables = {"sessions", "events", "user_states"}
+
+    counts = []
+    for index, target in enumerate(targets):
+        connection = sqlite3.connect(f"file:{target}", uri=True)
+        try:
+            connection.create_function("shard_for", 1, ring.shard_for, deterministic=True)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("ATTACH DATABASE ? AS source", (f"file:{source}?mode=ro",))
+            with connection:
+                for _, _, sql in schema:
+                    connection.execute(sql)
+                # 先复制会话再复制事件，满足外键顺序
+                for table in sorted(tables, key=lambda name: name == "events"):
+                    where = f" WHERE shard_for(user_id) = {index}" if table in user_tables else ""
+                    connection.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table}{where}")
+            counts.append(connection.execute("SELECT COUNT(*) FROM main.sessions").fetchone()[0])
+            connection.execute("DETACH DATABASE source")
+        finally:
+            connection.close()
+
+    _write_manifest(path, shards, None, vnodes)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片会话存储的维护命令")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split = commands.add_parser("split", help="把单文件数据库拆分为分片文件")
+    split.add_argument("source", help="单文件数据库路径，如 my_agent_data.db")
+    split.add_argument("--shards", type=int, default=ShardingConfig.shards, help="分片数")
+    split.add_argument("--vnodes", type=int, default=ShardingConfig.vnodes, help="每个分片的虚拟节点数")
+    rebalance = commands.add_parser("rebalance", help="把分片数改为指定值并等待再平衡完成")
+    rebalance.add_argument("path", help="分片前的数据库路径，如 my_agent_data.db")
+    rebalance.add_argument("--shards", type=int, required=True, help="新的分片数")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        counts = split_database(args.source, shards=args.shards, vnodes=args.vnodes)
+        for index, count in enumerate(counts):
+            print(f"{shard_path(args.source, index)}: {count} sessions")
+        return
+
+    async def _rebalance():
+        service = ShardedSessionService(args.path, ShardingConfig(shards=args.shards))
+        try:
+            moved = await service.rebalance()
+        finally:
+            await service.close()
+        print(f"moved {moved} users, now {args.shards} shards")
+
+    asyncio.run(_rebalance())
+
+
+if __name__ == "__main__":
+    main()
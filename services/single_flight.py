@@ -0,0 +1,104 @@
+"""
+请求合并 - 相同的并发请求只向模型发送一次，结果分发给所有等待者
+"""
+
+import asyncio
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import PrivateAttr
+
+from .response_cache import request_fingerprint
+from .wrapped_llm import WrappedLlm
+
+
+class _Flight:
+    """一次正在进行的模型调用，记录已产生的响应供后加入的订阅者补发"""
+
+    def __init__(self):
+        self.responses: List[LlmResponse] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Condition()
+
+
+class SingleFlightLlm(WrappedLlm):
+    """对相同请求做在途去重的模型，流式响应会逐片段分发给每个订阅者"""
+
+    _flights: Dict[str, _Flight] = PrivateAttr(default_factory=dict)
+    _issued: int = PrivateAttr(default=0)
+    _coalesced: int = PrivateAttr(default=0)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = f"{int(stream)}:{request_fingerprint(llm_request, self.model)}"
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.get_running_loop().create_task(
+                self._run(key, flight, llm_request, stream)
+            )
+            self._issued += 1
+        else:
+            self._coalesced += 1
+
+        flight.subscribers += 1
+        try:
+            index = 0
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: len(flight.responses) > index or flight.done)
+                    pending = flight.responses[index:]
+                    finished = flight.done
+                index += len(pending)
+
+                for response in pending:
+                    # 每个订阅者拿到独立副本，避免下游回调互相修改
+                    yield response.model_copy(deep=True)
+                if finished and index == len(flight.responses):
+                    break
+
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            # 所有订阅者都离开时取消底层调用
+            if flight.subscribers == 0 and not flight.done:
+                flight.task.cancel()
+
+    async def _run(self, key: str, flight: _Flight, llm_request: LlmRequest, stream: bool):
+        """由首个请求触发，在独立任务中执行，单个订阅者取消不会影响其他订阅者"""
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                async with flight.changed:
+                    flight.responses.append(response)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError as e:
+            flight.error = e
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def stats(self) -> dict:
+        """
+        获取合并统计
+
+        Returns:
+            dict: issued为实际发往模型的请求数，coalesced为被合并的请求数
+        """
+        total = self._issued + self._coalesced
+        return {
+            "issued": self._issued,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._flights),
+            "coalesce_rate": self._coalesced / total if total else 0.0,
+        }
@@ -0,0 +1,236 @@
+"""
+SQLite会话存储 - WAL模式和连接参数调优、有上限的连接池、覆盖索引，以及分页读取事件的检查接口
+"""
+
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.session import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .group_commit import GroupCommitConfig, GroupCommitSessionService
+from .session_window import SessionWindow, SessionWindowConfig, load_session_window
+
+# 在ADK自带索引之外补充的索引
+# events: 覆盖按会话检查事件元数据的查询（不读取event_data）
+# sessions: list_sessions按update_time排序
+SESSION_STORE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_events_app_user_session_ts_cover "
+    "ON events (app_name, user_id, session_id, timestamp, id, invocation_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_app_user_update "
+    "ON sessions (app_name, user_id, update_time)",
+)
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """SQLite连接参数和连接池配置"""
+
+    # WAL模式下读写互不阻塞；NORMAL只在检查点时fsync，崩溃时可能丢失最后几个事务但不会损坏数据库
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    # 每个连接的页缓存（MB）和内存映射大小（MB）
+    cache_size_mb: int = 64
+    mmap_size_mb: int = 256
+    # 等待写锁的时间（毫秒），超过后报database is locked
+    busy_timeout_ms: int = 5000
+    temp_store: str = "MEMORY"
+    # 连接池大小（不允许溢出）和获取连接的超时（秒）
+    pool_size: int = 4
+    pool_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "SQLiteProfile":
+        """
+        根据环境变量创建配置
+
+        环境变量:
+            SQLITE_SYNCHRONOUS: OFF / NORMAL / FULL
+            SQLITE_CACHE_MB: 每个连接的页缓存大小
+            SQLITE_MMAP_MB: 内存映射大小，0表示不使用
+            SQLITE_POOL_SIZE: 连接池大小
+        """
+        cache_mb = os.getenv("SQLITE_CACHE_MB")
+        mmap_mb = os.getenv("SQLITE_MMAP_MB")
+        pool_size = os.getenv("SQLITE_POOL_SIZE")
+        return cls(
+            synchronous=os.getenv("SQLITE_SYNCHRONOUS") or cls.synchronous,
+            cache_size_mb=int(cache_mb) if cache_mb else cls.cache_size_mb,
+            mmap_size_mb=int(mmap_mb) if mmap_mb else cls.mmap_size_mb,
+            pool_size=int(pool_size) if pool_size else cls.pool_size,
+        )
+
+    def pragmas(self) -> List[str]:
+        """每个新连接上执行的PRAGMA语句"""
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA cache_size=-{self.cache_size_mb * 1024}",
+            f"PRAGMA mmap_size={self.mmap_size_mb * 1024 * 1024}",
+            f"PRAGMA busy_timeout={self.busy_timeout_ms}",
+            f"PRAGMA temp_store={self.temp_store}",
+            "PRAGMA foreign_keys=ON",
+        ]
+
+    def engine_kwargs(self) -> Dict:
+        """传给create_async_engine的连接池参数"""
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": 0,
+            "pool_timeout": self.pool_timeout,
+        }
+
+
+def apply_sqlite_profile(engine: AsyncEngine, profile: SQLiteProfile):
+    """
+    让引擎的每个新连接都执行profile中的PRAGMA
+
+    Args:
+        engine: SQLite异步引擎（需在建立第一个连接前调用）
+        profile: 连接参数配置
+    """
+    statements = profile.pragmas()
+
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    event.listen(engine.sync_engine, "connect", _on_connect)
+
+
+class SQLiteSessionService(GroupCommitSessionService):
+    """使用调优参数和补充索引的SQLite会话存储，事件写入沿用组提交"""
+
+    def __init__(self, path: str = "my_agent_data.db", profile: SQLiteProfile = None,
+                 config: GroupCommitConfig = None):
+        """
+        初始化会话存储
+
+        Args:
+            path: SQLite文件路径
+            profile: 连接参数配置，默认根据环境变量创建
+            config: 组提交配置，默认根据环境变量创建
+        """
+        self.path = path
+        self.profile = profile or SQLiteProfile.from_env()
+        super().__init__(db_url=f"sqlite+aiosqlite:///{path}", config=config, **self.profile.engine_kwargs())
+        apply_sqlite_profile(self.db_engine, self.profile)
+        self._indexes_created = False
+
+    async def prepare_tables(self) -> None:
+        await super().prepare_tables()
+        if not self._indexes_created:
+            async with self.db_engine.begin() as connection:
+                for statement in SESSION_STORE_INDEXES:
+                    await connection.exec_driver_sql(statement)
+            self._indexes_created = True
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        if isinstance(config, SessionWindowConfig):
+            window = await load_session_window(
+                self, app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+            return window.session if window else None
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def get_session_window(self, *, app_name: str, user_id: str, session_id: str,
+                                 config: Optional[GetSessionConfig] = None) -> Optional[SessionWindow]:
+        """
+        加载会话的事件窗口，更早的事件可以通过SessionWindow.load_older按需加载
+
+        Args:
+            app_name: 应用名称
+            user_id: 用户ID
+            session_id: 会话ID
+            config: 窗口配置，如SessionWindowConfig(num_recent_events=50)
+
+        Returns:
+            Optional[SessionWindow]: 会话不存在时返回None
+        """
+        return await load_session_window(
+            self, app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def close(self) -> None:
+        """提交剩余事件，更新查询规划统计后释放连接"""
+        try:
+            await self.flush()
+            if self._indexes_created:
+                async with self.db_engine.connect() as connection:
+                    await connection.exec_driver_sql("PRAGMA optimize")
+        finally:
+            await super().close()
+
+
+def iter_stored_events(path: str, app_name: str = None, user_id: str = None, session_id: str = None,
+                       page_size: int = 100, include_data: bool = False) -> Iterator[Dict]:
+    """
+    按会话和时间顺序分页读取数据库中的事件（只读连接，按键集分页，不会一次性加载整张表）
+
+    Args:
+        path: SQLite文件路径
+        app_name: 只读取该应用的事件
+        user_id: 只读取该用户的事件
+        session_id: 只读取该会话的事件
+        page_size: 每次查询读取的行数
+        include_data: 是否解析event_data，返回author和content；为False时只读覆盖索引
+
+    Yields:
+        Dict: app_name、user_id、session_id、id、invocation_id、timestamp，
+        include_data为True时另有author和content
+
+    Raises:
+        sqlite3.OperationalError: 文件不存在或不是会话数据库
+    """
+    key_columns = "app_name, user_id, session_id, timestamp, id"
+    columns = f"{key_columns}, invocation_id"
+    if include_data:
+        columns += ", json_extract(event_data, '$.author'), json_extract(event_data, '$.content')"
+
+    filters = []
+    params: List = []
+    for column, value in (("app_name", app_name), ("user_id", user_id), ("session_id", session_id)):
+        if value is not None:
+            filters.append(f"{column} = ?")
+            params.append(value)
+
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        last_key: Optional[tuple] = None
+        while True:
+            conditions = list(filters)
+            if last_key is not None:
+                conditions.append(f"({key_columns}) > (?, ?, ?, ?, ?)")
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = connection.execute(
+                f"SELECT {columns} FROM events {where} ORDER BY {key_columns} LIMIT ?",
+                [*params, *(last_key or ()), page_size],
+            ).fetchall()
+
+            for row in rows:
+                record = {
+                    "app_name": row[0],
+                    "user_id": row[1],
+                    "session_id": row[2],
+                    "timestamp": row[3],
+                    "id": row[4],
+                    "invocation_id": row[5],
+                }
+                if include_data:
+                    record["author"] = row[6]
+                    record["content"] = json.loads(row[7]) if row[7] else None
+                yield record
+
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][:5]
+    finally:
+        connection.close()
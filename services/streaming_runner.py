@@ -0,0 +1,183 @@
+"""
+流式运行辅助 - 模型一产生文本就立即输出，并记录首字延迟、字间延迟和总耗时
+"""
+
+import asyncio
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.genai import types
+
+
+@dataclass
+class TurnMetrics:
+    """单轮对话的延迟指标（时间单位：秒）"""
+
+    query: str = ""
+    # 首个文本片段到达的时间（time-to-first-token）
+    ttft: Optional[float] = None
+    # 整轮对话的耗时
+    total: Optional[float] = None
+    # 相邻文本片段之间的间隔
+    intervals: List[float] = field(default_factory=list)
+    chunks: int = 0
+    cancelled: bool = False
+    text: str = ""
+
+    @property
+    def avg_inter_token(self) -> Optional[float]:
+        return sum(self.intervals) / len(self.intervals) if self.intervals else None
+
+    @property
+    def p95_inter_token(self) -> Optional[float]:
+        if not self.intervals:
+            return None
+        intervals = sorted(self.intervals)
+        return intervals[int(len(intervals) * 0.95)]
+
+    def summary(self) -> str:
+        """格式化为一行便于打印的文本"""
+
+        def ms(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+
+        status = " (cancelled)" if self.cancelled else ""
+        return (
+            f"ttft={ms(self.ttft)} itl_avg={ms(self.avg_inter_token)} "
+            f"itl_p95={ms(self.p95_inter_token)} total={ms(self.total)} chunks={self.chunks}{status}"
+        )
+
+
+def _event_text(event: Event) -> str:
+    """取出事件中的可见文本（忽略思考过程和"None"占位）"""
+    if not event.content or not event.content.parts:
+        return ""
+    text = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+    return "" if text == "None" else text
+
+
+async def stream_turn(
+    runner: Runner,
+    user_id: str,
+    session_id: str,
+    query: str,
+    metrics: TurnMetrics = None,
+    abort_signal: asyncio.Event = None,
+) -> AsyncGenerator[str, None]:
+    """
+    以SSE模式运行一轮对话，逐片段产出模型文本
+
+    调用方停止迭代（aclose）或任务被取消时会通知Runner中止本轮调用，
+    适用于客户端断开连接的场景。提前break时请配合contextlib.aclosing使用，
+    以便立即中止而不是等到生成器被回收。
+
+    Args:
+        runner: ADK Runner
+        user_id: 用户ID
+        session_id: 会话ID（需已存在）
+        query: 用户输入
+        metrics: 用于记录本轮延迟指标的对象，可选
+        abort_signal: 外部中止信号，设置后本轮调用会被取消
+
+    Yields:
+        str: 新产生的文本片段
+    """
+    metrics = metrics if metrics is not None else TurnMetrics(query=query)
+    metrics.query = query
+    abort_signal = abort_signal or asyncio.Event()
+    message = types.Content(role="user", parts=[types.Part(text=query)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    start = time.monotonic()
+    last_chunk_at: Optional[float] = None
+    # 当前这条模型回复是否已经以partial片段输出过
+    streamed = False
+    finished = False
+    try:
+        async with aclosing(runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=message,
+            run_config=run_config, abort_signal=abort_signal,
+        )) as events:
+            async for event in events:
+                text = _event_text(event)
+                if event.partial:
+                    streamed = streamed or bool(text)
+                elif streamed:
+                    # 非partial事件是前面片段的汇总，已经输出过
+                    streamed = False
+                    continue
+                if not text:
+                    continue
+
+                now = time.monotonic()
+                if last_chunk_at is None:
+                    metrics.ttft = now - start
+                else:
+                    metrics.intervals.append(now - last_chunk_at)
+                last_chunk_at = now
+                metrics.chunks += 1
+                metrics.text += text
+                yield text
+        finished = True
+    finally:
+        if not finished:
+            metrics.cancelled = True
+            abort_signal.set()
+        metrics.total = time.monotonic() - start
+
+
+async def stream_session(
+    runner: Runner,
+    user_queries: list[str] | str = None,
+    session_name: str = "default",
+    user_id: str = "default",
+    author: str = None,
+) -> List[TurnMetrics]:
+    """
+    在指定会话中依次发送问题，流式打印回复并输出每轮的延迟指标
+
+    Args:
+        runner: ADK Runner（会话服务取自runner.session_service）
+        user_queries: 单个问题或问题列表
+        session_name: 会话ID，不存在时自动创建
+        user_id: 用户ID
+        author: 打印回复时显示的名称，默认使用agent名称
+
+    Returns:
+        List[TurnMetrics]: 每轮对话的延迟指标
+    """
+    print(f"\n ### Session: {session_name}")
+
+    session_service = runner.session_service
+    session = await session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_name
+    )
+    if session is None:
+        session = await session_service.create_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session_name
+        )
+
+    if not user_queries:
+        print("No queries!")
+        return []
+    if isinstance(user_queries, str):
+        user_queries = [user_queries]
+
+    author = author or runner.agent.name
+    results = []
+    for query in user_queries:
+        print(f"\nUser > {query}")
+        metrics = TurnMetrics(query=query)
+        results.append(metrics)
+
+        print(f"{author} > ", end="", flush=True)
+        async for chunk in stream_turn(runner, user_id, session.id, query, metrics=metrics):
+            print(chunk, end="", flush=True)
+        print(f"\n   ⏱  {metrics.summary()}")
+
+    return results
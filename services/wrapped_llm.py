@@ -0,0 +1,42 @@
+"""
+模型包装基类 - 在不改变LlmAgent用法的前提下为模型叠加缓存、限流等能力
+"""
+
+from typing import AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import ConfigDict
+
+
+class WrappedLlm(BaseLlm):
+    """包装另一个模型的基类，默认把所有调用原样转发给inner"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # 被包装的模型
+    inner: BaseLlm
+
+    def __init__(self, inner: BaseLlm, **kwargs):
+        """
+        初始化包装模型
+
+        Args:
+            inner: 被包装的模型，模型名称默认沿用inner.model
+        """
+        kwargs.setdefault("model", inner.model)
+        super().__init__(inner=inner, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self.inner.capabilities
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            yield response
+
+    def connect(self, llm_request: LlmRequest):
+        return self.inner.connect(llm_request)
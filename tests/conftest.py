@@ -0,0 +1,7 @@
+"""测试公共配置：把仓库根目录加入sys.path，与benchmarks中的脚本一致"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
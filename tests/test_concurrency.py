@@ -0,0 +1,177 @@
+"""AdaptiveLimiter和LimitedLlm：AIMD调整、排队和延迟指标"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import services.concurrency
+from services.concurrency import (
+    LATENCY_PER_TOKEN,
+    LATENCY_TTFT,
+    AdaptiveLimiter,
+    LimitedLlm,
+    LimiterConfig,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    # 只替换concurrency模块中的time，事件循环仍使用真实时钟
+    monkeypatch.setattr(services.concurrency, "time", SimpleNamespace(monotonic=fake.monotonic))
+    return fake
+
+
+class _FakeLlm(BaseLlm):
+    """按输出token数推进假时钟：首包前ttft秒，之后每个token per_token秒"""
+
+    clock: object = None
+    tokens: int = 10
+    ttft: float = 0.2
+    per_token: float = 0.02
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        usage = types.GenerateContentResponseUsageMetadata(candidates_token_count=self.tokens)
+        content = types.Content(role="model", parts=[types.Part(text="x" * self.tokens)])
+        if stream:
+            self.clock.now += self.ttft
+            yield LlmResponse(content=content, partial=True)
+            self.clock.now += self.per_token * self.tokens
+            yield LlmResponse(content=content, usage_metadata=usage)
+        else:
+            self.clock.now += self.ttft + self.per_token * self.tokens
+            yield LlmResponse(content=content, usage_metadata=usage)
+
+
+async def _call(llm: BaseLlm, stream: bool = False):
+    return [response async for response in llm.generate_content_async(LlmRequest(), stream=stream)]
+
+
+def _limited(clock, config: LimiterConfig = None):
+    fake = _FakeLlm(model="fake", clock=clock)
+    return fake, LimitedLlm(inner=fake, limiter=AdaptiveLimiter(config or LimiterConfig(initial_limit=4)))
+
+
+def test_long_non_streamed_answers_do_not_shrink_limit(clock):
+    fake, llm = _limited(clock)
+
+    async def run():
+        for _ in range(20):
+            await _call(llm)
+        fake.tokens = 400
+        for _ in range(3):
+            await _call(llm)
+
+    asyncio.run(run())
+    stats = llm.limiter.stats()
+    assert stats["decreases"] == 0 and stats["limit"] >= 4
+    assert stats["baseline_latency"] is None and stats["baseline_token_latency"] is not None
+
+
+def test_slower_tokens_count_as_congestion(clock):
+    fake, llm = _limited(clock)
+
+    async def run():
+        for _ in range(20):
+            await _call(llm)
+        fake.per_token = 0.1
+        await _call(llm)
+
+    asyncio.run(run())
+    assert llm.limiter.decreases == 1
+
+
+def test_streaming_uses_time_to_first_token(clock):
+    fake, llm = _limited(clock)
+
+    async def run():
+        for _ in range(20):
+            await _call(llm, stream=True)
+        # 回答变长不影响首包延迟
+        fake.tokens = 400
+        await _call(llm, stream=True)
+        decreases = llm.limiter.decreases
+        fake.ttft = 1.0
+        await _call(llm, stream=True)
+        return decreases
+
+    assert asyncio.run(run()) == 0
+    assert llm.limiter.decreases == 1
+    assert llm.limiter.baseline_latency == pytest.approx(0.2, rel=0.3)
+
+
+def test_overload_errors_decrease_limit(clock):
+    class _Overloaded(Exception):
+        status_code = 503
+
+    class _Failing(BaseLlm):
+        async def generate_content_async(self, llm_request, stream=False):
+            raise _Overloaded()
+            yield
+
+    llm = LimitedLlm(inner=_Failing(model="fake"), limiter=AdaptiveLimiter(LimiterConfig(initial_limit=10)))
+    with pytest.raises(_Overloaded):
+        asyncio.run(_call(llm))
+    assert llm.limiter.overloads == 1 and llm.limiter.limit == pytest.approx(7.0)
+    assert llm.limiter.in_flight == 0
+
+
+def test_limiter_metrics_have_separate_baselines():
+    limiter = AdaptiveLimiter(LimiterConfig(initial_limit=4))
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(latency=0.5, metric=LATENCY_TTFT)
+        await limiter.acquire()
+        limiter.release(latency=0.01, metric=LATENCY_PER_TOKEN)
+        # 首包延迟0.5秒相对首包基线正常，不和每token基线比较
+        await limiter.acquire()
+        limiter.release(latency=0.5, metric=LATENCY_TTFT)
+
+    asyncio.run(run())
+    assert limiter.decreases == 0
+    assert limiter.limit > 4
+
+
+def test_waiters_are_admitted_in_order_and_time_out():
+    limiter = AdaptiveLimiter(LimiterConfig(initial_limit=1, queue_timeout=0.05))
+
+    async def run():
+        await limiter.acquire()
+        order = []
+
+        async def waiter(name):
+            await limiter.acquire(timeout=1.0)
+            order.append(name)
+            limiter.release()
+
+        tasks = [asyncio.ensure_future(waiter(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 3
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+        await limiter.acquire()
+        with pytest.raises(TimeoutError):
+            await limiter.acquire()
+        limiter.release()
+        return order
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert limiter.timed_out == 1 and limiter.in_flight == 0 and limiter.max_queue_depth == 3
@@ -0,0 +1,87 @@
+"""GroupCommitSessionService：过期检查、缺失的状态行和按会话隔离的批次失败"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from google.adk.errors._stale_session_error import StaleSessionError
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from services.group_commit import GroupCommitConfig
+from services.sqlite_store import SQLiteSessionService
+
+
+def _event(text: str, delta=None, event_id: str = None) -> Event:
+    event = Event(author="user", invocation_id="i", actions=EventActions(state_delta=delta or {}),
+                  content=types.Content(role="user", parts=[types.Part(text=text)]))
+    if event_id is not None:
+        event.id = event_id
+    return event
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_markerless_stale_session_is_rejected(db_path):
+    async def run():
+        service = SQLiteSessionService(db_path, config=GroupCommitConfig(max_delay=0))
+        await service.create_session(app_name="a", user_id="u", session_id="s")
+        first = await service.get_session(app_name="a", user_id="u", session_id="s")
+        second = await service.get_session(app_name="a", user_id="u", session_id="s")
+        await service.append_event(first, _event("one"))
+
+        # 没有版本标记的会话对象（如手动构造的）按更新时间和最后一条事件判断
+        second._storage_update_marker = None
+        with pytest.raises(StaleSessionError):
+            await service.append_event(second, _event("two"))
+
+        first._storage_update_marker = None
+        await service.append_event(first, _event("three"))
+        stored = await service.get_session(app_name="a", user_id="u", session_id="s")
+        await service.close()
+        return [event.content.parts[0].text for event in stored.events]
+
+    assert asyncio.run(run()) == ["one", "three"]
+
+
+def test_missing_state_rows_are_created(db_path):
+    async def run():
+        service = SQLiteSessionService(db_path, config=GroupCommitConfig(max_delay=0))
+        session = await service.create_session(app_name="a", user_id="u", session_id="s")
+        with sqlite3.connect(db_path) as connection:
+            connection.execute("DELETE FROM app_states")
+            connection.execute("DELETE FROM user_states")
+        await service.append_event(session, _event("one", {"app:k": 1, "user:k": 2}))
+        await service.append_event(session, _event("two", {"app:j": 3}))
+        stored = await service.get_session(app_name="a", user_id="u", session_id="s")
+        await service.close()
+        return stored.state
+
+    assert asyncio.run(run()) == {"app:k": 1, "app:j": 3, "user:k": 2}
+
+
+def test_failed_session_does_not_fail_batch(db_path):
+    async def run():
+        service = SQLiteSessionService(db_path, config=GroupCommitConfig(max_batch=10, max_delay=0.05))
+        good = await service.create_session(app_name="a", user_id="u", session_id="good")
+        bad = await service.create_session(app_name="a", user_id="u", session_id="bad")
+        # 同一会话中重复的事件ID在提交时违反主键约束
+        results = await asyncio.gather(
+            service.append_event(good, _event("ok")),
+            service.append_event(bad, _event("x", event_id="dup")),
+            service.append_event(bad, _event("y", event_id="dup")),
+            return_exceptions=True,
+        )
+        stored = await service.get_session(app_name="a", user_id="u", session_id="good")
+        stats = service.stats()
+        await service.close()
+        return results, stored, stats
+
+    results, stored, stats = asyncio.run(run())
+    assert not isinstance(results[0], Exception)
+    assert isinstance(results[1], Exception) and isinstance(results[2], Exception)
+    assert [event.content.parts[0].text for event in stored.events] == ["ok"]
+    assert stats["failed_batches"] == 1 and stats["events"] == 1
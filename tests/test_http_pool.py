@@ -0,0 +1,64 @@
+"""HttpClientPool：同一个共享客户端跨多次asyncio.run使用"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.http_pool import HttpClientPool
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_survives_event_loop_change(server_url):
+    pool = HttpClientPool()
+    # 与ModelService一样，在事件循环之外创建客户端
+    client = pool.get_http_client(server_url)
+
+    async def _get():
+        response = await client.get(f"{server_url}/")
+        return response.text
+
+    # 第一次运行留下的keep-alive连接绑定在已关闭的事件循环上
+    assert asyncio.run(_get()) == "ok"
+    assert asyncio.run(_get()) == "ok"
+    assert pool.get_http_client(server_url) is client
+    assert pool.stats()[server_url]["total_requests"] == 2
+    assert pool.stats()[server_url]["failed_requests"] == 0
+
+
+def test_aclose_releases_clients(server_url):
+    pool = HttpClientPool()
+
+    async def _run():
+        client = pool.get_http_client(server_url)
+        await client.get(f"{server_url}/")
+        await pool.aclose()
+        return client
+
+    client = asyncio.run(_run())
+    assert client.is_closed
+    assert pool.get_http_client(server_url) is not client
@@ -0,0 +1,117 @@
+"""BalancedLlm：哪些错误计入端点健康状态"""
+
+import asyncio
+from typing import AsyncGenerator
+
+import httpx
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from services.concurrency import AdaptiveLimiter, LimitedLlm, LimiterConfig
+from services.load_balancer import BalancedLlm, LoadBalancer, is_endpoint_failure
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class _FakeLlm(BaseLlm):
+    """按顺序抛出预设的异常，之后正常返回"""
+
+    errors: list = []
+    delay: float = 0.0
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.model)]))
+
+
+def _balanced(models: dict, threshold: int = 1) -> BalancedLlm:
+    balancer = LoadBalancer(failure_threshold=threshold, health_check_interval=0)
+    return BalancedLlm(model="fake", endpoint_models=models, balancer=balancer)
+
+
+async def _collect(llm: BaseLlm):
+    return [response async for response in llm.generate_content_async(LlmRequest())]
+
+
+@pytest.mark.parametrize("error, expected", [
+    (httpx.ConnectError("refused"), True),
+    (httpx.ReadTimeout("slow"), True),
+    (ConnectionRefusedError(), True),
+    (_StatusError(503), True),
+    (_StatusError(429), True),
+    (_StatusError(500), True),
+    (_StatusError(400), False),
+    (TimeoutError("并发排队超时"), False),
+    (ValueError("bad request"), False),
+])
+def test_is_endpoint_failure(error, expected):
+    assert is_endpoint_failure(error) is expected
+
+
+def test_transport_error_fails_over_and_ejects():
+    llm = _balanced({
+        "http://a": _FakeLlm(model="a", errors=[httpx.ConnectError("refused")]),
+        "http://b": _FakeLlm(model="b"),
+    })
+    # 第一次请求随机选中端点，重复直到a失败过一次
+    for _ in range(10):
+        responses = asyncio.run(_collect(llm))
+        assert responses[0].content.parts[0].text in ("a", "b")
+    stats = llm.balancer.stats()
+    assert stats["http://a"]["total_failures"] == 1
+    assert not stats["http://a"]["healthy"]
+    assert stats["http://b"]["total_failures"] == 0
+
+
+def test_request_error_does_not_eject_or_fail_over():
+    inner = _FakeLlm(model="a", errors=[_StatusError(400)])
+    llm = _balanced({"http://a": inner, "http://b": _FakeLlm(model="b", errors=[_StatusError(400)])})
+    with pytest.raises(_StatusError):
+        asyncio.run(_collect(llm))
+    stats = llm.balancer.stats()
+    assert all(endpoint["healthy"] and endpoint["total_failures"] == 0 for endpoint in stats.values())
+    # 请求本身的错误不换端点重试
+    assert sum(endpoint["total_requests"] for endpoint in stats.values()) == 1
+
+
+def test_local_queue_timeout_does_not_eject():
+    # 一个端点、并发上限1、排队0.05秒：突发的第二个请求在本地排队超时
+    limiter = AdaptiveLimiter(LimiterConfig(initial_limit=1, min_limit=1, max_limit=1, queue_timeout=0.05))
+    llm = _balanced({"http://a": LimitedLlm(inner=_FakeLlm(model="a", delay=0.2), limiter=limiter)})
+
+    async def _burst():
+        return await asyncio.gather(*[_collect(llm) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(_burst())
+    assert sum(isinstance(result, TimeoutError) for result in results) == 2
+    stats = llm.balancer.stats()["http://a"]
+    assert stats["healthy"] and stats["total_failures"] == 0
+
+
+def test_cancellation_is_not_counted():
+    llm = _balanced({"http://a": _FakeLlm(model="a", delay=1.0)})
+
+    async def _cancelled():
+        task = asyncio.ensure_future(_collect(llm))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(_cancelled())
+    stats = llm.balancer.stats()["http://a"]
+    assert stats["healthy"] and stats["total_failures"] == 0 and stats["outstanding"] == 0
@@ -0,0 +1,60 @@
+"""LocalSearchIndex：按语料签名决定是否重建，以及重复标题的URL去重"""
+
+import os
+
+import pytest
+
+from tools.local_search import LocalSearchIndex
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    (docs_dir / "guide.md").write_text(
+        "# 安装\n\n使用pip安装sqlite依赖。\n\n"
+        "# 示例\n\nsqlite会话示例一。\n\n"
+        "# 示例\n\nsqlite会话示例二。\n",
+        encoding="utf-8",
+    )
+    (docs_dir / "faq.md").write_text("# 常见问题\n\n端口被占用时修改配置。\n", encoding="utf-8")
+    return docs_dir
+
+
+def _index(docs_dir) -> LocalSearchIndex:
+    return LocalSearchIndex(str(docs_dir), index_dir=str(docs_dir.parent / "index"), check_interval=None)
+
+
+def test_duplicate_headings_get_unique_urls(docs):
+    index = _index(docs)
+    results = index.search("sqlite 示例", num_results=10)
+    urls = [result["url"] for result in results]
+    assert len(urls) == len(set(urls))
+    assert any(url.endswith("#示例") for url in urls)
+    assert any(url.endswith("#示例-1") for url in urls)
+    index.close()
+
+
+def test_touch_without_content_change_keeps_index(docs):
+    index = _index(docs)
+    index.refresh()
+    postings = docs.parent / "index" / "postings.bin"
+    written_at = postings.stat().st_mtime_ns
+
+    stat = (docs / "faq.md").stat()
+    os.utime(docs / "faq.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+    assert not index.refresh()
+    assert index.builds == 1
+    assert postings.stat().st_mtime_ns == written_at
+
+    # 新的进程直接加载索引，不再读取文件内容
+    reopened = _index(docs)
+    assert reopened.search("端口")
+    assert reopened.builds == 0 and reopened.tokenized_files == 0
+    reopened.close()
+
+    (docs / "faq.md").write_text("# 常见问题\n\n连接超时时检查代理。\n", encoding="utf-8")
+    assert index.refresh()
+    assert index.builds == 2 and index.reused_files >= 1
+    assert index.search("代理") and not index.search("端口")
+    index.close()
@@ -0,0 +1,72 @@
+"""ModelCatalog：刷新、失败退避和seed兜底（通过本地假 /v1/models 服务）"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fake_models import FakeModelsEndpoint
+from services.model_catalog import ModelCatalog, http_fetcher
+
+
+@pytest.fixture
+def endpoint():
+    with FakeModelsEndpoint(models=["qwen3:30b", "llama3.1:8b"],
+                            details={"qwen3:30b": {"quantization_level": "Q4_K_M"}}) as server:
+        yield server
+
+
+def test_refresh_merges_with_seed(endpoint):
+    catalog = ModelCatalog(http_fetcher(endpoint.api_base), seed=["gemma3:4b"])
+    assert asyncio.run(catalog.refresh())
+    # seed中端点没有返回的模型仍然可用
+    assert catalog.names() == ["gemma3:4b", "llama3.1:8b", "qwen3:30b"]
+    assert catalog.get("qwen3:30b").quantization == "Q4_K_M"
+
+
+def test_down_endpoint_falls_back_to_seed(endpoint):
+    endpoint.failing = True
+    catalog = ModelCatalog(http_fetcher(endpoint.api_base), seed=["qwen3:30b"])
+    assert not asyncio.run(catalog.refresh())
+    assert catalog.failures == 1 and "503" in catalog.last_error
+    assert "qwen3:30b" in catalog
+
+
+def test_failed_refresh_backs_off(endpoint):
+    endpoint.failing = True
+    catalog = ModelCatalog(http_fetcher(endpoint.api_base), seed=["qwen3:30b"], retry_backoff=60)
+
+    async def _lookups():
+        for _ in range(20):
+            assert "qwen3:30b" in catalog
+            await asyncio.sleep(0.01)
+        if catalog._refresh_task is not None:
+            await catalog._refresh_task
+
+    asyncio.run(_lookups())
+    # 只有第一次查询触发刷新，之后在退避时间内不再请求端点
+    assert endpoint.requests == 1
+
+
+def test_refresh_resumes_after_backoff(endpoint):
+    endpoint.failing = True
+    catalog = ModelCatalog(http_fetcher(endpoint.api_base), retry_backoff=0.05)
+
+    async def _lookups():
+        assert not await catalog.refresh()
+        endpoint.failing = False
+        await asyncio.sleep(0.1)
+        # 退避时间已过，查询重新触发后台刷新
+        catalog.names()
+        await catalog._refresh_task
+
+    asyncio.run(_lookups())
+    assert catalog.failures == 0 and catalog.last_error is None
+    assert "llama3.1:8b" in catalog.names()
+
+
+def test_manual_overrides_survive_refresh(endpoint):
+    catalog = ModelCatalog(http_fetcher(endpoint.api_base))
+    catalog.add("custom:1b", context_length=4096)
+    catalog.remove("llama3.1:8b")
+    asyncio.run(catalog.refresh())
+    assert catalog.names() == ["custom:1b", "qwen3:30b"]
@@ -0,0 +1,80 @@
+"""ModelService.warm_up：直接调用每个端点的模型，不经过响应缓存和请求合并"""
+
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from services.concurrency import LimitedLlm
+from services.model_catalog import ModelCatalog, static_fetcher
+from services.model_service import ModelService
+from services.response_cache import ResponseCache
+
+MODEL = "qwen3:30b"
+ENDPOINTS = ["http://gpu1:11434/v1", "http://gpu2:11434/v1"]
+
+
+class _FakeLlm(BaseLlm):
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="hello")]))
+
+
+class _FakeModelService(ModelService):
+    """每个端点使用假模型，其余包装与真实构建相同"""
+
+    def __init__(self, **kwargs):
+        super().__init__(catalog=ModelCatalog(static_fetcher([]), seed=[MODEL]), **kwargs)
+        self.fakes = {}
+
+    def _build_endpoint_model(self, model_name: str, api_base: str) -> BaseLlm:
+        fake = self.fakes[api_base] = _FakeLlm(model=model_name)
+        return LimitedLlm(inner=fake, limiter=self.get_limiter(model_name, api_base))
+
+
+@pytest.mark.parametrize("mode", [ResponseCache.MODE_RECORD, ResponseCache.MODE_REPLAY])
+def test_warm_up_bypasses_response_cache(mode, tmp_path):
+    service = _FakeModelService(response_cache=ResponseCache(path=str(tmp_path / "llm.sqlite"), mode=mode),
+                                single_flight=True, endpoints={MODEL: ENDPOINTS})
+
+    async def run():
+        first = await service.warm_up([MODEL])
+        second = await service.warm_up([MODEL])
+        await service.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    for results in (first, second):
+        assert results[MODEL]["status"] == "success" and results[MODEL]["endpoints"] == 2
+    # 每次预热都真正调用了每个端点，且不计入自适应并发限制的延迟统计
+    assert {api_base: fake.calls for api_base, fake in service.fakes.items()} == {api_base: 2 for api_base in ENDPOINTS}
+    cache = service.response_cache.stats()
+    assert (cache["hits"], cache["misses"], cache["writes"]) == (0, 0, 0)
+    assert all(stats["admitted"] == 0 for stats in service.get_limiter_stats().values())
+
+
+def test_warm_up_reports_failed_endpoint(tmp_path):
+    service = _FakeModelService(response_cache=None, endpoints={MODEL: ENDPOINTS})
+
+    async def failing(llm_request, stream=False):
+        raise ConnectionError("refused")
+        yield
+
+    async def run():
+        service.create_model(MODEL)
+        object.__setattr__(service.fakes[ENDPOINTS[1]], "generate_content_async", failing)
+        results = await service.warm_up([MODEL, "missing"])
+        await service.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert results[MODEL]["status"] == "error" and ENDPOINTS[1] in results[MODEL]["error"]
+    assert results["missing"]["status"] == "error"
@@ -0,0 +1,76 @@
+"""request_fingerprint：哪些请求变化会让缓存失效，哪些不会"""
+
+import warnings
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import FunctionTool
+from google.genai import types
+
+from services.response_cache import ResponseCache, request_fingerprint
+
+
+def lookup(query: str) -> str:
+    """在知识库中查找"""
+    return query
+
+
+def _request(tool=None, system: str = "be brief", temperature: float = 0.0, call_id: str = "call-1") -> LlmRequest:
+    request = LlmRequest(
+        model="qwen3:30b",
+        contents=[
+            types.Content(role="user", parts=[types.Part(text="hi")]),
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                id=call_id, name="lookup", args={"query": "hi"}))]),
+        ],
+        config=types.GenerateContentConfig(system_instruction=system, temperature=temperature),
+    )
+    if tool is not None:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            request.append_tools([FunctionTool(tool)])
+    return request
+
+
+def test_fingerprint_ignores_random_call_ids():
+    assert request_fingerprint(_request(call_id="a")) == request_fingerprint(_request(call_id="b"))
+
+
+def test_fingerprint_covers_system_instruction_and_generation_config():
+    base = request_fingerprint(_request())
+    assert request_fingerprint(_request(system="be verbose")) != base
+    assert request_fingerprint(_request(temperature=0.7)) != base
+    assert request_fingerprint(_request(), model_name="other") != base
+
+
+def test_fingerprint_covers_tool_declarations():
+    def changed(query: str, limit: int = 5) -> str:
+        """在知识库中查找"""
+        return query
+
+    # 同名工具，参数schema不同
+    changed.__name__ = "lookup"
+    assert request_fingerprint(_request(tool=lookup)) != request_fingerprint(_request(tool=changed))
+
+
+def test_fingerprint_covers_tools_missing_from_config():
+    def changed(query: str, limit: int = 5) -> str:
+        """在知识库中查找"""
+        return query
+
+    changed.__name__ = "lookup"
+    requests = [_request(tool=lookup), _request(tool=changed)]
+    # 工具只出现在tools_dict中，没有写入config.tools
+    for request in requests:
+        request.config.tools = None
+    assert request_fingerprint(requests[0]) != request_fingerprint(requests[1])
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    key = request_fingerprint(_request())
+    assert cache.get(key) is None
+    response = LlmResponse(content=types.Content(role="model", parts=[types.Part(text="hello")]))
+    cache.put(key, "qwen3:30b", [response])
+    assert [item.content.parts[0].text for item in cache.get(key)] == ["hello"]
+    assert cache.hits == 1 and cache.misses == 1
@@ -0,0 +1,80 @@
+"""SearchProvider限流：缓存命中不计入限流，分页时每次请求前申请令牌（通过本地假SerpAPI服务）"""
+
+import asyncio
+
+import pytest
+
+import tools.serp
+from benchmarks.fake_serpapi import FakeSerpAPI, build_response
+from tools.search_providers import RateLimiter, SearchProvider
+from tools.serp import SearchCache, SerpAPISearch
+
+
+class _CountingLimiter(RateLimiter):
+    """记录每次申请令牌时服务端已经收到的请求数"""
+
+    def __init__(self, server: FakeSerpAPI):
+        super().__init__(rate=1000)
+        self.server = server
+        self.requests_seen = []
+
+    async def acquire(self):
+        self.requests_seen.append(self.server.requests)
+        await super().acquire()
+
+    def acquire_sync(self):
+        self.requests_seen.append(self.server.requests)
+        super().acquire_sync()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeSerpAPI(latency=0, jitter=0, total_results=40) as fake:
+        monkeypatch.setattr(tools.serp, "SERPAPI_ENDPOINT", fake.endpoint)
+        yield fake
+
+
+def _provider(server, cache=None):
+    backend = SerpAPISearch(api_key="fake", cache=cache)
+    return SearchProvider("test", backend, _CountingLimiter(server))
+
+
+def test_cache_hits_skip_rate_limiter(server):
+    provider = _provider(server, cache=SearchCache())
+
+    async def run():
+        first = await provider.search("sqlite", 5)
+        second = await provider.search("sqlite", 5)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert not first["cached"] and second["cached"]
+    assert len(provider.rate_limiter.requests_seen) == 1
+    assert provider.calls == 2
+    # 未命中只计一次，不因为后端再查一次缓存而重复计入
+    cache = provider.backend.cache.stats()
+    assert (cache["hits"], cache["misses"], cache["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_sync_cache_miss_is_counted_once(server):
+    provider = _provider(server, cache=SearchCache())
+    provider.backend.client.search = lambda params: build_response(params, server.config)
+    first = provider.search_sync("sqlite", 5)
+    second = provider.search_sync("sqlite", 5)
+    assert first["status"] == "success" and second["cached"]
+    cache = provider.backend.cache.stats()
+    assert (cache["hits"], cache["misses"]) == (1, 1)
+
+
+@pytest.mark.parametrize("max_results", [10, 25])
+def test_each_page_fetch_acquires_a_token_first(server, max_results):
+    provider = _provider(server)
+
+    async def run():
+        return [result async for result in provider.iter_results("sqlite", max_results=max_results, page_size=10)]
+
+    results = asyncio.run(run())
+    assert len(results) == max_results
+    # 第n次申请令牌时服务端只收到了之前的n-1个请求（预取的页面也要先拿到令牌）
+    limiter = provider.rate_limiter
+    assert limiter.requests_seen == list(range(server.requests))
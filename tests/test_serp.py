@@ -0,0 +1,92 @@
+"""serpapi_search_deep：结果来源标注和错误结果；serpapi_search_many：合并去重"""
+
+import asyncio
+
+import pytest
+
+from tools.local_search import LocalSearchIndex
+from tools.search_providers import register_provider, reset_providers
+from tools.serp import SerpAPISearch, serpapi_search_deep, serpapi_search_many
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    def _use(backend):
+        register_provider("test", lambda: backend, replace=True)
+        monkeypatch.setenv("SEARCH_PROVIDER", "test")
+        monkeypatch.delenv("SEARCH_RATE_LIMIT", raising=False)
+        reset_providers()
+        return backend
+
+    yield _use
+    reset_providers()
+
+
+def test_deep_search_labels_demo_results(use_backend):
+    use_backend(SerpAPISearch(api_key=None, local_index=None, cache=None))
+    response = asyncio.run(serpapi_search_deep("sqlite", max_results=3))
+    assert response["status"] == "success"
+    assert response["source"] == "demo_mode"
+
+
+def test_deep_search_labels_local_results(use_backend, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "sqlite.md").write_text("# SQLite\n\nsqlite会话存储。\n", encoding="utf-8")
+    index = LocalSearchIndex(str(docs), index_dir=str(tmp_path / "index"), check_interval=None)
+    use_backend(SerpAPISearch(api_key=None, local_index=index, cache=None))
+    response = asyncio.run(serpapi_search_deep("sqlite", max_results=3))
+    assert response["source"] == "local"
+    assert response["results"]
+    index.close()
+
+
+def test_deep_search_error_response(use_backend):
+    class _Failing(SerpAPISearch):
+        async def iter_results(self, query, max_results=50, page_size=10, **kwargs):
+            raise ConnectionError("熔断")
+            yield
+
+    use_backend(_Failing(api_key=None, local_index=None, cache=None))
+    response = asyncio.run(serpapi_search_deep("sqlite"))
+    assert response == SerpAPISearch.error_response("sqlite", ConnectionError("熔断"))
+    assert response["status"] == "error" and response["results"] == []
+
+
+def test_search_many_keeps_distinct_results_without_url(use_backend):
+    class _Backend(SerpAPISearch):
+        async def search_web_async(self, query, num_results=5, **kwargs):
+            # 整形后的结果不带position
+            return {"status": "success", "query": query, "results": [
+                {"title": f"{query} 答案一", "url": "", "snippet": "一"},
+                {"title": f"{query} 答案二", "url": "", "snippet": "二"},
+                {"title": "共同结果", "url": "https://example.com/shared", "snippet": "三"},
+            ]}
+
+    use_backend(_Backend(api_key=None, local_index=None, cache=None))
+    response = asyncio.run(serpapi_search_many(["sqlite", "postgres"]))
+    titles = [item["title"] for item in response["results"]]
+    assert titles == ["sqlite 答案一", "sqlite 答案二", "共同结果", "postgres 答案一", "postgres 答案二"]
+    shared = response["results"][2]
+    assert shared["queries"] == ["sqlite", "postgres"]
+
+
+def test_http_client_per_event_loop():
+    from tools.serp import aclose_http_client, get_http_client
+
+    async def get():
+        return get_http_client()
+
+    first_loop = asyncio.new_event_loop()
+    try:
+        first = first_loop.run_until_complete(get())
+        # 在另一个事件循环中使用不会替换第一个循环的客户端
+        second = asyncio.run(get())
+        assert second is not first
+        assert first_loop.run_until_complete(get()) is first and not first.is_closed
+        first_loop.run_until_complete(aclose_http_client())
+        assert first.is_closed
+        assert first_loop.run_until_complete(get()) is not first
+        first_loop.run_until_complete(aclose_http_client())
+    finally:
+        first_loop.close()
@@ -0,0 +1,165 @@
+"""TieredSessionService：共享状态同步、按窗口读取、写回模式和多进程共用数据库"""
+
+import asyncio
+
+import pytest
+from google.adk.errors._stale_session_error import StaleSessionError
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.database_session_service import DatabaseSessionService
+from google.genai import types
+
+from services.group_commit import GroupCommitConfig
+from services.session_cache import WRITE_BEHIND, WRITE_THROUGH, SessionCacheConfig, TieredSessionService
+from services.sharded_store import ShardedSessionService, ShardingConfig
+from services.sqlite_store import SQLiteSessionService
+
+COMMIT = GroupCommitConfig(max_delay=0)
+
+
+def _event(text: str, delta=None) -> Event:
+    return Event(author="user", invocation_id="i", actions=EventActions(state_delta=delta or {}),
+                 content=types.Content(role="user", parts=[types.Part(text=text)]))
+
+
+def _texts(session) -> list:
+    return [event.content.parts[0].text for event in session.events]
+
+
+STORES = {
+    "database": lambda path: DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{path}"),
+    "group_commit": lambda path: SQLiteSessionService(path, config=COMMIT),
+    "sharded": lambda path: ShardedSessionService(path, ShardingConfig(shards=2), commit_config=COMMIT),
+    "tiered": lambda path: TieredSessionService(SQLiteSessionService(path, config=COMMIT), SessionCacheConfig()),
+    "tiered_write_behind": lambda path: TieredSessionService(
+        SQLiteSessionService(path, config=COMMIT), SessionCacheConfig(write_mode=WRITE_BEHIND)),
+    "tiered_sharded": lambda path: TieredSessionService(
+        ShardedSessionService(path, ShardingConfig(shards=2), commit_config=COMMIT), SessionCacheConfig()),
+}
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_create_session_updates_shared_state_of_cached_sessions(store, tmp_path):
+    async def run():
+        service = STORES[store](str(tmp_path / "sessions.db"))
+        await service.create_session(app_name="a", user_id="u1", session_id="s1",
+                                     state={"app:k": "u1", "user:k": "u1"})
+        await service.get_session(app_name="a", user_id="u1", session_id="s1")
+        await service.create_session(app_name="a", user_id="u2", session_id="s2", state={"app:k": "u2"})
+        await service.create_session(app_name="a", user_id="u1", session_id="s3", state={"user:k": "s3"})
+        session = await service.get_session(app_name="a", user_id="u1", session_id="s1")
+        await service.close()
+        return session.state
+
+    assert asyncio.run(run()) == {"app:k": "u2", "user:k": "s3"}
+
+
+class _RecordingStore(SQLiteSessionService):
+    def __init__(self, path: str):
+        super().__init__(path, config=COMMIT)
+        self.configs = []
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        self.configs.append(config)
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+
+def test_windowed_miss_is_served_by_store(tmp_path):
+    async def run():
+        store = _RecordingStore(str(tmp_path / "sessions.db"))
+        session = await store.create_session(app_name="a", user_id="u", session_id="s")
+        for index in range(5):
+            await store.append_event(session, _event(str(index)))
+
+        service = TieredSessionService(store, SessionCacheConfig())
+        tail = await service.get_session(app_name="a", user_id="u", session_id="s",
+                                         config=GetSessionConfig(num_recent_events=2))
+        cached_after_window = service.stats()["sessions"]
+        full = await service.get_session(app_name="a", user_id="u", session_id="s")
+        hit = await service.get_session(app_name="a", user_id="u", session_id="s",
+                                        config=GetSessionConfig(num_recent_events=2))
+        stats = service.stats()
+        await service.close()
+        return store.configs, tail, cached_after_window, full, hit, stats
+
+    configs, tail, cached_after_window, full, hit, stats = asyncio.run(run())
+    assert configs == [GetSessionConfig(num_recent_events=2), None]
+    assert _texts(tail) == ["3", "4"] and cached_after_window == 0
+    assert _texts(full) == ["0", "1", "2", "3", "4"]
+    assert _texts(hit) == ["3", "4"] and stats["hits"] == 1
+
+
+@pytest.mark.parametrize("write_mode", [WRITE_THROUGH, WRITE_BEHIND])
+def test_evicted_sessions_are_persisted(write_mode, tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def run():
+        service = TieredSessionService(SQLiteSessionService(path, config=COMMIT),
+                                       SessionCacheConfig(write_mode=write_mode, max_sessions=1))
+        session = await service.create_session(app_name="a", user_id="u", session_id="s1")
+        for index in range(3):
+            await service.append_event(session, _event(str(index), {"n": index}))
+        # 创建另一个会话会淘汰s1，之后的追加直接写入持久层
+        await service.create_session(app_name="a", user_id="u", session_id="s2")
+        await service.append_event(session, _event("after"))
+        evictions = service.stats()["evictions"]
+        await service.close()
+
+        store = SQLiteSessionService(path, config=COMMIT)
+        stored = await store.get_session(app_name="a", user_id="u", session_id="s1")
+        await store.close()
+        return evictions, stored
+
+    evictions, stored = asyncio.run(run())
+    assert evictions >= 1
+    assert _texts(stored) == ["0", "1", "2", "after"] and stored.state == {"n": 2}
+
+
+def test_shared_mode_loads_other_writers_events(tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def run():
+        config = SessionCacheConfig(shared=True)
+        first = TieredSessionService(SQLiteSessionService(path, config=COMMIT), config)
+        second = TieredSessionService(SQLiteSessionService(path, config=COMMIT), config)
+        session = await first.create_session(app_name="a", user_id="u", session_id="s")
+        await first.append_event(session, _event("one"))
+
+        other = await second.get_session(app_name="a", user_id="u", session_id="s")
+        await second.append_event(other, _event("two", {"k": 2}))
+        refreshed = await first.get_session(app_name="a", user_id="u", session_id="s")
+        stats = first.stats()
+        await first.close()
+        await second.close()
+        return refreshed, stats
+
+    refreshed, stats = asyncio.run(run())
+    assert _texts(refreshed) == ["one", "two"] and refreshed.state == {"k": 2}
+    assert stats["refreshes"] == 1 and stats["hits"] == 1
+
+
+def test_stale_append_drops_cached_copy(tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def run():
+        first = TieredSessionService(SQLiteSessionService(path, config=COMMIT), SessionCacheConfig())
+        second = TieredSessionService(SQLiteSessionService(path, config=COMMIT), SessionCacheConfig())
+        await first.create_session(app_name="a", user_id="u", session_id="s")
+        session = await first.get_session(app_name="a", user_id="u", session_id="s")
+
+        other = await second.get_session(app_name="a", user_id="u", session_id="s")
+        await second.append_event(other, _event("other"))
+
+        with pytest.raises(StaleSessionError):
+            await first.append_event(session, _event("stale"))
+        # 不校验版本时，过期的缓存副本被丢弃，重新读取后可以继续追加
+        reloaded = await first.get_session(app_name="a", user_id="u", session_id="s")
+        await first.append_event(reloaded, _event("retry"))
+        stored = await second.store.get_session(app_name="a", user_id="u", session_id="s")
+        await first.close()
+        await second.close()
+        return reloaded, stored
+
+    reloaded, stored = asyncio.run(run())
+    assert _texts(reloaded) == ["other", "retry"]
+    assert _texts(stored) == ["other", "retry"]
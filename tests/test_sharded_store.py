@@ -0,0 +1,95 @@
+"""ShardedSessionService：路由、应用状态复制、再平衡和离线拆分"""
+
+import asyncio
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from services.group_commit import GroupCommitConfig
+from services.sharded_store import HashRing, ShardedSessionService, ShardingConfig, read_shard_manifest, split_database
+from services.sqlite_store import SQLiteSessionService
+
+COMMIT = GroupCommitConfig(max_delay=0)
+USERS = [f"user-{index}" for index in range(12)]
+
+
+def _event(text: str, delta=None) -> Event:
+    return Event(author="user", invocation_id="i", actions=EventActions(state_delta=delta or {}),
+                 content=types.Content(role="user", parts=[types.Part(text=text)]))
+
+
+async def _populate(service):
+    for user_id in USERS:
+        session = await service.create_session(app_name="a", user_id=user_id, session_id="s",
+                                                state={"user:name": user_id})
+        await service.append_event(session, _event(f"{user_id}-1"))
+    session = await service.get_session(app_name="a", user_id=USERS[0], session_id="s")
+    await service.append_event(session, _event("app", {"app:version": 2}))
+
+
+async def _snapshot(service) -> dict:
+    sessions = {}
+    for user_id in USERS:
+        session = await service.get_session(app_name="a", user_id=user_id, session_id="s")
+        sessions[user_id] = ([event.content.parts[0].text for event in session.events], session.state)
+    return sessions
+
+
+def test_app_state_is_visible_from_every_shard(tmp_path):
+    async def run():
+        service = ShardedSessionService(str(tmp_path / "sessions.db"), ShardingConfig(shards=3), commit_config=COMMIT)
+        await _populate(service)
+        snapshot = await _snapshot(service)
+        listed = await service.list_sessions(app_name="a")
+        await service.close()
+        return snapshot, listed
+
+    snapshot, listed = asyncio.run(run())
+    assert len(listed.sessions) == len(USERS)
+    for user_id, (_, state) in snapshot.items():
+        assert state == {"user:name": user_id, "app:version": 2}
+
+
+def test_rebalance_moves_users_to_new_layout(tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def run():
+        before = ShardedSessionService(path, ShardingConfig(shards=2), commit_config=COMMIT)
+        await _populate(before)
+        expected = await _snapshot(before)
+        await before.close()
+
+        after = ShardedSessionService(path, ShardingConfig(shards=4), commit_config=COMMIT)
+        moved = await after.rebalance()
+        snapshot = await _snapshot(after)
+        rebalancing = after.rebalancing
+        await after.close()
+        return expected, snapshot, moved, rebalancing
+
+    expected, snapshot, moved, rebalancing = asyncio.run(run())
+    old_ring, new_ring = HashRing(2), HashRing(4)
+    assert moved == sum(old_ring.shard_for(user_id) != new_ring.shard_for(user_id) for user_id in USERS)
+    assert snapshot == expected
+    assert not rebalancing
+    assert read_shard_manifest(path) == {"shards": 4, "previous": None, "vnodes": 64}
+
+
+def test_split_database(tmp_path):
+    source = str(tmp_path / "single.db")
+
+    async def run():
+        store = SQLiteSessionService(source, config=COMMIT)
+        await _populate(store)
+        expected = await _snapshot(store)
+        await store.close()
+
+        counts = split_database(source, shards=3)
+        service = ShardedSessionService(source, ShardingConfig(shards=3), commit_config=COMMIT)
+        snapshot = await _snapshot(service)
+        await service.close()
+        return expected, counts, snapshot
+
+    expected, counts, snapshot = asyncio.run(run())
+    ring = HashRing(3)
+    assert counts == [sum(ring.shard_for(user_id) == index for user_id in USERS) for index in range(3)]
+    assert snapshot == expected
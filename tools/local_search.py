@@ -0,0 +1,412 @@
+"""
+本地文档搜索 - 基于BM25的离线搜索后端，用于没有SerpAPI的隔离环境
+
+索引结构（保存在index_dir中）:
+    meta.json      词表、文档块信息和BM25统计量
+    postings.bin   倒排表，每个词对应连续的 (块编号, 词频) uint32 对，加载时mmap
+    texts.bin      文档块原文（UTF-8），生成摘要时按偏移读取，加载时mmap
+    segments.json  每个文件的内容摘要和分词结果，文件未变化时增量更新可直接复用
+
+文件只是时间戳变化（如touch或重新checkout）而内容不变时，语料签名不变，只更新segments.json，
+不重写倒排表和正文文件。
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INDEX_VERSION = 2
+
+# 中文按连续汉字切分后再生成单字和双字词，英文和数字按单词切分
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[a-z0-9]+(?:[._'-][a-z0-9]+)*")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.M)
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to was were with "
+    "的 了 和 是 在 与 及 或 等 也 就 都 而 中 对 为".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：英文小写单词，中文单字+相邻双字（无需额外的中文分词依赖）
+
+    Args:
+        text: 原文
+
+    Returns:
+        List[str]: 词列表
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(unicodedata.normalize("NFKC", text).lower()):
+        token = match.group()
+        if _CJK_RE.match(token):
+            tokens.extend(char for char in token if char not in _STOPWORDS)
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def split_markdown(text: str, file_title: str) -> List[Tuple[str, str, str]]:
+    """
+    按标题把Markdown切成若干块，每块作为一个搜索结果
+
+    Args:
+        text: Markdown原文
+        file_title: 文件标题（没有一级标题时使用）
+
+    Returns:
+        List[Tuple[str, str, str]]: (标题, 锚点, 正文)
+    """
+    headings = list(_HEADING_RE.finditer(text))
+    chunks = []
+    if not headings or headings[0].start() > 0:
+        end = headings[0].start() if headings else len(text)
+        if text[:end].strip():
+            chunks.append((file_title, "", text[:end].strip()))
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        body = text[heading.end():end].strip()
+        if not body:
+            continue
+        title = heading.group(2).strip()
+        chunks.append((f"{file_title} - {title}" if title != file_title else title, title, body))
+    return chunks
+
+
+class LocalSearchIndex:
+    """持久化的BM25索引，文件变化时增量更新"""
+
+    DEFAULT_INDEX_DIR = ".search_index"
+
+    def __init__(self, docs_dir: str, index_dir: str = None, pattern: str = "*.md",
+                 k1: float = 1.5, b: float = 0.75, check_interval: float = 5.0):
+        """
+        初始化本地搜索索引
+
+        Args:
+            docs_dir: 文档目录
+            index_dir: 索引保存目录，默认为 {docs_dir}/../.search_index
+            pattern: 需要索引的文件匹配模式
+            k1: BM25词频饱和参数
+            b: BM25文档长度归一化参数
+            check_interval: 查询时检查文件变化的最小间隔（秒），None表示不自动检查
+        """
+        self.docs_dir = Path(docs_dir).resolve()
+        self.index_dir = Path(index_dir) if index_dir else self.docs_dir.parent / self.DEFAULT_INDEX_DIR
+        self.pattern = pattern
+        self.k1 = k1
+        self.b = b
+        self.check_interval = check_interval
+
+        self.builds = 0
+        self.reused_files = 0
+        self.tokenized_files = 0
+
+        self._lock = threading.RLock()
+        self._meta: Optional[Dict] = None
+        self._postings: Optional[memoryview] = None
+        self._texts: Optional[mmap.mmap] = None
+        self._mmaps: List[mmap.mmap] = []
+        self._files: Dict[str, Tuple[float, int]] = {}
+        self._last_check = 0.0
+
+    # ---- 构建 ----
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        return {
+            path.relative_to(self.docs_dir).as_posix(): (path.stat().st_mtime, path.stat().st_size)
+            for path in sorted(self.docs_dir.glob(self.pattern)) if path.is_file()
+        }
+
+    def _read_segments(self) -> Tuple[Dict[str, Dict], Optional[str]]:
+        """读取上次保存的分词结果和语料签名"""
+        path = self.index_dir / "segments.json"
+        if not path.exists():
+            return {}, None
+        try:
+            segments = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            return {}, None
+        if segments.get("version") != INDEX_VERSION:
+            return {}, None
+        return segments["files"], segments.get("signature")
+
+    @staticmethod
+    def _signature(segments: Dict[str, Dict]) -> str:
+        """语料签名：所有文件名及其内容摘要的哈希"""
+        digest = hashlib.sha1()
+        for name in sorted(segments):
+            digest.update(f"{name}\0{segments[name]['sha1']}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        检查文档目录，有文件新增、内容修改或删除时重建索引；只重新分词内容发生变化的文件
+
+        Args:
+            force: 是否忽略已有分词结果，全部重建
+
+        Returns:
+            bool: 是否重建了索引
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            files = self._scan()
+            if not force and self._meta is not None and files == self._files:
+                return False
+
+            segments, signature = ({}, None) if force else self._read_segments()
+            indexed = {name: (segment["mtime"], segment["size"]) for name, segment in segments.items()}
+            index_exists = (self.index_dir / "meta.json").exists()
+            if not force and self._meta is None and indexed == files and index_exists:
+                # 磁盘上的索引仍然有效，直接加载
+                self._load()
+                self._files = files
+                return False
+
+            new_segments = {}
+            for name, (mtime, size) in files.items():
+                raw = (self.docs_dir / name).read_bytes()
+                digest = hashlib.sha1(raw).hexdigest()
+                chunks = split_markdown(raw.decode("utf-8", errors="replace"), Path(name).stem)
+                previous = segments.get(name)
+                if previous is not None and previous["sha1"] == digest:
+                    term_counts = [chunk["tf"] for chunk in previous["chunks"]]
+                    self.reused_files += 1
+                else:
+                    term_counts = [dict(Counter(tokenize(f"{title}\n{body}"))) for title, _, body in chunks]
+                    self.tokenized_files += 1
+                new_segments[name] = {
+                    "mtime": mtime,
+                    "size": size,
+                    "sha1": digest,
+                    "chunks": [
+                        {"title": title, "anchor": anchor, "body": body, "tf": tf}
+                        for (title, anchor, body), tf in zip(chunks, term_counts)
+                    ],
+                }
+
+            new_signature = self._signature(new_segments)
+            if not force and index_exists and new_signature == signature:
+                # 内容没有变化，只更新记录的文件时间戳
+                self._write_segments(new_segments, new_signature)
+                if self._meta is None:
+                    self._load()
+                self._files = files
+                return False
+
+            self._write(new_segments, new_signature)
+            self._load()
+            self._files = files
+            self.builds += 1
+            return True
+
+    def _write_file(self, filename: str, data: bytes):
+        tmp = self.index_dir / f"{filename}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.index_dir / filename)
+
+    def _write_segments(self, segments: Dict[str, Dict], signature: str):
+        stored_segments = {
+            name: {
+                "mtime": segment["mtime"],
+                "size": segment["size"],
+                "sha1": segment["sha1"],
+                "chunks": [{"tf": chunk["tf"]} for chunk in segment["chunks"]],
+            }
+            for name, segment in segments.items()
+        }
+        data = {"version": INDEX_VERSION, "signature": signature, "files": stored_segments}
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._write_file("segments.json", json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _write(self, segments: Dict[str, Dict], signature: str):
+        """把分词结果写成倒排表和正文文件，先写临时文件再原子替换"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        docs = []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        texts = bytearray()
+        for name, segment in segments.items():
+            # 同一文件中重复的标题加序号，保证每个结果的URL唯一
+            anchors = Counter()
+            for chunk in segment["chunks"]:
+                doc_id = len(docs)
+                body = chunk["body"].encode("utf-8")
+                anchor = chunk["anchor"]
+                anchors[anchor] += 1
+                if anchors[anchor] > 1:
+                    anchor = f"{anchor}-{anchors[anchor] - 1}" if anchor else f"{anchors[anchor] - 1}"
+                docs.append({
+                    "title": chunk["title"],
+                    "url": f"file://{(self.docs_dir / name).as_posix()}" + (f"#{anchor}" if anchor else ""),
+                    "offset": len(texts),
+                    "length": len(body),
+                    "terms": sum(chunk["tf"].values()),
+                })
+                texts += body
+                for term, count in chunk["tf"].items():
+                    postings.setdefault(term, []).append((doc_id, count))
+
+        flat = array("I")
+        vocab = {}
+        for term in sorted(postings):
+            vocab[term] = [len(flat) // 2, len(postings[term])]
+            for doc_id, count in postings[term]:
+                flat.extend((doc_id, count))
+
+        total_terms = sum(doc["terms"] for doc in docs)
+        meta = {
+            "version": INDEX_VERSION,
+            "built_at": time.time(),
+            "signature": signature,
+            "avgdl": total_terms / len(docs) if docs else 0.0,
+            "docs": docs,
+            "vocab": vocab,
+        }
+
+        for filename, data in (
+            ("postings.bin", flat.tobytes()),
+            ("texts.bin", bytes(texts)),
+            ("meta.json", json.dumps(meta, ensure_ascii=False).encode("utf-8")),
+        ):
+            self._write_file(filename, data)
+        self._write_segments(segments, signature)
+
+    def _map(self, path: Path) -> Optional[mmap.mmap]:
+        if path.stat().st_size == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmaps.append(mapped)
+        return mapped
+
+    def _load(self):
+        """加载索引：词表读入内存，倒排表和正文mmap按需读取"""
+        self.close()
+        meta = json.loads((self.index_dir / "meta.json").read_text(encoding="utf-8"))
+        postings = self._map(self.index_dir / "postings.bin")
+        self._postings = memoryview(postings).cast("I") if postings is not None else None
+        self._texts = self._map(self.index_dir / "texts.bin")
+        self._meta = meta
+
+    def close(self):
+        """释放mmap"""
+        with self._lock:
+            if self._postings is not None:
+                self._postings.release()
+                self._postings = None
+            for mapped in self._mmaps:
+                mapped.close()
+            self._mmaps.clear()
+            self._texts = None
+            self._meta = None
+
+    def _ensure_fresh(self):
+        if self._meta is None:
+            self.refresh()
+        elif self.check_interval is not None and time.monotonic() - self._last_check > self.check_interval:
+            self.refresh()
+
+    # ---- 查询 ----
+
+    def _postings_for(self, term: str) -> Iterator[Tuple[int, int]]:
+        entry = self._meta["vocab"].get(term)
+        if entry is None or self._postings is None:
+            return iter(())
+        start, count = entry
+        values = self._postings[start * 2:(start + count) * 2]
+        return zip(values[0::2], values[1::2])
+
+    def _text(self, doc: Dict) -> str:
+        if self._texts is None:
+            return ""
+        return self._texts[doc["offset"]:doc["offset"] + doc["length"]].decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _snippet(text: str, query_tokens: List[str], max_chars: int = 200) -> str:
+        """截取包含最早命中词的一段正文作为摘要"""
+        text = " ".join(text.split())
+        lowered = text.lower()
+        positions = [lowered.find(token) for token in query_tokens if len(token) > 1 or not token.isascii()]
+        positions = [position for position in positions if position >= 0]
+        start = max(min(positions) - max_chars // 4, 0) if positions else 0
+        snippet = text[start:start + max_chars]
+        return ("…" if start > 0 else "") + snippet + ("…" if start + max_chars < len(text) else "")
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict]:
+        """
+        BM25检索
+
+        Args:
+            query: 查询词
+            num_results: 返回结果数量
+
+        Returns:
+            List[Dict]: 结果列表，每项包含title、url、snippet、score
+        """
+        with self._lock:
+            self._ensure_fresh()
+            docs = self._meta["docs"]
+            if not docs:
+                return []
+
+            query_tokens = tokenize(query)
+            avgdl = self._meta["avgdl"] or 1.0
+            scores: Dict[int, float] = {}
+            for term, query_tf in Counter(query_tokens).items():
+                entry = self._meta["vocab"].get(term)
+                if entry is None:
+                    continue
+                df = entry[1]
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                for doc_id, tf in self._postings_for(term):
+                    norm = tf + self.k1 * (1 - self.b + self.b * docs[doc_id]["terms"] / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + query_tf * idf * tf * (self.k1 + 1) / norm
+
+            # 同一URL只保留得分最高的块（旧版本索引中重复标题会产生相同的URL）
+            results = []
+            seen_urls = set()
+            for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+                doc = docs[doc_id]
+                if doc["url"] in seen_urls:
+                    continue
+                seen_urls.add(doc["url"])
+                results.append({
+                    "title": doc["title"],
+                    "url": doc["url"],
+                    "snippet": self._snippet(self._text(doc), query_tokens),
+                    "score": round(score, 4),
+                })
+                if len(results) >= num_results:
+                    break
+            return results
+
+    def stats(self) -> Dict:
+        """获取索引统计"""
+        with self._lock:
+            meta = self._meta or {}
+            return {
+                "docs_dir": str(self.docs_dir),
+                "index_dir": str(self.index_dir),
+                "chunks": len(meta.get("docs", [])),
+                "terms": len(meta.get("vocab", {})),
+                "built_at": meta.get("built_at"),
+                "builds": self.builds,
+                "tokenized_files": self.tokenized_files,
+                "reused_files": self.reused_files,
+            }
@@ -0,0 +1,284 @@
+"""
+调用保护 - 截止时间、带抖动的指数退避重试、全局重试预算、熔断器和对冲请求
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# 可以重试的HTTP状态码
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class ResilienceConfig:
+    """调用保护配置"""
+
+    # 单次调用（包含所有重试）的截止时间（秒）
+    deadline: float = 15.0
+    # 单次调用最多重试次数
+    max_retries: int = 2
+    # 退避基准时间和上限（秒），实际等待为 [0, min(上限, 基准*2^n)] 之间的随机值
+    backoff_base: float = 0.2
+    backoff_max: float = 2.0
+    # 重试预算：滑动窗口内重试次数不超过请求数的该比例（至少允许min_retries次）
+    retry_budget_ratio: float = 0.2
+    retry_budget_min: int = 3
+    retry_budget_window: float = 10.0
+    # 连续失败多少次后熔断，熔断后多久允许一次试探请求（秒）
+    breaker_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    # 对冲请求：请求超过最近延迟的p95仍未返回时，再发一个相同请求，先返回者为准
+    hedge: bool = False
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def from_env(cls) -> "ResilienceConfig":
+        """
+        根据环境变量创建配置
+
+        环境变量:
+            SERPAPI_DEADLINE: 单次调用截止时间（秒）
+            SERPAPI_MAX_RETRIES: 最多重试次数
+            SERPAPI_HEDGE: 设为1时启用对冲请求
+        """
+        deadline = os.getenv("SERPAPI_DEADLINE")
+        max_retries = os.getenv("SERPAPI_MAX_RETRIES")
+        return cls(
+            deadline=float(deadline) if deadline else cls.deadline,
+            max_retries=int(max_retries) if max_retries else cls.max_retries,
+            hedge=os.getenv("SERPAPI_HEDGE") == "1",
+        )
+
+
+def is_retryable(error: BaseException) -> bool:
+    """网络错误、超时以及429/5xx响应可以重试，其他4xx不重试"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, TimeoutError))
+
+
+class RetryBudget:
+    """全局重试预算，防止上游故障时重试把流量放大"""
+
+    def __init__(self, ratio: float, minimum: int, window: float):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """
+        申请一次重试
+
+        Returns:
+            bool: 预算是否允许本次重试
+        """
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= max(self.minimum, self.ratio * len(self._requests)):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class CircuitBreaker:
+    """熔断器：closed正常放行，open直接失败，half_open只放行一个试探请求"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """当前是否允许发出请求"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def abandon(self):
+        """请求被取消，结果未知，释放试探名额"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            if self.opened_at is None or self._probing:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class Resilience:
+    """对异步调用施加截止时间、重试、熔断和对冲"""
+
+    def __init__(self, config: ResilienceConfig = None):
+        """
+        初始化调用保护
+
+        Args:
+            config: 配置，默认使用ResilienceConfig()
+        """
+        self.config = config or ResilienceConfig()
+        self.breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_reset_timeout)
+        self.budget = RetryBudget(
+            self.config.retry_budget_ratio, self.config.retry_budget_min, self.config.retry_budget_window
+        )
+        self.calls = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+        self.rejected = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: Deque[float] = deque(maxlen=200)
+
+    def hedge_delay(self) -> Optional[float]:
+        """最近请求延迟的p95，样本不足时返回None（不对冲）"""
+        if not self.config.hedge or len(self._latencies) < self.config.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[int(len(latencies) * 0.95)]
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        调用fn，失败时按配置退避重试
+
+        Args:
+            fn: 每次调用都会重新执行的异步函数
+
+        Returns:
+            fn的返回值
+
+        Raises:
+            ConnectionError: 熔断器打开，请求被直接拒绝
+            TimeoutError: 超过截止时间
+            Exception: 不可重试的错误，或重试次数/预算用尽后的最后一个错误
+        """
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(self._call_with_retries(fn), self.config.deadline)
+        except asyncio.TimeoutError:
+            # 超时说明上游过慢，计入熔断
+            self.breaker.record_failure()
+            raise TimeoutError(f"搜索请求超过截止时间 {self.config.deadline}s") from None
+
+    async def _call_with_retries(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise ConnectionError("搜索服务连续失败，已熔断，暂时拒绝请求")
+
+            self.budget.record_request()
+            start = time.monotonic()
+            try:
+                result = await self._attempt(fn)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                else:
+                    # 非上游故障（如参数错误）不计入熔断
+                    self.breaker.record_success()
+                    raise
+                if attempt >= self.config.max_retries:
+                    raise
+                if not self.budget.try_spend():
+                    self.budget_exhausted += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                backoff = min(self.config.backoff_max, self.config.backoff_base * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, backoff))
+                continue
+
+            self._latencies.append(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行一次请求，超过对冲延迟仍未返回时发出第二个相同请求"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(fn())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # 两个请求都失败，抛出主请求的错误
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict:
+        """获取调用保护统计"""
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.failures,
+            "calls": self.calls,
+            "retries": self.retries,
+            "budget_exhausted": self.budget_exhausted,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay": self.hedge_delay(),
+        }
@@ -0,0 +1,177 @@
+"""
+搜索结果整形 - 在结果进入模型提示词前按token预算压缩，减少本地大模型的prefill耗时
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from .local_search import tokenize
+
+# 句子结束符（中英文），截断摘要时优先在这些位置断开
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？；!?;])|(?<=\.)(?=\s)")
+_CJK_CHAR_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算token数：汉字约1个token，其他字符约4个字符1个token
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: 估算的token数
+    """
+    cjk = len(_CJK_CHAR_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_sentences(text: str, max_chars: int) -> str:
+    """
+    在句子边界截断文本，第一句就超长时在词边界硬截断
+
+    Args:
+        text: 原文
+        max_chars: 最大字符数
+
+    Returns:
+        str: 截断后的文本，发生截断时以"…"结尾
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+
+    kept = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if not sentence:
+            continue
+        if len(kept) + len(sentence) > max_chars:
+            break
+        kept += sentence
+    kept = kept.strip()
+    if not kept:
+        kept = text[:max_chars]
+        # 英文避免截断在单词中间
+        if " " in kept and not _CJK_CHAR_RE.search(kept[-1]):
+            kept = kept.rsplit(" ", 1)[0]
+    return kept.rstrip() + "…"
+
+
+@dataclass
+class ResultShaper:
+    """按token预算整形搜索结果"""
+
+    # 每次调用所有结果合计的token预算，None表示不限制
+    max_tokens: Optional[int] = 600
+    # 单条摘要的最大字符数
+    max_snippet_chars: int = 240
+    # 标题+摘要的词集合Jaccard相似度超过该值视为重复
+    duplicate_threshold: float = 0.8
+    # 紧凑格式：去掉source、position等对模型无用的字段
+    compact: bool = True
+    # 预算不足时，摘要最少保留的字符数，再少就整条丢弃
+    min_snippet_chars: int = 40
+
+    # 累计统计
+    calls: int = field(default=0, init=False)
+    tokens_saved: int = field(default=0, init=False)
+
+    @classmethod
+    def from_env(cls) -> "ResultShaper":
+        """
+        根据环境变量创建
+
+        环境变量:
+            SERP_RESULT_MAX_TOKENS: 每次调用的token预算，0表示不限制
+            SERP_SNIPPET_CHARS: 单条摘要的最大字符数
+        """
+        max_tokens = os.getenv("SERP_RESULT_MAX_TOKENS")
+        snippet_chars = os.getenv("SERP_SNIPPET_CHARS")
+        return cls(
+            max_tokens=(int(max_tokens) or None) if max_tokens else cls.max_tokens,
+            max_snippet_chars=int(snippet_chars) if snippet_chars else cls.max_snippet_chars,
+        )
+
+    def _is_duplicate(self, shingles: Set[str], seen: List[Set[str]]) -> bool:
+        for other in seen:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.duplicate_threshold:
+                return True
+        return False
+
+    def shape(self, response: Dict, max_tokens: int = ...) -> Dict:
+        """
+        整形一次搜索的返回值
+
+        Args:
+            response: search_web返回的结果
+            max_tokens: 本次调用的token预算，默认使用实例配置
+
+        Returns:
+            Dict: 整形后的结果，shaping字段记录了整形前后的token数和节省量
+        """
+        if response.get("status") != "success":
+            return response
+        if max_tokens is ...:
+            max_tokens = self.max_tokens
+
+        results = response.get("results", [])
+        tokens_before = sum(estimate_tokens(str(item)) for item in results)
+
+        shaped = []
+        seen_urls = set()
+        seen_shingles: List[Set[str]] = []
+        duplicates = truncated = 0
+        remaining = max_tokens
+        for item in results:
+            url = item.get("url", "")
+            shingles = set(tokenize(f"{item.get('title', '')} {item.get('snippet', '')}"))
+            if (url and url in seen_urls) or self._is_duplicate(shingles, seen_shingles):
+                duplicates += 1
+                continue
+
+            snippet = truncate_sentences(item.get("snippet", ""), self.max_snippet_chars)
+            if self.compact:
+                entry = {"title": item.get("title", ""), "url": url, "snippet": snippet}
+            else:
+                entry = {**item, "snippet": snippet}
+
+            if remaining is not None:
+                cost = estimate_tokens(str(entry))
+                if cost > remaining:
+                    # 预算不足时先尝试缩短摘要
+                    overhead = cost - estimate_tokens(snippet)
+                    chars_per_token = len(snippet) / max(estimate_tokens(snippet), 1)
+                    budget_chars = int((remaining - overhead) * chars_per_token)
+                    if budget_chars < self.min_snippet_chars:
+                        break
+                    entry["snippet"] = truncate_sentences(snippet, budget_chars)
+                    cost = estimate_tokens(str(entry))
+                    if cost > remaining:
+                        break
+                remaining -= cost
+
+            if entry["snippet"] != " ".join(item.get("snippet", "").split()):
+                truncated += 1
+            seen_urls.add(url)
+            seen_shingles.append(shingles)
+            shaped.append(entry)
+
+        tokens_after = sum(estimate_tokens(str(item)) for item in shaped)
+        self.calls += 1
+        self.tokens_saved += tokens_before - tokens_after
+        return {
+            **response,
+            "results": shaped,
+            "total_results": len(shaped),
+            "shaping": {
+                "tokens_before": tokens_before,
+                "tokens_after": tokens_after,
+                "tokens_saved": tokens_before - tokens_after,
+                "duplicates_removed": duplicates,
+                "snippets_truncated": truncated,
+                "dropped_for_budget": len(results) - duplicates - len(shaped),
+            },
+        }
@@ -0,0 +1,228 @@
+"""
+搜索服务注册表 - 按配置选择搜索后端，所有agent共享同一个带限流和指标的实例
+
+内置后端（在tools.serp中注册）:
+    serpapi   SerpAPI（需要SERPAPI_KEY）
+    offline   本地文档BM25索引（需要LOCAL_SEARCH_DIR）
+    fake      固定的演示数据，用于测试
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, Optional, Tuple
+
+# 创建搜索后端的工厂函数，后端需提供search_web / search_web_async / iter_results（接受before_fetch），
+# 可选提供cached（只查缓存），命中缓存的请求不计入限流；未命中时以cache_checked=True调用搜索，后端不再重复查缓存
+BackendFactory = Callable[[], Any]
+
+_factories: Dict[str, BackendFactory] = {}
+_providers: Dict[str, "SearchProvider"] = {}
+_lock = threading.Lock()
+
+
+class RateLimiter:
+    """令牌桶限流，所有agent的搜索请求共用一个桶"""
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        初始化限流器
+
+        Args:
+            rate: 每秒允许的请求数
+            burst: 桶容量，默认等于rate（至少为1）
+        """
+        self.rate = rate
+        self.burst = burst or max(int(rate), 1)
+        self.waited = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """取走一个令牌，返回需要等待的时间（令牌不足时预支）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SearchProvider:
+    """包装搜索后端，统一限流并记录调用指标"""
+
+    def __init__(self, name: str, backend: Any, rate_limiter: Optional[RateLimiter] = None):
+        """
+        初始化搜索服务
+
+        Args:
+            name: 后端名称
+            backend: 搜索后端（如SerpAPISearch）
+            rate_limiter: 限流器，None表示不限流
+        """
+        self.name = name
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+
+        self.calls = 0
+        self.errors = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+
+    def _record(self, start: float, response: Dict):
+        self.calls += 1
+        self.errors += response.get("status") == "error"
+        self._latencies.append(time.monotonic() - start)
+
+    def _cached(self, query: str, num_results: int, kwargs: Dict) -> Tuple[Optional[Dict], Dict]:
+        """先查后端缓存，返回命中的结果和搜索调用的参数（未命中时带上cache_checked）"""
+        cached = getattr(self.backend, "cached", None)
+        if cached is None:
+            return None, kwargs
+        response = cached(query, num_results, **kwargs)
+        return response, {**kwargs, "cache_checked": True}
+
+    async def search(self, query: str, num_results: int = 5, **kwargs) -> Dict:
+        """异步搜索，参数同SerpAPISearch.search_web_async；命中缓存时不申请令牌"""
+        start = time.monotonic()
+        response, kwargs = self._cached(query, num_results, kwargs)
+        if response is None:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+                start = time.monotonic()
+            response = await self.backend.search_web_async(query, num_results, **kwargs)
+        self._record(start, response)
+        return response
+
+    def search_sync(self, query: str, num_results: int = 5, **kwargs) -> Dict:
+        """同步搜索，参数同SerpAPISearch.search_web；命中缓存时不申请令牌"""
+        start = time.monotonic()
+        response, kwargs = self._cached(query, num_results, kwargs)
+        if response is None:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire_sync()
+                start = time.monotonic()
+            response = self.backend.search_web(query, num_results, **kwargs)
+        self._record(start, response)
+        return response
+
+    async def iter_results(self, query: str, max_results: int = 50,
+                           page_size: int = 10) -> AsyncGenerator[Any, None]:
+        """分页逐条产出结果，每次请求一页（包括预取）之前申请令牌"""
+        before_fetch = self.rate_limiter.acquire if self.rate_limiter is not None else None
+        async for result in self.backend.iter_results(query, max_results=max_results, page_size=page_size,
+                                                      before_fetch=before_fetch):
+            yield result
+
+    def stats(self) -> Dict:
+        """获取调用指标，以及后端缓存、调用保护、结果整形的统计"""
+        latencies = sorted(self._latencies)
+        stats = {
+            "provider": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+            "p95_latency": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "rate_limit": self.rate_limiter.rate if self.rate_limiter else None,
+            "rate_limit_waited": self.rate_limiter.waited if self.rate_limiter else 0.0,
+        }
+        for attribute in ("cache", "resilience"):
+            component = getattr(self.backend, attribute, None)
+            if component is not None:
+                stats[attribute] = component.stats()
+        shaper = getattr(self.backend, "shaper", None)
+        if shaper is not None:
+            stats["tokens_saved"] = shaper.tokens_saved
+        return stats
+
+
+def register_provider(name: str, factory: BackendFactory, replace: bool = False):
+    """
+    注册搜索后端
+
+    Args:
+        name: 后端名称
+        factory: 创建后端的工厂函数（首次使用时才调用）
+        replace: 是否覆盖已注册的同名后端
+
+    Raises:
+        ValueError: 名称已被注册且replace为False
+    """
+    with _lock:
+        if name in _factories and not replace:
+            raise ValueError(f"搜索后端 '{name}' 已注册")
+        _factories[name] = factory
+        _providers.pop(name, None)
+
+
+def available_providers() -> list:
+    """获取已注册的后端名称"""
+    return sorted(_factories)
+
+
+def default_provider_name() -> str:
+    """
+    根据环境变量选择默认后端
+
+    SEARCH_PROVIDER显式指定时使用它；否则有SERPAPI_KEY时使用serpapi，
+    有LOCAL_SEARCH_DIR时使用offline，都没有时使用fake
+    """
+    name = os.getenv("SEARCH_PROVIDER")
+    if name:
+        return name
+    if os.getenv("SERPAPI_KEY"):
+        return "serpapi"
+    if os.getenv("LOCAL_SEARCH_DIR"):
+        return "offline"
+    return "fake"
+
+
+def get_search_provider(name: str = None) -> SearchProvider:
+    """
+    获取共享的搜索服务实例，同名后端在进程内只创建一次
+
+    环境变量:
+        SEARCH_PROVIDER: 后端名称，见default_provider_name
+        SEARCH_RATE_LIMIT: 每秒最多搜索请求数（所有agent合计），不设置则不限流
+
+    Args:
+        name: 后端名称，默认由环境变量决定
+
+    Returns:
+        SearchProvider: 共享实例
+
+    Raises:
+        ValueError: 后端未注册
+    """
+    name = name or default_provider_name()
+    with _lock:
+        provider = _providers.get(name)
+        if provider is None:
+            factory = _factories.get(name)
+            if factory is None:
+                raise ValueError(f"搜索后端 '{name}' 未注册。可用后端: {', '.join(sorted(_factories))}")
+            rate = os.getenv("SEARCH_RATE_LIMIT")
+            provider = _providers[name] = SearchProvider(
+                name, factory(), RateLimiter(float(rate)) if rate else None
+            )
+        return provider
+
+
+def reset_providers():
+    """丢弃已创建的实例（下次获取时按当前配置重新创建），主要用于测试"""
+    with _lock:
+        _providers.clear()
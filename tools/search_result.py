@@ -0,0 +1,134 @@
+"""
+搜索结果类型 - 紧凑的SearchResult和按需解析的结果集
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+
+@dataclass(frozen=True, slots=True)
+class SearchResult:
+    """单条搜索结果（不可变，使用__slots__减少内存占用）"""
+
+    title: str
+    url: str
+    snippet: str
+    source: str = "Google搜索"
+    position: int = 0
+
+    @classmethod
+    def from_organic(cls, item: Dict) -> "SearchResult":
+        """解析SerpAPI organic_results中的一项"""
+        return cls(
+            title=item.get("title", ""),
+            url=item.get("link", ""),
+            snippet=item.get("snippet", ""),
+            source="Google搜索",
+            position=item.get("position", 0),
+        )
+
+    @classmethod
+    def from_answer_box(cls, answer_box: Dict) -> "SearchResult":
+        """解析SerpAPI的answer_box"""
+        return cls(
+            title=answer_box.get("title", "答案"),
+            url=answer_box.get("link", ""),
+            snippet=answer_box.get("answer", answer_box.get("snippet", "")),
+            source="Google答案框",
+            position=0,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SearchResult":
+        """从工具返回的字典格式还原"""
+        return cls(
+            title=data.get("title", ""),
+            url=data.get("url", ""),
+            snippet=data.get("snippet", ""),
+            source=data.get("source", ""),
+            position=data.get("position", 0),
+        )
+
+    def to_dict(self) -> Dict:
+        """转换为工具返回的字典格式"""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "snippet": self.snippet,
+            "source": self.source,
+            "position": self.position,
+        }
+
+
+class SearchResultSet(Sequence[SearchResult]):
+    """
+    一次搜索的结果集
+
+    只保留原始响应中的结果条目（不复制），访问某一项时才解析为SearchResult并缓存，
+    适合在内存中保存大量搜索结果做聚合的批处理任务。
+    """
+
+    __slots__ = ("query", "_raw_items", "_parse", "_parsed")
+
+    def __init__(self, query: str, raw_items: List, parse=SearchResult.from_dict):
+        """
+        初始化结果集
+
+        Args:
+            query: 搜索关键词
+            raw_items: 原始结果条目
+            parse: 把原始条目解析为SearchResult的函数
+        """
+        self.query = query
+        self._raw_items = raw_items
+        self._parse = parse
+        self._parsed: List[Optional[SearchResult]] = [None] * len(raw_items)
+
+    @classmethod
+    def from_api_response(cls, api_response: Dict, query: str) -> Optional["SearchResultSet"]:
+        """
+        从SerpAPI响应创建结果集
+
+        Args:
+            api_response: SerpAPI响应
+            query: 搜索关键词
+
+        Returns:
+            Optional[SearchResultSet]: 响应中既没有organic_results也没有answer_box时返回None
+        """
+        if "organic_results" in api_response:
+            return cls(query, api_response["organic_results"], SearchResult.from_organic)
+        if "answer_box" in api_response:
+            return cls(query, [api_response["answer_box"]], SearchResult.from_answer_box)
+        return None
+
+    @classmethod
+    def from_results(cls, query: str, results: Iterable[Union[SearchResult, Dict]]) -> "SearchResultSet":
+        """从已解析的结果或字典创建结果集"""
+        items = [item if isinstance(item, SearchResult) else SearchResult.from_dict(item) for item in results]
+        result_set = cls(query, items, parse=None)
+        result_set._parsed = list(items)
+        return result_set
+
+    def __len__(self) -> int:
+        return len(self._raw_items)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[SearchResult, List[SearchResult]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        result = self._parsed[index]
+        if result is None:
+            result = self._parsed[index] = self._parse(self._raw_items[index])
+        return result
+
+    def __iter__(self) -> Iterator[SearchResult]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        parsed = sum(1 for result in self._parsed if result is not None)
+        return f"SearchResultSet(query={self.query!r}, results={len(self)}, parsed={parsed})"
+
+    def to_dicts(self) -> List[Dict]:
+        """转换为工具返回的字典列表"""
+        return [result.to_dict() for result in self]
@@ -1,66 +1,485 @@
+import asyncio
+import copy
+import json
 import os
-from typing import Dict, List
+import sqlite3
+import threading
+import time
+import unicodedata
+import weakref
+from collections import OrderedDict
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional
 
+import httpx
 import serpapi
 
+from .local_search import LocalSearchIndex
+from .resilience import Resilience, ResilienceConfig
+from .result_shaping import ResultShaper
+from .search_providers import get_search_provider, register_provider
+from .search_result import SearchResult, SearchResultSet
+
+# 可通过环境变量指向本地的假服务，便于测试
+SERPAPI_ENDPOINT = os.getenv("SERPAPI_ENDPOINT") or "https://serpapi.com/search"
+
+# 异步搜索共享的连接池配置：保持keep-alive连接，避免每次调用重新握手
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(float(os.getenv("SERPAPI_TIMEOUT") or 20.0), connect=5.0)
+
+# 每个事件循环一个客户端（httpx的连接绑定在创建它的事件循环上），事件循环被回收时一并释放
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    获取当前事件循环共享的异步HTTP客户端
+
+    与services.http_pool相同，每个事件循环各有一个客户端。在另一个事件循环中搜索不会替换（并遗留未关闭的）
+    当前循环的客户端；已关闭的事件循环的客户端在下次创建客户端时移除。
+
+    Returns:
+        httpx.AsyncClient: 当前事件循环的共享客户端
+    """
+    loop = asyncio.get_running_loop()
+    with _http_client_lock:
+        client = _http_clients.get(loop)
+        if client is None or client.is_closed:
+            for other in [other for other in _http_clients if other.is_closed()]:
+                del _http_clients[other]
+            client = _http_clients[loop] = httpx.AsyncClient(
+                limits=HTTP_LIMITS,
+                timeout=HTTP_TIMEOUT,
+                headers={"User-Agent": f"serpapi-python, v{serpapi.__version__}"},
+            )
+        return client
+
+
+async def aclose_http_client():
+    """关闭当前事件循环的共享异步HTTP客户端"""
+    with _http_client_lock:
+        client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class SearchCache:
+    """搜索结果缓存 - 内存LRU层 + 可选的SQLite持久层，每个条目带TTL和抓取时间"""
+
+    DEFAULT_TTL = 6 * 3600
+    DEFAULT_MAX_ENTRIES = 512
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL, path: str = None):
+        """
+        初始化搜索缓存
+
+        Args:
+            max_entries: 内存层最多保存的条目数，超过后淘汰最久未使用的
+            ttl: 条目有效期（秒），None表示永不过期
+            path: SQLite文件路径，为None时只使用内存层
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        """
+        根据环境变量创建缓存
+
+        环境变量:
+            SERP_CACHE_TTL: 有效期（秒），默认6小时
+            SERP_CACHE_SIZE: 内存层条目数，默认512
+            SERP_CACHE_PATH: SQLite文件路径，不设置时不持久化
+        """
+        ttl = os.getenv("SERP_CACHE_TTL")
+        size = os.getenv("SERP_CACHE_SIZE")
+        return cls(
+            max_entries=int(size) if size else cls.DEFAULT_MAX_ENTRIES,
+            ttl=float(ttl) if ttl else cls.DEFAULT_TTL,
+            path=os.getenv("SERP_CACHE_PATH"),
+        )
+
+    @staticmethod
+    def make_key(query: str, num_results: int, engine: str = "google") -> str:
+        """
+        生成缓存键：查询词做Unicode规范化、忽略大小写并合并空白
+
+        Args:
+            query: 搜索关键词
+            num_results: 结果数量
+            engine: 搜索引擎
+
+        Returns:
+            str: 缓存键
+        """
+        normalized = " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+        return f"{engine}:{num_results}:{normalized}"
+
+    def _expired(self, fetched_at: float) -> bool:
+        return self.ttl is not None and time.time() - fetched_at > self.ttl
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Dict]:
+        """
+        读取缓存结果
+
+        Args:
+            key: make_key生成的键
+            allow_stale: 是否返回已过期的条目（上游不可用时作为降级结果）
+
+        Returns:
+            Optional[Dict]: 命中时返回结果副本（cached为True，fetched_at为抓取时间），否则返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not allow_stale and self._expired(entry["fetched_at"]):
+                entry = None
+
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT payload, fetched_at FROM search_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and (allow_stale or not self._expired(row[1])):
+                    entry = json.loads(row[0])
+                    self._store_locked(key, entry)
+                    self.disk_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        result = copy.deepcopy(entry)
+        result["cached"] = True
+        if self._expired(entry["fetched_at"]):
+            result["stale"] = True
+        return result
+
+    def put(self, key: str, result: Dict):
+        """
+        写入搜索结果，result中需包含fetched_at
+
+        Args:
+            key: make_key生成的键
+            result: 搜索结果
+        """
+        entry = copy.deepcopy(result)
+        entry["cached"] = False
+        with self._lock:
+            self._store_locked(key, entry)
+            self.writes += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_results (key, payload, fetched_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(entry, ensure_ascii=False), entry["fetched_at"]),
+                )
+                self._conn.commit()
+
+    def _store_locked(self, key: str, entry: Dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """
+        删除所有过期条目
+
+        Returns:
+            int: 删除的条目数（内存层和持久层合计）
+        """
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if self._expired(entry["fetched_at"])]
+            for key in expired:
+                del self._entries[key]
+            removed = len(expired)
+            if self._conn is not None and self.ttl is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM search_results WHERE fetched_at < ?", (time.time() - self.ttl,)
+                )
+                self._conn.commit()
+                removed += cursor.rowcount
+        return removed
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM search_results")
+                self._conn.commit()
+
+    def stats(self) -> Dict:
+        """获取缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": self.hits / total if total else 0.0,
+                "persistent": self._conn is not None,
+            }
+
+
+# 进程内共享的搜索缓存，所有agent的搜索工具都使用它
+search_cache = SearchCache.from_env()
+
+# 进程内共享的调用保护，熔断状态和重试预算对所有agent生效
+search_resilience = Resilience(ResilienceConfig.from_env())
+
+_local_index: Optional[LocalSearchIndex] = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalSearchIndex]:
+    """
+    获取共享的本地文档索引，未设置LOCAL_SEARCH_DIR时返回None
+
+    环境变量:
+        LOCAL_SEARCH_DIR: 需要索引的文档目录，如 doc
+        LOCAL_SEARCH_INDEX: 索引保存目录，默认为文档目录旁的.search_index
+    """
+    global _local_index
+    docs_dir = os.getenv("LOCAL_SEARCH_DIR")
+    if not docs_dir:
+        return None
+    with _local_index_lock:
+        if _local_index is None:
+            _local_index = LocalSearchIndex(docs_dir, index_dir=os.getenv("LOCAL_SEARCH_INDEX"))
+        return _local_index
+
 
 class SerpAPISearch:
-    """SerpAPI搜索工具类 - 使用官方客户端"""
+    """SerpAPI搜索工具类 - 同步调用使用官方客户端，异步调用使用共享连接池"""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, timeout: float = None,
+                 cache: Optional[SearchCache] = ..., engine: str = "google",
+                 local_index: Optional[LocalSearchIndex] = ..., shaper: ResultShaper = None,
+                 resilience: Resilience = None):
         """
         初始化SerpAPI搜索工具
 
         Args:
             api_key: SerpAPI Key (从serpapi.com获取)
+            timeout: 同步请求超时时间（秒），默认与异步请求一致
+            cache: 搜索结果缓存，默认使用共享的search_cache，None表示不缓存
+            engine: SerpAPI搜索引擎
+            local_index: 没有API密钥时使用的本地文档索引，默认由LOCAL_SEARCH_DIR决定，None表示使用演示数据
+            shaper: 结果整形器，设置后返回的结果会按token预算压缩
+            resilience: 调用保护（重试、熔断、对冲），默认使用共享的search_resilience
         """
         self.api_key = api_key
-        self.client = serpapi.Client(api_key=api_key) if api_key else None
+        self.timeout = timeout or HTTP_TIMEOUT.read
+        self.client = serpapi.Client(api_key=api_key, timeout=self.timeout) if api_key else None
+        if self.client is not None and os.getenv("SERPAPI_ENDPOINT"):
+            # 同步客户端也指向SERPAPI_ENDPOINT（如本地假服务）
+            self.client.BASE_DOMAIN = SERPAPI_ENDPOINT.rsplit("/search", 1)[0]
+        self.cache = search_cache if cache is ... else cache
+        self.engine = engine
+        self.local_index = get_local_index() if local_index is ... else local_index
+        self.shaper = shaper
+        self.resilience = resilience or search_resilience
+
+    def _build_params(self, query: str, num_results: int) -> Dict:
+        return {
+            'engine': self.engine,
+            'q': query,
+            'num': num_results
+        }
+
+    @property
+    def results_source(self) -> str:
+        """
+        iter_results和search_results返回结果的来源，取值与搜索结果中的source相同
+
+        Returns:
+            str: 有API密钥时为serpapi，否则有本地索引时为local，都没有时为demo_mode
+        """
+        if self.api_key:
+            return "serpapi"
+        return "local" if self.local_index is not None else "demo_mode"
+
+    def _cache_get(self, query: str, num_results: int) -> Optional[Dict]:
+        if self.cache is None:
+            return None
+        return self.cache.get(SearchCache.make_key(query, num_results, self.engine))
+
+    def _success(self, api_response: Dict, query: str, num_results: int) -> Dict:
+        results = self._parse_api_results(api_response, query)
+        response = {
+            "status": "success",
+            "query": query,
+            "results": results,
+            "total_results": len(results),
+            "source": "serpapi",
+            "fetched_at": time.time(),
+            "cached": False
+        }
+        if self.cache is not None:
+            self.cache.put(SearchCache.make_key(query, num_results, self.engine), response)
+        return response
+
+    def _fallback(self, query: str, num_results: int, error: Exception) -> Dict:
+        """上游失败或熔断时依次尝试：过期缓存、本地文档索引，都没有时返回错误"""
+        if self.cache is not None:
+            stale = self.cache.get(SearchCache.make_key(query, num_results, self.engine), allow_stale=True)
+            if stale is not None:
+                stale["fallback_reason"] = str(error)
+                return stale
+        if self.local_index is not None:
+            response = self._get_local_results(query, num_results)
+            response["fallback_reason"] = str(error)
+            return response
+        return self.error_response(query, error)
+
+    @staticmethod
+    def error_response(query: str, error: Exception) -> Dict:
+        """构造搜索失败时返回给模型的结果"""
+        return {
+            "status": "error",
+            "query": query,
+            "error": f"搜索失败: {str(error)}",
+            "results": []
+        }
+
+    def _shape(self, response: Dict, max_tokens: Optional[int]) -> Dict:
+        if self.shaper is None:
+            return response
+        return self.shaper.shape(response, max_tokens)
+
+    def cached(self, query: str, num_results: int = 5, max_tokens: Optional[int] = ...) -> Optional[Dict]:
+        """
+        只查缓存，不发起请求
+
+        Args:
+            query: 搜索关键词
+            num_results: 返回结果数量
+            max_tokens: 本次调用的token预算，默认使用整形器的配置
+
+        Returns:
+            Optional[Dict]: 命中时返回与search_web相同格式的结果，未命中或没有API密钥时返回None
+        """
+        if not self.api_key:
+            return None
+        cached = self._cache_get(query, num_results)
+        return None if cached is None else self._shape(cached, max_tokens)
 
-    def search_web(self, query: str, num_results: int = 5) -> Dict:
+    def search_web(self, query: str, num_results: int = 5, max_tokens: Optional[int] = ...,
+                   cache_checked: bool = False) -> Dict:
         """
         执行网页搜索
 
         Args:
             query: 搜索关键词
             num_results: 返回结果数量，默认5条
+            max_tokens: 本次调用的token预算，默认使用整形器的配置
+            cache_checked: 调用方已通过cached()查过缓存且未命中，不再重复查询（避免重复计入未命中）
 
         Returns:
             Dict: 搜索结果
         """
+        return self._shape(self._search_web(query, num_results, cache_checked), max_tokens)
+
+    def _search_web(self, query: str, num_results: int, cache_checked: bool = False) -> Dict:
         try:
-            # 如果没有提供API密钥，返回演示数据
+            # 如果没有提供API密钥，使用本地文档索引，没有索引时返回演示数据
             if not self.api_key or not self.client:
+                if self.local_index is not None:
+                    return self._get_local_results(query, num_results)
                 return self._get_demo_results(query, num_results)
 
+            cached = None if cache_checked else self._cache_get(query, num_results)
+            if cached is not None:
+                return cached
+
+            breaker = self.resilience.breaker
+            if not breaker.allow():
+                return self._fallback(query, num_results, ConnectionError("搜索服务连续失败，已熔断，暂时拒绝请求"))
+
             # 使用官方客户端进行搜索
-            search_params = {
-                'engine': 'google',
-                'q': query,
-                'num': num_results
-            }
+            try:
+                search_result = self.client.search(self._build_params(query, num_results))
+            except Exception as e:
+                breaker.record_failure()
+                return self._fallback(query, num_results, e)
+            breaker.record_success()
 
-            # 发送搜索请求
-            search_result = self.client.search(search_params)
+            return self._success(search_result, query, num_results)
 
-            # 解析搜索结果
-            results = self._parse_api_results(search_result, query)
+        except Exception as e:
+            return self.error_response(query, e)
 
-            return {
-                "status": "success",
-                "query": query,
-                "results": results,
-                "total_results": len(results),
-                "source": "serpapi"
-            }
+    async def search_web_async(self, query: str, num_results: int = 5,
+                               max_tokens: Optional[int] = ..., cache_checked: bool = False) -> Dict:
+        """
+        异步执行网页搜索，复用进程内共享的HTTP连接池，不阻塞事件循环
+
+        Args:
+            query: 搜索关键词
+            num_results: 返回结果数量，默认5条
+            max_tokens: 本次调用的token预算，默认使用整形器的配置
+            cache_checked: 调用方已通过cached()查过缓存且未命中，不再重复查询
+
+        Returns:
+            Dict: 搜索结果，格式与search_web相同
+        """
+        return self._shape(await self._search_web_async(query, num_results, cache_checked), max_tokens)
+
+    async def _search_web_async(self, query: str, num_results: int, cache_checked: bool = False) -> Dict:
+        try:
+            if not self.api_key:
+                if self.local_index is not None:
+                    # 首次查询可能需要构建索引，放到线程中执行
+                    return await asyncio.to_thread(self._get_local_results, query, num_results)
+                return self._get_demo_results(query, num_results)
+
+            cached = None if cache_checked else self._cache_get(query, num_results)
+            if cached is not None:
+                return cached
+
+            params = {**self._build_params(query, num_results), 'api_key': self.api_key}
+            try:
+                api_response = await self.resilience.call(lambda: self._fetch_async(params))
+            except Exception as e:
+                return self._fallback(query, num_results, e)
+
+            return self._success(api_response, query, num_results)
 
         except Exception as e:
-            return {
-                "status": "error",
-                "query": query,
-                "error": f"搜索失败: {str(e)}",
-                "results": []
-            }
+            return self.error_response(query, e)
+
+    @staticmethod
+    async def _fetch_async(params: Dict) -> Dict:
+        response = await get_http_client().get(SERPAPI_ENDPOINT, params=params)
+        response.raise_for_status()
+        return response.json()
 
     def _parse_api_results(self, api_response: Dict, query: str) -> List[Dict]:
         """
@@ -73,35 +492,137 @@ class SerpAPISearch:
         Returns:
             List[Dict]: 解析后的结果列表
         """
-        results = []
-
-        # 检查API响应结构
-        if "organic_results" in api_response:
-            # 解析有机搜索结果
-            for item in api_response["organic_results"]:
-                result = {
-                    "title": item.get("title", ""),
-                    "url": item.get("link", ""),
-                    "snippet": item.get("snippet", ""),
-                    "source": "Google搜索",
-                    "position": item.get("position", 0)
-                }
-                results.append(result)
-        elif "answer_box" in api_response:
-            # 解析答案框结果
-            answer_box = api_response["answer_box"]
-            results.append({
-                "title": answer_box.get("title", "答案"),
-                "url": answer_box.get("link", ""),
-                "snippet": answer_box.get("answer", answer_box.get("snippet", "")),
-                "source": "Google答案框",
-                "position": 0
-            })
-        else:
+        # 检查API响应结构（organic_results或answer_box）
+        result_set = SearchResultSet.from_api_response(api_response, query)
+        if result_set is None:
             # 如果没有找到标准格式，返回演示数据
             return self._get_demo_results(query, 5)["results"]
 
-        return results
+        return result_set.to_dicts()
+
+    async def iter_results(self, query: str, max_results: int = 50, page_size: int = 10,
+                           before_fetch: Optional[Callable[[], Awaitable]] = None
+                           ) -> AsyncGenerator[SearchResult, None]:
+        """
+        按SerpAPI分页（start偏移）逐条产出结果，每页到达后立即产出，并提前预取下一页
+
+        调用方停止迭代时会取消正在预取的页面；达到max_results或没有更多结果时结束。
+
+        Args:
+            query: 搜索关键词
+            max_results: 最多产出的结果数
+            page_size: 每页请求的结果数
+            before_fetch: 每次请求（包括预取）之前等待的协程函数，如限流器的acquire
+
+        Yields:
+            SearchResult: 搜索结果
+
+        Raises:
+            httpx.HTTPError: 某一页请求失败（已产出的结果不受影响）
+            ConnectionError: 熔断器打开
+            TimeoutError: 超过截止时间
+        """
+        if not self.api_key:
+            if before_fetch is not None:
+                await before_fetch()
+            for result in (await self.search_results(query, max_results))[:max_results]:
+                yield result
+            return
+
+        async def fetch_page(params: Dict) -> Dict:
+            if before_fetch is not None:
+                await before_fetch()
+            return await self.resilience.call(lambda: self._fetch_async(params))
+
+        def fetch(start: int) -> asyncio.Future:
+            params = {**self._build_params(query, page_size), 'start': start, 'api_key': self.api_key}
+            task = asyncio.ensure_future(fetch_page(params))
+            # 预取的页面可能在被取消前失败，避免"exception was never retrieved"警告
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            return task
+
+        yielded = 0
+        start = 0
+        next_page: Optional[asyncio.Future] = fetch(start)
+        try:
+            while next_page is not None:
+                api_response = await next_page
+                next_page = None
+                page = SearchResultSet.from_api_response(api_response, query) or []
+
+                if "serpapi_pagination" in api_response:
+                    has_more = "next" in api_response["serpapi_pagination"]
+                else:
+                    has_more = len(page) >= page_size
+                start += page_size
+                if has_more and yielded + len(page) < max_results:
+                    next_page = fetch(start)
+
+                for result in page:
+                    yield result
+                    yielded += 1
+                    if yielded >= max_results:
+                        return
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def search_results(self, query: str, num_results: int = 5) -> SearchResultSet:
+        """
+        异步搜索并返回按需解析的结果集（不经过缓存和整形），适合批处理任务在内存中聚合大量结果
+
+        Args:
+            query: 搜索关键词
+            num_results: 返回结果数量
+
+        Returns:
+            SearchResultSet: 结果集，没有API密钥时为本地或演示结果
+
+        Raises:
+            httpx.HTTPError: 请求失败
+            ConnectionError: 熔断器打开
+            TimeoutError: 超过截止时间
+        """
+        source = self.results_source
+        if source != "serpapi":
+            response = self._get_local_results(query, num_results) if source == "local" \
+                else self._get_demo_results(query, num_results)
+            return SearchResultSet.from_results(query, response["results"])
+
+        params = {**self._build_params(query, num_results), 'api_key': self.api_key}
+        api_response = await self.resilience.call(lambda: self._fetch_async(params))
+        return SearchResultSet.from_api_response(api_response, query) or SearchResultSet.from_results(query, [])
+
+    def _get_local_results(self, query: str, num_results: int) -> Dict:
+        """
+        从本地文档索引检索（离线环境使用）
+
+        Args:
+            query: 搜索关键词
+            num_results: 结果数量
+
+        Returns:
+            Dict: 搜索结果，格式与SerpAPI结果相同
+        """
+        results = [
+            SearchResult(
+                title=item["title"],
+                url=item["url"],
+                snippet=item["snippet"],
+                source="本地文档",
+                position=position
+            ).to_dict()
+            for position, item in enumerate(self.local_index.search(query, num_results), start=1)
+        ]
+        return {
+            "status": "success",
+            "query": query,
+            "results": results,
+            "total_results": len(results),
+            "source": "local",
+            "fetched_at": time.time(),
+            "cached": False
+        }
 
     def _get_demo_results(self, query: str, num_results: int) -> Dict:
         """
@@ -135,8 +656,19 @@ class SerpAPISearch:
             "note": "当前使用演示模式，请配置SerpAPI密钥以获取真实搜索结果"
         }
 
+
+# 工具函数返回给模型的结果统一经过整形，控制提示词长度
+result_shaper = ResultShaper.from_env()
+
+
+# 注册内置搜索后端，所有后端共享连接池、缓存、调用保护和整形器
+register_provider("serpapi", lambda: SerpAPISearch(api_key=os.getenv("SERPAPI_KEY"), shaper=result_shaper))
+register_provider("offline", lambda: SerpAPISearch(api_key=None, shaper=result_shaper))
+register_provider("fake", lambda: SerpAPISearch(api_key=None, local_index=None, shaper=result_shaper))
+
+
 # 创建SerpAPI搜索工具函数，供Agent使用
-def serpapi_search(query: str, num_results: int = 5) -> Dict:
+async def serpapi_search(query: str, num_results: int = 5) -> Dict:
     """
     SerpAPI搜索工具函数
 
@@ -145,20 +677,123 @@ def serpapi_search(query: str, num_results: int = 5) -> Dict:
         num_results: 返回结果数量
 
     Returns:
-        Dict: 搜索结果
+        Dict: 搜索结果，fetched_at为结果的抓取时间（Unix时间戳），cached表示是否来自缓存，
+        shaping记录了按token预算整形节省的token数
+        results按相关性排列，每一项为:
         {
         "title": ...,
          "url": ...,
-         "snippet": ...,
-         "source": "Google搜索",
-         "position": ...
+         "snippet": ...
         }
 
     """
-    # 从环境变量获取API密钥
     print(f"querying: {query}")
-    api_key = os.getenv("SERPAPI_KEY")
+    return await get_search_provider().search(query, num_results)
+
+
+# 批量搜索时同时进行的最大请求数
+MAX_CONCURRENT_SEARCHES = int(os.getenv("SERPAPI_MAX_CONCURRENCY") or 4)
+
+
+async def serpapi_search_many(queries: List[str], num_results: int = 5) -> Dict:
+    """
+    批量搜索工具函数 - 并发执行多个查询，合并结果并按URL去重
+
+    一次工具调用即可完成多个搜索，适合需要从多个角度调研同一主题的场景。
+
+    Args:
+        queries: 搜索关键词列表
+        num_results: 每个查询返回的结果数量
+
+    Returns:
+        Dict: 合并后的搜索结果
+        {
+         "status": "success" / "partial" / "error",
+         "queries": [...],
+         "results": [{"title", "url", "snippet", "source", "position", "queries": [命中该URL的查询]}],
+         "total_results": ...,
+         "errors": {失败的查询: 错误信息}
+        }
+    """
+    # 去掉重复的查询（规范化后比较），保持原有顺序
+    unique: Dict[str, str] = {}
+    for query in queries:
+        if query and query.strip():
+            unique.setdefault(SearchCache.make_key(query, num_results), query.strip())
+    unique_queries = list(unique.values())
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+    async def _search(query: str) -> Dict:
+        async with semaphore:
+            return await serpapi_search(query, num_results)
+
+    responses = await asyncio.gather(*[_search(query) for query in unique_queries])
+
+    merged: Dict[str, Dict] = {}
+    errors = {}
+    for query, response in zip(unique_queries, responses):
+        if response.get("status") != "success":
+            errors[query] = response.get("error", "未知错误")
+            continue
+        for index, item in enumerate(response["results"]):
+            # 没有URL的结果（如答案框）按其在该查询结果中的序号区分，整形后不一定保留position
+            key = item.get("url") or f"{query}#{index}"
+            if key in merged:
+                merged[key]["queries"].append(query)
+            else:
+                merged[key] = {**item, "queries": [query]}
+
+    if not errors:
+        status = "success"
+    elif merged:
+        status = "partial"
+    else:
+        status = "error"
+
+    return {
+        "status": status,
+        "queries": unique_queries,
+        "results": list(merged.values()),
+        "total_results": len(merged),
+        "errors": errors
+    }
+
+
+async def serpapi_search_deep(query: str, max_results: int = 20) -> Dict:
+    """
+    深度搜索工具函数 - 翻页获取更多结果，适合需要完整列表（如论文列表）的场景
+
+    Args:
+        query: 搜索关键词
+        max_results: 最多返回的结果数量
+
+    Returns:
+        Dict: 搜索结果，格式与serpapi_search相同；翻页中途失败时status为partial，
+        results为失败前已获取的结果
+    """
+    print(f"querying (deep): {query}")
+    provider = get_search_provider()
+    search_tool = provider.backend
 
-    search_tool = SerpAPISearch(api_key=api_key)
+    results = []
+    error = None
+    try:
+        async for result in provider.iter_results(query, max_results=max_results):
+            results.append(result.to_dict())
+    except Exception as e:
+        error = e
 
-    return search_tool.search_web(query, num_results)
\ No newline at end of file
+    if error is not None and not results:
+        return search_tool.error_response(query, error)
+    response = {
+        "status": "partial" if error is not None else "success",
+        "query": query,
+        "results": results,
+        "total_results": len(results),
+        "source": search_tool.results_source,
+        "fetched_at": time.time(),
+    }
+    if error is not None:
+        response["error"] = f"翻页中断: {error}"
+    # 结果数量由max_results控制，这里只去重和截断摘要，不再按token预算裁剪
+    return result_shaper.shape(response, max_tokens=None)